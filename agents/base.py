@@ -1,16 +1,24 @@
-from typing import Any, Dict, Optional
+import json
+from typing import Any, Dict, Iterator, List, Optional, Type
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableSerializable
+from pydantic import BaseModel
 from config import Config
+from agents.costs import cost_accountant
+from agents.metrics import prompt_cache_metrics, structured_output_metrics, UsageCallbackHandler
+from agents.prompts import prefix_hash, REPAIR_PROMPT
 
 class BaseAgent:
     def __init__(self, name: str, temperature: float = 0.7):
         self.name = name
+        # Falls back to a cheaper model when the active run is near its budget
         self.llm = ChatOpenAI(
-            model=Config.MODEL_NAME,
+            model=cost_accountant.model_name(),
             temperature=temperature,
-            api_key=Config.OPENAI_API_KEY
+            api_key=Config.OPENAI_API_KEY,
+            # Report token usage on streamed responses too
+            stream_usage=True
         )
         self.prompt: Optional[ChatPromptTemplate] = None
         self.chain: Optional[RunnableSerializable] = None
@@ -20,12 +28,92 @@ class BaseAgent:
             raise ValueError(f"Agent {self.name} has no chain defined")
         return self.chain
 
-    def invoke(self, input_data: Dict[str, Any]) -> Any:
+    def _track_prefix(self, chain: RunnableSerializable, input_data: Dict[str, Any]) -> None:
+        """Record whether this call's static prompt prefix was already sent"""
+        prompt = getattr(chain, "first", None)
+        if isinstance(prompt, ChatPromptTemplate):
+            prompt_cache_metrics.record_prefix(self.name, prefix_hash(prompt.format_messages(**input_data)))
+
+    def _run_config(self) -> Dict[str, Any]:
+        return {"callbacks": [UsageCallbackHandler(self.name, self.llm.model_name)]}
+
+    def invoke(self, input_data: Dict[str, Any], chain: Optional[RunnableSerializable] = None) -> Any:
         try:
             print(f"[{self.name}] Processing...")
-            chain = self.get_chain()
-            result = chain.invoke(input_data)
+            chain = chain or self.get_chain()
+            cost_accountant.check()
+            self._track_prefix(chain, input_data)
+            result = chain.invoke(input_data, config=self._run_config())
             return result
         except Exception as e:
             print(f"[{self.name}] Error: {str(e)}")
             raise e
+
+    def invoke_batch(self, inputs: List[Dict[str, Any]], chain: Optional[RunnableSerializable] = None) -> List[Any]:
+        """Run several inputs through a chain concurrently."""
+        try:
+            print(f"[{self.name}] Processing {len(inputs)} items concurrently...")
+            chain = chain or self.get_chain()
+            cost_accountant.check()
+            for input_data in inputs:
+                self._track_prefix(chain, input_data)
+            return chain.batch(inputs, config={**self._run_config(), "max_concurrency": Config.MAX_CONCURRENCY})
+        except Exception as e:
+            print(f"[{self.name}] Error: {str(e)}")
+            raise e
+
+    def stream(self, input_data: Dict[str, Any], chain: Optional[RunnableSerializable] = None) -> Iterator[Any]:
+        """Stream a chain's output chunks (partial objects for JSON parsers)."""
+        try:
+            print(f"[{self.name}] Streaming...")
+            chain = chain or self.get_chain()
+            cost_accountant.check()
+            self._track_prefix(chain, input_data)
+            yield from chain.stream(input_data, config=self._run_config())
+        except Exception as e:
+            print(f"[{self.name}] Error: {str(e)}")
+            raise e
+
+    def structured_chain(self, schema: Type[BaseModel], prompt: Optional[ChatPromptTemplate] = None) -> RunnableSerializable:
+        """Prompt -> LLM bound to the schema via native structured output, keeping the raw response"""
+        structured_llm = self.llm.with_structured_output(
+            schema,
+            method=Config.STRUCTURED_OUTPUT_METHOD,
+            include_raw=True
+        )
+        return (prompt or self.prompt) | structured_llm
+
+    def invoke_structured(self, input_data: Dict[str, Any], schema: Type[BaseModel], prompt: Optional[ChatPromptTemplate] = None) -> BaseModel:
+        """Invoke with structured output, validating and repairing once if needed"""
+        result = self.invoke(input_data, chain=self.structured_chain(schema, prompt))
+        return self._validated(result, schema)
+
+    def invoke_structured_batch(self, inputs: List[Dict[str, Any]], schema: Type[BaseModel], prompt: Optional[ChatPromptTemplate] = None) -> List[BaseModel]:
+        """Concurrent invoke_structured; each failed item gets its own repair attempt"""
+        results = self.invoke_batch(inputs, chain=self.structured_chain(schema, prompt))
+        return [self._validated(result, schema) for result in results]
+
+    def _validated(self, result: Dict[str, Any], schema: Type[BaseModel]) -> BaseModel:
+        structured_output_metrics.record(self.name, "calls")
+        if result.get("parsed") is not None:
+            return result["parsed"]
+            
+        structured_output_metrics.record(self.name, "parse_failures")
+        error = result.get("parsing_error") or "No structured output was returned"
+        raw = result.get("raw")
+        output_parts = [str(getattr(raw, "content", "") or "")]
+        for call in (getattr(raw, "tool_calls", None) or []) + (getattr(raw, "invalid_tool_calls", None) or []):
+            args = call.get("args")
+            output_parts.append(args if isinstance(args, str) else json.dumps(args))
+        print(f"[{self.name}] Structured output invalid ({error}); attempting repair...")
+        
+        repaired = self.invoke(
+            {"error": str(error), "output": "\n".join(p for p in output_parts if p)},
+            chain=self.structured_chain(schema, REPAIR_PROMPT)
+        )
+        if repaired.get("parsed") is not None:
+            structured_output_metrics.record(self.name, "repaired")
+            return repaired["parsed"]
+            
+        structured_output_metrics.record(self.name, "failed")
+        raise ValueError(f"Agent {self.name} returned invalid {schema.__name__}: {repaired.get('parsing_error')}")
@@ -0,0 +1,226 @@
+import contextvars
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from config import Config
+
+# Active (run_id, stage) for calls made by the current node; see CostAccountant.scope
+_current_scope: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("cost_scope", default=None)
+
+_encoding = None
+_encoding_failed = False
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised before an LLM call when the run has used up its budget."""
+
+
+def root_run(run_id: str) -> str:
+    """Variant runs ('<run_id>.<variant>') are accounted to their parent run."""
+    return run_id.split(".", 1)[0]
+
+
+def count_tokens(texts: List[str]) -> int:
+    """
+    Token count for embedding inputs, which the embeddings API response does
+    not surface. Falls back to ~4 characters per token without tiktoken data.
+    """
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.encoding_for_model(Config.EMBEDDING_MODEL)
+        except Exception:
+            _encoding_failed = True
+    if _encoding is not None:
+        return sum(len(_encoding.encode(text)) for text in texts)
+    return sum(max(1, len(text) // 4) for text in texts)
+
+
+def price(model: str, input_tokens: int, output_tokens: int = 0, cached_tokens: int = 0) -> float:
+    """Dollar cost of a call from Config.MODEL_PRICES (USD per 1M tokens)."""
+    prices = Config.MODEL_PRICES.get(model)
+    if prices is None:
+        # Versioned names (e.g. gpt-4o-2024-08-06) bill as their base model
+        matches = [name for name in Config.MODEL_PRICES if model.startswith(name)]
+        prices = Config.MODEL_PRICES[max(matches, key=len)] if matches else {}
+    uncached = input_tokens - cached_tokens
+    return (
+        uncached * prices.get("input", 0)
+        + cached_tokens * prices.get("cached_input", prices.get("input", 0))
+        + output_tokens * prices.get("output", 0)
+    ) / 1_000_000
+
+
+def _empty_totals() -> Dict[str, float]:
+    return {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0, "embedding_tokens": 0, "cost": 0.0}
+
+
+class CostAccountant:
+    """
+    Per-run token and cost accounting with budget enforcement.
+
+    Nodes open a scope (run ID, stage, budget); LLM usage reported by
+    UsageCallbackHandler and embedding calls made through MeteredEmbeddings
+    are attributed to it. As a run approaches its budget ({"tokens": int,
+    "dollars": float}) agents degrade in steps:
+        - BUDGET_DOWNGRADE_AT: new agents use Config.BUDGET_FALLBACK_MODEL
+        - BUDGET_SHRINK_AT: retrieval sizes are scaled by BUDGET_CONTEXT_SCALE
+        - 100%: further LLM calls raise BudgetExceededError
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def _run(self, run_id: str) -> Dict:
+        # Caller holds the lock
+        root = root_run(run_id)
+        run = self._runs.get(root)
+        if run is None:
+            run = {"budget": None, "total": _empty_totals(), "by_stage": {}, "by_run": {}, "by_model": {}, "actions": []}
+            self._runs[root] = run
+            while len(self._runs) > Config.MAX_TRACKED_RUNS:
+                self._runs.popitem(last=False)
+        self._runs.move_to_end(root)
+        return run
+
+    @contextmanager
+    def scope(self, run_id: str, stage: str, budget: Optional[Dict] = None):
+        """Attribute calls in this block to a run and stage, and set the run's budget."""
+        with self._lock:
+            run = self._run(run_id)
+            if budget:
+                run["budget"] = budget
+        token = _current_scope.set({"run_id": run_id, "stage": stage})
+        try:
+            yield
+        finally:
+            _current_scope.reset(token)
+
+    def current(self) -> Optional[Dict]:
+        return _current_scope.get()
+
+    def record(
+        self,
+        scope: Optional[Dict],
+        model: str,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cached_tokens: int = 0,
+        embedding: bool = False
+    ) -> None:
+        if scope is None:
+            return
+        usage = {
+            "calls": 1,
+            "input_tokens": 0 if embedding else input_tokens,
+            "output_tokens": output_tokens,
+            "cached_tokens": cached_tokens,
+            "embedding_tokens": input_tokens if embedding else 0,
+            "cost": price(model, input_tokens, output_tokens, cached_tokens)
+        }
+        with self._lock:
+            run = self._run(scope["run_id"])
+            for totals in (
+                run["total"],
+                run["by_stage"].setdefault(scope["stage"], _empty_totals()),
+                run["by_run"].setdefault(scope["run_id"], _empty_totals()),
+                run["by_model"].setdefault(model, _empty_totals())
+            ):
+                for key, value in usage.items():
+                    totals[key] += value
+
+    def _usage_fraction(self, run: Dict) -> float:
+        budget = run["budget"] or {}
+        total = run["total"]
+        fractions = [0.0]
+        if budget.get("tokens"):
+            tokens = total["input_tokens"] + total["output_tokens"] + total["embedding_tokens"]
+            fractions.append(tokens / budget["tokens"])
+        if budget.get("dollars"):
+            fractions.append(total["cost"] / budget["dollars"])
+        return max(fractions)
+
+    def _scope_fraction(self) -> Optional[float]:
+        scope = self.current()
+        if scope is None:
+            return None
+        with self._lock:
+            return self._usage_fraction(self._run(scope["run_id"]))
+
+    def _note(self, action: str) -> None:
+        scope = self.current()
+        with self._lock:
+            run = self._run(scope["run_id"])
+            entry = {"action": action, "stage": scope["stage"]}
+            if entry not in run["actions"]:
+                run["actions"].append(entry)
+                print(f"[Budget] Run {scope['run_id']}: {action} at {scope['stage']} stage")
+
+    def model_name(self) -> str:
+        """Model for an agent created now: the fallback model once the run nears its budget."""
+        fraction = self._scope_fraction()
+        if fraction is not None and fraction >= Config.BUDGET_DOWNGRADE_AT:
+            self._note(f"downgraded model to {Config.BUDGET_FALLBACK_MODEL}")
+            return Config.BUDGET_FALLBACK_MODEL
+        return Config.MODEL_NAME
+
+    def scaled_k(self, k: int) -> int:
+        """Retrieval size, shrunk once the run nears its budget."""
+        fraction = self._scope_fraction()
+        if fraction is not None and fraction >= Config.BUDGET_SHRINK_AT:
+            self._note("shrank retrieval context")
+            return max(1, int(k * Config.BUDGET_CONTEXT_SCALE))
+        return k
+
+    def check(self) -> None:
+        """Raise BudgetExceededError if the current run has spent its budget."""
+        fraction = self._scope_fraction()
+        if fraction is not None and fraction >= 1.0:
+            self._note("aborted")
+            raise BudgetExceededError(f"Run budget exhausted ({fraction:.0%} used)")
+
+    def summary(self, run_id: str) -> Dict[str, Any]:
+        """Totals for a run and breakdowns by stage, (variant) run and model."""
+        with self._lock:
+            run = self._runs.get(root_run(run_id))
+            if run is None:
+                return {"total": _empty_totals(), "by_stage": {}, "by_run": {}, "by_model": {}, "budget": None, "actions": []}
+            summary = {
+                "total": dict(run["total"]),
+                "by_stage": {k: dict(v) for k, v in run["by_stage"].items()},
+                "by_run": {k: dict(v) for k, v in run["by_run"].items()},
+                "by_model": {k: dict(v) for k, v in run["by_model"].items()},
+                "budget": run["budget"],
+                "budget_used": round(self._usage_fraction(run), 3) if run["budget"] else None,
+                "actions": list(run["actions"])
+            }
+        for totals in [summary["total"], *summary["by_stage"].values(), *summary["by_run"].values(), *summary["by_model"].values()]:
+            totals["cost"] = round(totals["cost"], 6)
+        return summary
+
+
+cost_accountant = CostAccountant()
+
+
+class MeteredEmbeddings(Embeddings):
+    """Embeddings wrapper that charges each call's tokens to the active run."""
+
+    def __init__(self, embeddings: Embeddings, model: str):
+        self.embeddings = embeddings
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        result = self.embeddings.embed_documents(texts)
+        cost_accountant.record(cost_accountant.current(), self.model, input_tokens=count_tokens(texts), embedding=True)
+        return result
+
+    def embed_query(self, text: str) -> List[float]:
+        result = self.embeddings.embed_query(text)
+        cost_accountant.record(cost_accountant.current(), self.model, input_tokens=count_tokens([text]), embedding=True)
+        return result
@@ -1,18 +1,53 @@
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Optional, List
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from agents.base import BaseAgent
 from config import Config
-from vector_stores.chroma import ChromaDBManager
+from models import EditorResult
+from vector_stores.backend import create_vector_db
+from agents.sections import split_sections, join_sections, strip_heading
+from agents.prompts import domain_context
+
+DIVIDER = "---DIVIDER---"
+
+# Output instructions for the free-text (divider) and structured-output modes
+DIVIDER_OUTPUT_FORMAT = """Output Format:
+            Provide two sections separated by '---DIVIDER---':
+            1. The Polished {unit} (Markdown)
+            2. A summary of Changes Made (Bullet points)"""
+STRUCTURED_OUTPUT_FORMAT = """Output Format:
+            Return the Polished {unit} (Markdown) as `content` and each change made as an entry in `changes`."""
+
+def parse_change_notes(notes: str) -> List[str]:
+    """Split a bullet list of change notes into individual entries."""
+    changes = []
+    for line in notes.splitlines():
+        line = line.strip().lstrip("-*•").strip()
+        if line:
+            changes.append(line)
+    return changes
+
+def format_change_notes(changes: List[Dict]) -> str:
+    """Render per-section change notes as markdown."""
+    lines = []
+    for entry in changes:
+        if not entry["changes"]:
+            continue
+        if entry["section"]:
+            lines.append(f"{entry['section']}:")
+        lines.extend(f"- {c}" for c in entry["changes"])
+    return "\n".join(lines)
 
 class EditorAgent(BaseAgent):
     def __init__(self):
         super().__init__(name="Editor", temperature=Config.EDITOR_TEMP)
         
-        self.db = ChromaDBManager()
+        self.db = create_vector_db()
         self.parser = StrOutputParser()
         
-        self.prompt = ChatPromptTemplate.from_messages([
+        # Layout for prefix caching: static instructions, then the shared style
+        # guide block, then per-request brief and draft
+        edit_template = ChatPromptTemplate.from_messages([
             ("system", """You are an expert Content Editor. Your goal is to refine content to perfection.
             
             Inputs:
@@ -26,29 +61,82 @@ class EditorAgent(BaseAgent):
             - Fix grammar, flow, and clarity issues.
             - Do NOT change the core facts or meaning.
             
-            Output Format:
-            Provide two sections separated by '---DIVIDER---':
-            1. The Polished Content (Markdown)
-            2. A summary of Changes Made (Bullet points)
+            {output_format}
+            """),
+            ("system", """Style Guide:
+            {style_guide}
             """),
             ("user", """
             Brief:
             {brief}
             
-            Style Guide:
-            {style_guide}
+            Quality Feedback on Previous Attempt:
+            {feedback}
             
             Draft Content:
             {draft}
             """)
         ])
         
+        self.prompt = edit_template.partial(output_format=DIVIDER_OUTPUT_FORMAT.format(unit="Content"))
+        self.structured_prompt = edit_template.partial(output_format=STRUCTURED_OUTPUT_FORMAT.format(unit="Content"))
+        
         self.chain = self.prompt | self.llm | self.parser
+        
+        # Chunked mode: each H2 section is edited independently with the shared style guide
+        section_template = ChatPromptTemplate.from_messages([
+            ("system", """You are an expert Content Editor. You are editing ONE section of a longer article; other sections are edited separately.
+            
+            Inputs:
+            1. Section Content
+            2. Content Brief (requirements)
+            3. Style Guide (brand rules)
+            
+            Instructions:
+            - Check against the Style Guide (voice, formatting).
+            - Fix grammar, flow, and clarity issues.
+            - Keep the section heading line exactly as it is.
+            - Do NOT change the core facts or meaning, and do not add content from other sections.
+            
+            {output_format}
+            """),
+            ("system", """Style Guide:
+            {style_guide}
+            """),
+            ("user", """
+            Brief:
+            {brief}
+            
+            Quality Feedback on Previous Attempt:
+            {feedback}
+            
+            Section Content:
+            {section}
+            """)
+        ])
+        
+        self.section_prompt = section_template.partial(output_format=DIVIDER_OUTPUT_FORMAT.format(unit="Section"))
+        self.structured_section_prompt = section_template.partial(output_format=STRUCTURED_OUTPUT_FORMAT.format(unit="Section"))
+        
+        self.section_chain = self.section_prompt | self.llm | self.parser
 
-    def edit(self, draft: str, brief: Dict) -> Tuple[str, str]:
+    def edit(
+        self,
+        draft: str,
+        brief: Dict,
+        feedback: Optional[str] = None,
+        structured: Optional[bool] = None,
+        style_guide: Optional[str] = None
+    ) -> Tuple[str, str]:
         """
         Edits the draft content.
         
+        Args:
+            feedback: Quality gate feedback when re-editing a failed edit.
+            structured: Use native structured output instead of the divider
+                format (defaults to Config.STRUCTURED_OUTPUT).
+            style_guide: Style guide already retrieved by the research stage.
+        
         Returns:
             Tuple containing:
             1. Edited content
@@ -56,21 +144,27 @@ class EditorAgent(BaseAgent):
         """
         # Retrieve Style Guide info
         # In a real scenario, we might query based on specific sections needed
-        # For now, retrieve general voice/formatting guidelines
-        style_docs = self.db.query("style", "brand voice formatting", k=2)
-        style_guide_text = "\n\n".join([d.page_content for d in style_docs])
+        # For now, retrieve general voice/formatting guidelines (shared by every
+        # request, so the prompt prefix containing it is cacheable)
+        style_guide_text = style_guide if style_guide is not None else domain_context(self.db, "style", brief)
         
         input_data = {
             "draft": draft,
             "brief": str(brief),
-            "style_guide": style_guide_text
+            "style_guide": style_guide_text,
+            "feedback": feedback or "None"
         }
         
+        if Config.STRUCTURED_OUTPUT if structured is None else structured:
+            result = self.invoke_structured(input_data, EditorResult, prompt=self.structured_prompt)
+            notes = "\n".join(f"- {c}" for c in result.changes) or "Editor provided no specific notes."
+            return result.content.strip(), notes
+        
         result_text = self.invoke(input_data)
         
         # Parse logic to separate content from notes
-        if "---DIVIDER---" in result_text:
-            parts = result_text.split("---DIVIDER---")
+        if DIVIDER in result_text:
+            parts = result_text.split(DIVIDER)
             edited_content = parts[0].strip()
             notes = parts[1].strip()
         else:
@@ -79,3 +173,64 @@ class EditorAgent(BaseAgent):
             notes = "Editor provided no specific notes."
             
         return edited_content, notes
+
+    def edit_chunked(
+        self,
+        draft: str,
+        brief: Dict,
+        feedback: Optional[str] = None,
+        structured: Optional[bool] = None,
+        style_guide: Optional[str] = None
+    ) -> Tuple[str, List[Dict]]:
+        """
+        Edits a long draft section by section. The draft is split at H2
+        boundaries and all sections are edited concurrently against the same
+        style guide, then merged back in order.
+        
+        Returns:
+            Tuple containing:
+            1. Edited content
+            2. Structured change notes: [{"section": heading, "changes": [...]}]
+        """
+        style_guide_text = style_guide if style_guide is not None else domain_context(self.db, "style", brief)
+        
+        sections = split_sections(draft)
+        inputs = [
+            {
+                "section": section["content"],
+                "brief": str(brief),
+                "style_guide": style_guide_text,
+                "feedback": feedback or "None"
+            }
+            for section in sections
+        ]
+        if Config.STRUCTURED_OUTPUT if structured is None else structured:
+            results = self.invoke_structured_batch(inputs, EditorResult, prompt=self.structured_section_prompt)
+            edits = [(r.content, r.changes) for r in results]
+        else:
+            edits = []
+            for result_text in self.invoke_batch(inputs, chain=self.section_chain):
+                # A missing divider only loses this section's notes
+                if DIVIDER in result_text:
+                    content, notes = result_text.split(DIVIDER, 1)
+                else:
+                    content, notes = result_text, ""
+                edits.append((content, parse_change_notes(notes)))
+        
+        edited_sections = []
+        changes = []
+        for section, (content, section_changes) in zip(sections, edits):
+            content = content.strip() or section["content"]
+            
+            # Keep the original heading so outline matching stays stable
+            if section["heading"]:
+                heading_line = section["content"].splitlines()[0]
+                content = "\n".join([heading_line, strip_heading(content, section["heading"])]).strip()
+            
+            edited_sections.append({"heading": section["heading"], "content": content})
+            changes.append({
+                "section": section["heading"] or "Introduction",
+                "changes": section_changes
+            })
+            
+        return join_sections(edited_sections), changes
@@ -0,0 +1,114 @@
+import threading
+from collections import defaultdict
+from typing import Any, Dict
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from agents.costs import cost_accountant
+
+# Prefix hashes remembered for local hit tracking before the set is reset
+MAX_TRACKED_PREFIXES = 10000
+
+
+class PromptCacheMetrics:
+    """
+    Per-agent prompt prefix metrics.
+    
+    Tracks local prefix hits (the static prefix was already sent in this
+    process, so the provider could serve it from cache) and the cached input
+    tokens actually reported by the provider.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prefixes = set()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        
+    def record_prefix(self, agent: str, prefix: str) -> None:
+        with self._lock:
+            stats = self._stats[agent]
+            stats["calls"] += 1
+            if prefix in self._prefixes:
+                stats["prefix_hits"] += 1
+            else:
+                if len(self._prefixes) >= MAX_TRACKED_PREFIXES:
+                    self._prefixes.clear()
+                self._prefixes.add(prefix)
+                
+    def record_usage(self, agent: str, usage: Dict[str, Any]) -> None:
+        details = usage.get("input_token_details") or {}
+        with self._lock:
+            stats = self._stats[agent]
+            stats["input_tokens"] += usage.get("input_tokens", 0)
+            stats["cached_tokens"] += details.get("cache_read", 0) or 0
+            
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Current metrics per agent, with hit rates."""
+        with self._lock:
+            result = {}
+            for agent, stats in self._stats.items():
+                calls = stats.get("calls", 0)
+                input_tokens = stats.get("input_tokens", 0)
+                result[agent] = {
+                    **stats,
+                    "prefix_hit_rate": round(stats.get("prefix_hits", 0) / calls, 3) if calls else 0.0,
+                    "cached_token_rate": round(stats.get("cached_tokens", 0) / input_tokens, 3) if input_tokens else 0.0
+                }
+            return result
+            
+    def reset(self) -> None:
+        with self._lock:
+            self._prefixes.clear()
+            self._stats.clear()
+
+
+prompt_cache_metrics = PromptCacheMetrics()
+
+
+class StructuredOutputMetrics:
+    """Per-agent structured output outcomes: calls, parse failures, repairs and hard failures."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        
+    def record(self, agent: str, event: str) -> None:
+        with self._lock:
+            self._stats[agent][event] += 1
+            
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {agent: dict(stats) for agent, stats in self._stats.items()}
+            
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+structured_output_metrics = StructuredOutputMetrics()
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """
+    Reads token usage from each chat model response of an agent and
+    attributes it to the run and stage that were active when the call started.
+    """
+    
+    def __init__(self, agent: str, model: str):
+        self.agent = agent
+        self.model = model
+        self.scope = cost_accountant.current()
+        
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    prompt_cache_metrics.record_usage(self.agent, usage)
+                    metadata = getattr(generation.message, "response_metadata", None) or {}
+                    cost_accountant.record(
+                        self.scope,
+                        metadata.get("model_name") or self.model,
+                        input_tokens=usage.get("input_tokens", 0),
+                        output_tokens=usage.get("output_tokens", 0),
+                        cached_tokens=(usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+                    )
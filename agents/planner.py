@@ -1,6 +1,12 @@
+import json
+from typing import Callable, List, Optional
+from pydantic import ValidationError
+from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.output_parsers.openai_tools import JsonOutputKeyToolsParser
 from agents.base import BaseAgent
+from agents.prompts import format_instructions
 from models import ContentBrief
 from config import Config
 
@@ -9,7 +15,8 @@ class PlannerAgent(BaseAgent):
         super().__init__(name="Planner", temperature=Config.PLANNER_TEMP)
         self.parser = JsonOutputParser(pydantic_object=ContentBrief)
         
-        self.prompt = ChatPromptTemplate.from_messages([
+        # Static instructions and schema first so the prefix is cacheable
+        plan_template = ChatPromptTemplate.from_messages([
             ("system", """You are an expert Content Strategist. Your goal is to plan high-quality, SEO-optimized content.
             
             Given a content request, you must create a detailed brief.
@@ -18,22 +25,90 @@ class PlannerAgent(BaseAgent):
             1. User Intent: What do they actually want?
             2. Target Audience: Who is this for?
             3. Tone/Voice: What is the appropriate style?
+            4. Research: Which queries and knowledge base topics will ground the content?
             
-            Output strictly valid JSON that matches this schema:
-            {format_instructions}
+            {output_format}
             """),
             ("user", "{content_request}")
         ])
+        self.prompt = plan_template.partial(
+            output_format=f"Output strictly valid JSON that matches this schema:\n{format_instructions(ContentBrief)}"
+        )
+        # Structured mode: the schema is bound as a tool, so it is not repeated in the prompt
+        self.structured_prompt = plan_template.partial(output_format="Return the brief using the provided schema.")
         
         # Build chain: Prompt -> LLM -> JSON Parser
         self.chain = self.prompt | self.llm | self.parser
 
-    def plan(self, content_request: str) -> dict:
+    def plan(self, content_request: str, structured: Optional[bool] = None) -> dict:
         """
         Generates a content brief from a user request.
+        
+        Args:
+            structured: Use native structured output validated against
+                ContentBrief (defaults to Config.STRUCTURED_OUTPUT).
         """
         input_data = {
-            "content_request": content_request,
-            "format_instructions": self.parser.get_format_instructions()
+            "content_request": content_request
         }
+        if Config.STRUCTURED_OUTPUT if structured is None else structured:
+            return self.invoke_structured(input_data, ContentBrief, prompt=self.structured_prompt).model_dump()
         return self.invoke(input_data)
+
+    def plan_streaming(
+        self,
+        content_request: str,
+        on_query: Callable[[str, Optional[List[str]]], None],
+        structured: Optional[bool] = None
+    ) -> dict:
+        """
+        Generates a content brief while streaming it, calling on_query for each
+        research query as soon as it is complete, so retrieval can start before
+        the rest of the brief is generated.
+        
+        Args:
+            on_query: Called with (query, research_topics). Topics are None
+                while the topic list itself is still streaming.
+            structured: Stream native tool-call arguments validated against
+                ContentBrief (defaults to Config.STRUCTURED_OUTPUT).
+        """
+        input_data = {
+            "content_request": content_request
+        }
+        structured = Config.STRUCTURED_OUTPUT if structured is None else structured
+        if structured:
+            chain = (
+                self.structured_prompt
+                | self.llm.bind_tools([ContentBrief], tool_choice=ContentBrief.__name__)
+                | JsonOutputKeyToolsParser(key_name=ContentBrief.__name__, first_tool_only=True)
+            )
+        else:
+            chain = self.chain
+            
+        emitted = set()
+        brief = {}
+        for partial in self.stream(input_data, chain):
+            if not isinstance(partial, dict):
+                continue
+            brief = partial
+            keys = list(partial)
+            queries = partial.get("research_queries") or []
+            # The last key may still be streaming; everything before it is complete
+            if keys and keys[-1] == "research_queries":
+                queries = queries[:-1]
+            topics = partial.get("research_topics")
+            if "research_topics" not in keys or keys[-1] == "research_topics":
+                topics = None
+            for query in queries:
+                if isinstance(query, str) and query.strip() and query not in emitted:
+                    emitted.add(query)
+                    on_query(query, topics)
+                    
+        if not structured:
+            return brief
+        try:
+            parsed, error = ContentBrief.model_validate(brief), None
+        except ValidationError as e:
+            parsed, error = None, str(e)
+        result = {"parsed": parsed, "parsing_error": error, "raw": AIMessage(content=json.dumps(brief))}
+        return self._validated(result, ContentBrief).model_dump()
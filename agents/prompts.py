@@ -0,0 +1,93 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Type
+from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+from config import Config
+from agents.costs import cost_accountant
+
+# Shared retrieval blocks (style guide, competitor data) cached per process
+SHARED_BLOCK_CACHE_SIZE = 256
+_shared_blocks: "OrderedDict[tuple, str]" = OrderedDict()
+_shared_lock = threading.Lock()
+
+# Single repair attempt for structured output that failed validation
+REPAIR_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You repair structured output that failed schema validation.
+    
+    Return the same information as a valid object of the required schema.
+    Keep all content; only fix structure, types, and missing required fields.
+    """),
+    ("user", """
+    Validation Error:
+    {error}
+    
+    Previous Output:
+    {output}
+    """)
+])
+
+
+@lru_cache(maxsize=None)
+def format_instructions(model: Type[BaseModel]) -> str:
+    """
+    JSON format instructions for a schema, computed once per process so the
+    system prompt that embeds them is byte-identical across calls.
+    """
+    return JsonOutputParser(pydantic_object=model).get_format_instructions()
+
+
+def shared_block(db, collection_name: str, query_text: str, k: int) -> str:
+    """
+    Retrieve a context block shared by many requests (e.g. the brand style
+    guide) once per collection version, so every prompt in a batch carries the
+    exact same text and the provider can cache the prefix that contains it.
+    """
+    key = (db.persist_path, getattr(db, "snapshot_version", None), collection_name, query_text, k)
+    with _shared_lock:
+        if key in _shared_blocks:
+            _shared_blocks.move_to_end(key)
+            return _shared_blocks[key]
+
+    docs = db.query(collection_name, query_text, k=k)
+    block = "\n\n".join(d.page_content for d in docs)
+
+    with _shared_lock:
+        _shared_blocks[key] = block
+        if len(_shared_blocks) > SHARED_BLOCK_CACHE_SIZE:
+            _shared_blocks.popitem(last=False)
+    return block
+
+
+def domain_query(domain: str, brief: Dict) -> str:
+    """Retrieval query for a context domain, filled in from the brief."""
+    keywords = brief.get("seo_keywords", [])
+    keywords_str = ", ".join(keywords) if isinstance(keywords, list) else str(keywords)
+    return Config.CONTEXT_DOMAINS[domain]["query"].format(
+        title=brief.get("title", ""),
+        keywords=keywords_str
+    )
+
+
+def domain_context(db, domain: str, brief: Dict) -> str:
+    """Context block for a domain (writing samples, style guide, competitor data)."""
+    spec = Config.CONTEXT_DOMAINS[domain]
+    return shared_block(db, spec["collection"], domain_query(domain, brief), k=cost_accountant.scaled_k(spec["k"]))
+
+
+def prefix_hash(messages: List[BaseMessage]) -> str:
+    """
+    Hash of the cacheable prompt prefix: every message except the last, which
+    carries the per-request content.
+    """
+    digest = hashlib.sha1()
+    for message in messages[:-1]:
+        digest.update(message.type.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(str(message.content).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
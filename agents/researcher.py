@@ -1,16 +1,120 @@
-from typing import List, Tuple, Dict
+import contextvars
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Tuple, Dict, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from agents.base import BaseAgent
+from agents.costs import cost_accountant
 from vector_stores.chroma import ChromaDBManager
+from vector_stores.backend import create_vector_db
+from vector_stores.dedupe import dedupe_documents, merge_chunks
+from vector_stores.memos import get_memo_store
 from config import Config
 
+# Speculations not yet collected by a research stage (e.g. the run failed after planning)
+MAX_PENDING_SPECULATIONS = 100
+
+def query_documents(
+    db: ChromaDBManager,
+    query: str,
+    topics: Optional[List[str]] = None,
+    tenant: Optional[str] = None,
+    embedding: Optional[List[float]] = None
+) -> List[Dict]:
+    """Raw retrieval results for one research query, tagged with the query."""
+    results = db.query_multireturn(
+        "research", query, k=cost_accountant.scaled_k(Config.RETRIEVAL_K), shards=topics, tenant=tenant, embedding=embedding
+    )
+    for r in results:
+        r["query"] = query
+    return results
+
+def _scope(topics: Optional[List[str]]) -> Optional[tuple]:
+    return tuple(sorted(topics)) if topics else None
+
+class SpeculativeRetrieval:
+    """
+    Embeds and retrieves research queries in the background as the planner
+    streams them, before the brief is complete.
+    
+    collect() reconciles against the final brief: results for queries that
+    survived with the same topic scope are reused, results for queries that
+    were dropped or retrieved under different topics are discarded, and the
+    research stage retrieves whatever is missing as usual.
+    """
+    
+    def __init__(self, tenant: Optional[str] = None):
+        self.db = create_vector_db()
+        self.tenant = tenant
+        self._executor = ThreadPoolExecutor(max_workers=Config.SPECULATION_MAX_WORKERS)
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Tuple[Optional[tuple], Future]] = {}
+        
+    def submit(self, query: str, topics: Optional[List[str]] = None) -> None:
+        with self._lock:
+            if query in self._futures:
+                return
+            # Carry the run's cost scope into the worker thread
+            context = contextvars.copy_context()
+            future = self._executor.submit(context.run, self._fetch, query, topics)
+            self._futures[query] = (_scope(topics), future)
+            
+    def _fetch(self, query: str, topics: Optional[List[str]]) -> Dict:
+        embedding = self.db.embedding_function.embed_query(query)
+        return {"embedding": embedding, "docs": query_documents(self.db, query, topics, self.tenant, embedding)}
+        
+    def collect(self, queries: List[str], topics: Optional[List[str]] = None) -> Tuple[Dict[str, Dict], Dict]:
+        """
+        Wait for speculative results that match the final queries and topics.
+        
+        Returns:
+            (prefetched {query: {"embedding", "docs"}}, stats {"reused", "discarded", "failed"})
+        """
+        prefetched = {}
+        stats = {"reused": 0, "discarded": 0, "failed": 0}
+        with self._lock:
+            futures = dict(self._futures)
+        for query, (scope, future) in futures.items():
+            if query not in queries or scope != _scope(topics):
+                future.cancel()
+                stats["discarded"] += 1
+                continue
+            try:
+                prefetched[query] = future.result()
+                stats["reused"] += 1
+            except Exception as e:
+                print(f"[Research] Speculative retrieval failed for '{query}': {e}")
+                stats["failed"] += 1
+        self.close()
+        return prefetched, stats
+        
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+_speculations: "OrderedDict[str, SpeculativeRetrieval]" = OrderedDict()
+_speculations_lock = threading.Lock()
+
+def start_speculation(run_id: str, tenant: Optional[str] = None) -> SpeculativeRetrieval:
+    """Begin speculative retrieval for a run; the research stage takes it over."""
+    speculation = SpeculativeRetrieval(tenant)
+    with _speculations_lock:
+        _speculations[run_id] = speculation
+        while len(_speculations) > MAX_PENDING_SPECULATIONS:
+            _speculations.popitem(last=False)[1].close()
+    return speculation
+
+def take_speculation(run_id: Optional[str]) -> Optional[SpeculativeRetrieval]:
+    with _speculations_lock:
+        return _speculations.pop(run_id, None) if run_id else None
+
 class ResearchAgent(BaseAgent):
     def __init__(self):
         super().__init__(name="Research", temperature=Config.RESEARCHER_TEMP)
         
         # Initialize Vector DB access
-        self.db = ChromaDBManager()
+        self.db = create_vector_db()
         
         # Output parser
         self.parser = StrOutputParser()
@@ -36,45 +140,141 @@ class ResearchAgent(BaseAgent):
         ])
         
         self.chain = self.prompt | self.llm | self.parser
+        
+        # Extends an existing research memo with findings for new queries
+        self.extend_prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are an expert Research Analyst. Your goal is to provide accurate, factual information based ONLY on the provided context.
+            
+            You will be given an existing research summary, additional queries, and the documents retrieved for them.
+            
+            Extend the existing summary with the new findings.
+            - Keep all existing findings and citations unless the new context contradicts them.
+            - Cite your sources where possible (using 'Source: [Title]').
+            - If the information is conflicting, note the discrepancy.
+            
+            Output the complete updated summary as markdown.
+            """),
+            ("user", """
+            Existing Summary:
+            {summary}
+            
+            Additional Queries: {queries}
+            
+            Retrieved Context:
+            {context}
+            """)
+        ])
+        
+        self.extend_chain = self.extend_prompt | self.llm | self.parser
+        
+        # How the last research() call used the memo store, and the source
+        # references (without content) of the memo it reused or extended
+        self.memo_status = "disabled"
+        self.memo_sources: List[Dict] = []
 
-    def research(self, queries: List[str]) -> Tuple[str, List[Dict]]:
+    def research(
+        self,
+        queries: List[str],
+        topics: Optional[List[str]] = None,
+        tenant: Optional[str] = None,
+        use_memos: Optional[bool] = None,
+        prefetched: Optional[Dict[str, Dict]] = None
+    ) -> Tuple[str, List[Dict]]:
         """
         Conducts research by querying the vector store and synthesizing findings.
         
+        With research memos enabled, a memo built from a sufficiently similar
+        query set (against the same collection version) is reused outright, or
+        extended with retrieval and synthesis for only the queries it does not
+        cover. Sources of a reused memo are not returned with the documents; their
+        references (without content) are left in `self.memo_sources`.
+        
+        Args:
+            queries: Research queries from the brief.
+            topics: Topic hints from the brief, used to route queries to topic shards.
+            tenant: Optional tenant whose sub-collections are searched.
+            use_memos: Override Config.RESEARCH_MEMOS.
+            prefetched: Embeddings and documents already retrieved per query
+                (see SpeculativeRetrieval); only the rest are fetched here.
+        
         Returns:
             Tuple containing:
             1. Synthesized summary string
-            2. List of unique retrieved documents (dictionaries)
+            2. List of unique documents retrieved by this call (dictionaries)
         """
-        all_docs = []
-        context_parts = []
+        use_memos = Config.RESEARCH_MEMOS if use_memos is None else use_memos
+        self.memo_status = "disabled"
+        self.memo_sources = []
         
-        # 1. Retrieve documents for each query
-        for q in queries:
+        # Embed all queries in one batch; reused for retrieval and memo matching
+        prefetched = prefetched or {}
+        try:
+            missing = [q for q in queries if q not in prefetched]
+            fresh = dict(zip(missing, self.db.embedding_function.embed_documents(missing))) if missing else {}
+            embeddings = [prefetched[q]["embedding"] if q in prefetched else fresh[q] for q in queries]
+        except Exception as e:
+            print(f"[{self.name}] Error embedding queries: {e}")
+            embeddings = [None] * len(queries)
+            use_memos = False
+        
+        match = None
+        if use_memos:
             try:
-                # Query the 'research' collection
-                results = self.db.query_multireturn("research", q, k=Config.RETRIEVAL_K)
-                
-                if results:
-                    context_parts.append(f"--- Results for query: '{q}' ---")
-                    for r in results:
-                        # Format context for the LLM
-                        source = r.get("metadata", {}).get("title") or r.get("source", "Unknown")
-                        content = r.get("content", "").strip()
-                        context_parts.append(f"Source: {source}\nContent: {content}\n")
-                        
-                        # Add to unique docs list (deduplicating by content content/source somewhat crudely)
-                        if r not in all_docs:
-                            all_docs.append(r)
+                store = get_memo_store()
+                scope = {"topics": sorted(topics or []), "tenant": tenant}
+                fingerprint = self.db.collection_fingerprint("research", tenant)
+                store.invalidate(fingerprint, tenant)
+                match = store.lookup(queries, embeddings, fingerprint, scope)
+                self.memo_status = "created"
             except Exception as e:
-                print(f"[{self.name}] Error querying DB for '{q}': {e}")
+                print(f"[{self.name}] Memo store unavailable: {e}")
+                use_memos = False
+                
+        if match and not match[1]:
+            memo = match[0]
+            print(f"[{self.name}] Reusing research memo {memo['id']}")
+            self.memo_status = "reused"
+            self.memo_sources = memo["sources"]
+            return memo["summary"], []
+            
+        pending = match[1] if match else queries
+        pending_embeddings = [e for q, e in zip(queries, embeddings) if q in pending]
+        
+        # 1-2. Retrieve, dedupe and merge
+        all_docs = self.retrieve(pending, topics, tenant, pending_embeddings, prefetched)
         
-        if not context_parts:
+        if match:
+            memo = match[0]
+            self.memo_status = "extended"
+            fetched = {doc["id"] for doc in all_docs}
+            self.memo_sources = [ref for ref in memo["sources"] if ref["id"] not in fetched]
+            if not all_docs:
+                return memo["summary"], []
+            # 3. Extend the memo with findings for the uncovered queries only
+            summary = self.invoke({
+                "summary": memo["summary"],
+                "queries": "\n- ".join(pending),
+                "context": self.format_context(all_docs)
+            }, chain=self.extend_chain)
+            new_refs = self.source_refs(all_docs)
+            known = {ref["id"] for ref in memo["sources"]}
+            store.save(
+                memo["queries"] + pending,
+                [*memo["query_embeddings"], *pending_embeddings],
+                summary,
+                memo["sources"] + [ref for ref in new_refs if ref["id"] not in known],
+                fingerprint,
+                scope,
+                memo_id=memo["id"]
+            )
+            return summary, all_docs
+        
+        if not all_docs:
             return "No relevant documents found in the knowledge base.", []
             
-        full_context = "\n".join(context_parts)
+        full_context = self.format_context(all_docs)
         
-        # 2. Synthesize with LLM
+        # 3. Synthesize with LLM
         input_data = {
             "queries": "\n- ".join(queries),
             "context": full_context
@@ -82,4 +282,64 @@ class ResearchAgent(BaseAgent):
         
         summary = self.invoke(input_data)
         
+        if use_memos:
+            store.save(queries, embeddings, summary, self.source_refs(all_docs), fingerprint, scope)
+        
         return summary, all_docs
+
+    def retrieve(
+        self,
+        queries: List[str],
+        topics: Optional[List[str]] = None,
+        tenant: Optional[str] = None,
+        embeddings: Optional[List[List[float]]] = None,
+        prefetched: Optional[Dict[str, Dict]] = None
+    ) -> List[Dict]:
+        """
+        Retrieves documents for each query, deduped by chunk ID with overlapping
+        chunks from the same source merged. Queries with prefetched documents
+        are not queried again.
+        """
+        retrieved = []
+        embeddings = embeddings or [None] * len(queries)
+        prefetched = prefetched or {}
+        
+        # 1. Retrieve documents for each query
+        for q, embedding in zip(queries, embeddings):
+            if q in prefetched:
+                retrieved.extend(prefetched[q]["docs"])
+                continue
+            try:
+                # Query the 'research' collection
+                retrieved.extend(query_documents(self.db, q, topics, tenant, embedding))
+            except Exception as e:
+                print(f"[{self.name}] Error querying DB for '{q}': {e}")
+        
+        # 2. Dedupe by chunk ID and merge overlapping chunks from the same source
+        return merge_chunks(dedupe_documents(retrieved))
+
+    @staticmethod
+    def source_refs(docs: List[Dict]) -> List[Dict]:
+        """Lightweight references to source documents, as stored in memos."""
+        return [
+            {
+                "id": doc["id"],
+                "source": doc.get("source", "unknown"),
+                "title": doc.get("metadata", {}).get("title", "")
+            }
+            for doc in docs
+        ]
+
+    @staticmethod
+    def format_context(docs: List[Dict]) -> str:
+        """
+        Format merged documents for the LLM, each passage appearing once with
+        the queries it matched.
+        """
+        context_parts = []
+        for doc in docs:
+            source = doc.get("metadata", {}).get("title") or doc.get("source", "Unknown")
+            content = doc.get("content", "").strip()
+            queries = ", ".join(f"'{q}'" for q in doc.get("queries", []))
+            context_parts.append(f"Source: {source}\nMatched queries: {queries}\nContent: {content}\n")
+        return "\n".join(context_parts)
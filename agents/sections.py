@@ -0,0 +1,123 @@
+import re
+from typing import Dict, List, Optional
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+STOPWORDS = {"a", "an", "and", "the", "of", "to", "in", "for", "on", "with", "your", "how", "what", "why"}
+
+
+def split_sections(markdown: str, level: int = 2) -> List[Dict]:
+    """
+    Split markdown into sections at headings of the given level.
+
+    Returns:
+        List of {"heading": str | None, "content": str} dicts. The first entry
+        holds any preamble (e.g. the H1 title and intro) and has heading None.
+        Content includes the heading line, so joining sections restores the text.
+    """
+    sections = [{"heading": None, "content": []}]
+    in_code = False
+    for line in markdown.splitlines():
+        if line.strip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else HEADING_PATTERN.match(line)
+        if match and len(match.group(1)) == level:
+            sections.append({"heading": match.group(2).strip(), "content": []})
+        sections[-1]["content"].append(line)
+
+    result = [{"heading": s["heading"], "content": "\n".join(s["content"]).strip()} for s in sections]
+    if not result[0]["content"]:
+        result = result[1:]
+    return result
+
+
+def join_sections(sections: List[Dict]) -> str:
+    """Reassemble sections produced by split_sections."""
+    return "\n\n".join(s["content"].strip() for s in sections if s["content"].strip())
+
+
+def _tokens(text: str) -> set:
+    text = re.sub(r"^\s*(\d+[\.\)]|[ivx]+\.)\s*", "", text.lower())
+    return set(re.findall(r"[a-z0-9]+", text)) - STOPWORDS
+
+
+def match_heading(outline_item: str, headings: List[Optional[str]]) -> Optional[int]:
+    """
+    Find the heading that best corresponds to an outline item, tolerating
+    numbering, punctuation and small wording changes.
+
+    Returns:
+        Index into `headings`, or None if no heading shares enough words.
+    """
+    wanted = _tokens(outline_item)
+    if not wanted:
+        return None
+    best, best_score = None, (0.0, 0.0)
+    for i, heading in enumerate(headings):
+        if heading is None:
+            continue
+        found = _tokens(heading)
+        if not found:
+            continue
+        shared = len(wanted & found)
+        # Containment decides the match; Jaccard breaks ties between candidates
+        score = (shared / min(len(wanted), len(found)), shared / len(wanted | found))
+        if score > best_score:
+            best, best_score = i, score
+    return best if best_score[0] >= 0.6 else None
+
+
+def strip_heading(content: str, heading: str) -> str:
+    """
+    Remove a leading heading-like line from an edited section body: an H1/H2
+    (however reworded), or a deeper heading or plain line (possibly bold or with
+    a trailing colon) that restates `heading`, as models do when rewording or
+    dropping the "##". Subheadings that open the body are kept.
+    """
+    lines = content.strip().splitlines()
+    if not lines:
+        return ""
+    first = lines[0].strip()
+    match = HEADING_PATTERN.match(first)
+    if match and len(match.group(1)) <= 2:
+        return "\n".join(lines[1:]).strip()
+    text = (match.group(2) if match else first).strip("*_").rstrip(":").strip()
+    # Containment alone would also match a body sentence that mentions the heading
+    if text and match_heading(text, [heading]) is not None and len(_tokens(text)) <= len(_tokens(heading)) + 2:
+        lines = lines[1:]
+    return "\n".join(lines).strip()
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+
+def splice_sections(draft: str, rewritten: str, outline: List[str]) -> str:
+    """
+    Replace or insert rewritten H2 sections into a draft.
+
+    Sections in `rewritten` that match an existing draft section replace it in
+    place; new ones are inserted after the section for the preceding outline
+    item (or appended), so the article keeps its outline order.
+    """
+    sections = split_sections(draft)
+    for new in split_sections(rewritten):
+        if new["heading"] is None:
+            continue
+        index = match_heading(new["heading"], [s["heading"] for s in sections])
+        if index is not None:
+            sections[index] = new
+            continue
+
+        position = len(sections)
+        outline_index = match_heading(new["heading"], outline)
+        if outline_index is not None:
+            for previous in reversed(outline[:outline_index]):
+                found = match_heading(previous, [s["heading"] for s in sections])
+                if found is not None:
+                    position = found + 1
+                    break
+            else:
+                # First outline section: goes right after the preamble
+                position = 1 if sections and sections[0]["heading"] is None else 0
+        sections.insert(position, new)
+    return join_sections(sections)
@@ -1,9 +1,10 @@
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from agents.base import BaseAgent
+from agents.prompts import format_instructions, domain_context
 from config import Config
-from vector_stores.chroma import ChromaDBManager
+from vector_stores.backend import create_vector_db
 from pydantic import BaseModel, Field
 
 class SEOMetadata(BaseModel):
@@ -13,14 +14,20 @@ class SEOMetadata(BaseModel):
     confidence: float = Field(description="Confidence score 0-1")
     url_slug: str = Field(description="Recommended URL slug")
 
+class SEOResult(BaseModel):
+    optimized_content: str = Field(description="The full optimized content (Markdown)")
+    metadata: SEOMetadata
+
 class SEOAgent(BaseAgent):
     def __init__(self):
         super().__init__(name="SEO", temperature=Config.SEO_TEMP)
         
-        self.db = ChromaDBManager()
+        self.db = create_vector_db()
         self.parser = JsonOutputParser(pydantic_object=SEOMetadata)
         
-        self.prompt = ChatPromptTemplate.from_messages([
+        # Layout for prefix caching: static instructions and schema, then the
+        # competitor data block shared across a keyword cluster, then the request
+        seo_template = ChatPromptTemplate.from_messages([
             ("system", """You are an expert SEO Specialist. Your goal is to optimize content for search engines without sacrificing readability.
             
             Inputs:
@@ -35,45 +42,61 @@ class SEOAgent(BaseAgent):
             - Ensure H1/H2 tags use keywords naturally.
             - Output the FINAL optimized content (Markdown) AND the Metadata (JSON).
             
-            Format your response strictly as a JSON object with two keys:
-            - "optimized_content": The full markdown string of the content.
-            - "metadata": The object matching the schema below.
-            
-            {format_instructions}
+            {output_format}
+            """),
+            ("system", """Competitor Data:
+            {competitor_data}
             """),
             ("user", """
             Brief Keywords: {keywords}
             
-            Competitor Data: {competitor_data}
-            
             Content to Optimize:
             {content}
             """)
         ])
+        self.prompt = seo_template.partial(output_format=f"""Format your response strictly as a JSON object with two keys:
+            - "optimized_content": The full markdown string of the content.
+            - "metadata": The object matching the schema below.
+            
+            {format_instructions(SEOMetadata)}""")
+        self.structured_prompt = seo_template.partial(
+            output_format="Return the optimized content as `optimized_content` and the metadata as `metadata`."
+        )
         
         # Override chain to just return the json result directly for now
         self.chain = self.prompt | self.llm | self.parser
 
-    def optimize(self, content: str, brief: Dict) -> Tuple[str, Dict]:
+    def optimize(
+        self,
+        content: str,
+        brief: Dict,
+        structured: Optional[bool] = None,
+        competitor_data: Optional[str] = None
+    ) -> Tuple[str, Dict]:
         """
         Optimizes content for SEO.
+        structured: Use native structured output (defaults to Config.STRUCTURED_OUTPUT).
+        competitor_data: Competitor data already retrieved by the research stage.
         Returns: (Optimized Content String, Metadata Dictionary)
         """
         # Get keywords from brief
         keywords = brief.get("seo_keywords", [])
         keywords_str = ", ".join(keywords) if isinstance(keywords, list) else str(keywords)
         
-        # Retrieve competitor info from 'seo' collection
-        seo_docs = self.db.query("seo", keywords_str, k=2)
-        competitor_data = "\n".join([d.page_content for d in seo_docs])
+        # Retrieve competitor info from 'seo' collection unless already provided
+        if competitor_data is None:
+            competitor_data = domain_context(self.db, "seo", brief)
         
         input_data = {
             "content": content,
             "keywords": keywords_str,
-            "competitor_data": competitor_data,
-            "format_instructions": self.parser.get_format_instructions()
+            "competitor_data": competitor_data
         }
         
+        if Config.STRUCTURED_OUTPUT if structured is None else structured:
+            result = self.invoke_structured(input_data, SEOResult, prompt=self.structured_prompt)
+            return result.optimized_content, result.metadata.model_dump()
+        
         result = self.invoke(input_data)
         
         # Parse result
@@ -1,16 +1,21 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from agents.base import BaseAgent
 from config import Config
-from vector_stores.chroma import ChromaDBManager
+from vector_stores.backend import create_vector_db
+from agents.sections import splice_sections
+from agents.prompts import domain_context
 
 class WriterAgent(BaseAgent):
-    def __init__(self):
-        super().__init__(name="Writer", temperature=Config.WRITER_TEMP)
+    def __init__(self, temperature: Optional[float] = None):
+        super().__init__(
+            name="Writer",
+            temperature=Config.WRITER_TEMP if temperature is None else temperature
+        )
         
-        # We can use RAG here to find writing samples if needed
-        self.db = ChromaDBManager()
+        # Used for writing samples only when the research stage did not provide them
+        self.db = create_vector_db()
         
         self.parser = StrOutputParser()
         
@@ -30,31 +35,115 @@ class WriterAgent(BaseAgent):
             
             Write the full article now.
             """),
+            ("system", """Writing Samples (match their voice, not their content):
+            {writing_samples}
+            """),
             ("user", """
             Brief:
             {brief}
             
             Research Findings:
             {research}
+            
+            Quality Feedback on Previous Attempt:
+            {feedback}
             """)
         ])
         
         self.chain = self.prompt | self.llm | self.parser
+        
+        # Partial rewrites: regenerate only failing sections against the frozen draft
+        self.section_prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are an expert Content Writer revising specific sections of an existing article.
+            
+            Inputs:
+            1. Content Brief: Contains the topic, audience, tone, and outline.
+            2. Research Summary: Contains the factual information to include.
+            3. Current Draft: The full article. Treat it as frozen context.
+            4. Sections to Rewrite: The only sections you may write.
+            
+            Instructions:
+            - Write ONLY the requested sections, each starting with its H2 heading (## Heading) exactly as named in the outline.
+            - Keep the tone, terminology, and flow consistent with the surrounding draft.
+            - Do not repeat content already covered in other sections.
+            - Do not invent facts; rely on the research provided.
+            - Output nothing except the rewritten sections in markdown.
+            """),
+            ("system", """Writing Samples (match their voice, not their content):
+            {writing_samples}
+            """),
+            ("user", """
+            Brief:
+            {brief}
+            
+            Research Findings:
+            {research}
+            
+            Current Draft:
+            {draft}
+            
+            Sections to Rewrite:
+            {sections}
+            
+            Quality Feedback on Previous Attempt:
+            {feedback}
+            """)
+        ])
+        
+        self.section_chain = self.section_prompt | self.llm | self.parser
 
-    def write(self, brief: Dict, research: str) -> str:
+    def write(
+        self,
+        brief: Dict,
+        research: str,
+        feedback: Optional[str] = None,
+        writing_samples: Optional[str] = None
+    ) -> str:
         """
         Generates content draft based on brief and research.
+        
+        Args:
+            feedback: Quality gate feedback when retrying a failed draft.
+            writing_samples: Writing samples already retrieved by the research stage.
         """
         # Convert brief dict to string representation for the prompt
         brief_str = str(brief)
         
-        # Optional: Retrieve a writing sample to guide style (simplistic implementation for now)
-        # style_docs = self.db.query("writing", "style guide", k=1)
-        # style_context = style_docs[0].page_content if style_docs else ""
-        
         input_data = {
             "brief": brief_str,
-            "research": research
+            "research": research,
+            "writing_samples": self._samples(brief, writing_samples),
+            "feedback": feedback or "None"
         }
         
         return self.invoke(input_data)
+
+    def _samples(self, brief: Dict, writing_samples: Optional[str]) -> str:
+        if writing_samples is None:
+            writing_samples = domain_context(self.db, "writing", brief)
+        return writing_samples or "None"
+
+    def rewrite_sections(
+        self,
+        brief: Dict,
+        research: str,
+        draft: str,
+        sections: List[str],
+        feedback: Optional[str] = None,
+        writing_samples: Optional[str] = None
+    ) -> str:
+        """
+        Regenerates only the given outline sections, using the rest of the draft
+        as frozen context, and splices them back into the draft.
+        """
+        input_data = {
+            "brief": str(brief),
+            "research": research,
+            "writing_samples": self._samples(brief, writing_samples),
+            "draft": draft,
+            "sections": "\n".join(f"- {s}" for s in sections),
+            "feedback": feedback or "None"
+        }
+        
+        rewritten = self.invoke(input_data, chain=self.section_chain)
+        return splice_sections(draft, rewritten, brief.get("outline", []))
@@ -0,0 +1,134 @@
+"""
+Measures per-article ContentState memory in full vs compact state mode.
+
+Runs a LangGraph pipeline with the real ContentState reducers and synthetic
+stage outputs (no LLM or vector store calls), checkpointing every step, and
+reports serialized checkpoint size and retained Python heap per article.
+"""
+import pickle
+import tracemalloc
+from langgraph.graph import StateGraph, END
+from langgraph.checkpoint.memory import InMemorySaver
+from config import Config
+from graph.state import ContentState
+from graph.compact import is_compact, compact_documents, log_entry
+from vector_stores.doc_store import document_store
+
+ARTICLES = 50
+QUERIES = 5
+CHUNK_CHARS = 1000
+SHARED_CORPUS = 40  # Articles in a topic cluster retrieve overlapping chunks
+
+
+def make_docs(article: int):
+    docs = []
+    for q in range(QUERIES):
+        for k in range(Config.RETRIEVAL_K):
+            n = (article * 7 + q * Config.RETRIEVAL_K + k) % SHARED_CORPUS
+            docs.append({
+                "content": f"chunk {n} " + "lorem ipsum dolor sit amet " * (CHUNK_CHARS // 27),
+                "metadata": {"source": f"doc_{n}.txt", "title": f"Document {n}", "topic": "health"},
+                "source": f"doc_{n}.txt"
+            })
+    return docs
+
+
+def build_graph():
+    brief = {
+        "title": "Guide to Green Tea",
+        "target_audience": "Health enthusiasts",
+        "tone": "Informative",
+        "word_count_target": 1500,
+        "outline": [f"Section {i}" for i in range(8)],
+        "seo_keywords": ["green tea", "antioxidants", "caffeine"],
+        "specifications": "Cite sources. " * 50
+    }
+    draft = "Green tea is rich in polyphenols. " * 300
+    metadata = {
+        "title": "Green Tea Benefits",
+        "meta_description": "Everything about green tea. " * 5,
+        "keywords_used": ["green tea", "antioxidants"],
+        "confidence": 0.9,
+        "url_slug": "green-tea-benefits"
+    }
+
+    def planner(state):
+        return {"brief": brief, "agent_logs": [log_entry(state, "planner", output=brief)]}
+
+    def researcher(state):
+        docs = make_docs(state["settings"]["article"])
+        return {
+            "research_findings": "Findings. " * 200,
+            "retrieved_documents": compact_documents(docs, str(state["settings"]["article"])) if is_compact(state) else docs,
+            "agent_logs": [log_entry(state, "research", document_count=len(docs))]
+        }
+
+    def writer(state):
+        return {"draft_content": draft, "agent_logs": [log_entry(state, "writer", word_count=len(draft.split()))]}
+
+    def editor(state):
+        notes = "- Tightened wording.\n" * 40
+        return {"edited_content": draft, "edit_notes": notes,
+                "agent_logs": [log_entry(state, "editor", changes_made=notes)]}
+
+    def seo(state):
+        return {"final_content": draft, "seo_metadata": metadata,
+                "agent_logs": [log_entry(state, "seo", metadata=metadata)]}
+
+    workflow = StateGraph(ContentState)
+    for name, fn in [("planner", planner), ("researcher", researcher), ("writer", writer),
+                     ("editor", editor), ("seo", seo)]:
+        workflow.add_node(name, fn)
+    workflow.set_entry_point("planner")
+    workflow.add_edge("planner", "researcher")
+    workflow.add_edge("researcher", "writer")
+    workflow.add_edge("writer", "editor")
+    workflow.add_edge("editor", "seo")
+    workflow.add_edge("seo", END)
+    return workflow
+
+
+def run(compact: bool):
+    document_store.clear()
+    saver = InMemorySaver()
+    app = build_graph().compile(checkpointer=saver)
+
+    tracemalloc.start()
+    for article in range(ARTICLES):
+        app.invoke(
+            {"content_request": f"Article {article}",
+             "settings": {"compact_state": compact, "article": article}},
+            config={"configurable": {"thread_id": str(article)}}
+        )
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    checkpoint_bytes = 0
+    final_state_bytes = 0
+    for article in range(ARTICLES):
+        config = {"configurable": {"thread_id": str(article)}}
+        for snapshot in app.get_state_history(config):
+            checkpoint_bytes += len(pickle.dumps(snapshot.values))
+        final_state_bytes += len(pickle.dumps(app.get_state(config).values))
+
+    side_store_bytes = len(pickle.dumps(dict(document_store._docs)))
+    return {
+        "heap_per_article_kb": current / ARTICLES / 1024,
+        "final_state_per_article_kb": final_state_bytes / ARTICLES / 1024,
+        "checkpoints_per_article_kb": checkpoint_bytes / ARTICLES / 1024,
+        "side_store_total_kb": side_store_bytes / 1024,
+        "side_store_docs": len(document_store)
+    }
+
+
+def main():
+    print(f"--- ContentState memory benchmark ({ARTICLES} articles) ---")
+    for label, compact in [("full", False), ("compact", True)]:
+        stats = run(compact)
+        print(f"\n[{label}]")
+        for key, value in stats.items():
+            print(f"  {key}: {value:,.1f}" if isinstance(value, float) else f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,12 +13,34 @@ class Config:
     # Paths
     BASE_DIR = Path(__file__).parent
     VECTOR_DB_PATH = os.getenv("VECTORDB_PATH", str(BASE_DIR / "data" / "vectordb"))
+    # Versioned knowledge base snapshots; used instead of VECTOR_DB_PATH once one is published
+    VECTOR_DB_SNAPSHOT_PATH = os.getenv("VECTORDB_SNAPSHOT_PATH", str(BASE_DIR / "data" / "snapshots"))
     OUTPUT_DIR = BASE_DIR / "outputs"
+    RESEARCH_MEMO_PATH = os.getenv("RESEARCH_MEMO_PATH", str(BASE_DIR / "data" / "research_memos"))
+    # Read-only precomputed-vector exports for retrieval workers
+    VECTOR_EXPORT_PATH = os.getenv("VECTOR_EXPORT_PATH", str(BASE_DIR / "data" / "exports"))
+    # Retrieval backend for agents: "chroma" (read/write) or "export" (read-only exports)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
 
     # Model Settings
     MODEL_NAME = "gpt-4o"  # OpenAI GPT-4 Turbo
     EMBEDDING_MODEL = "text-embedding-3-small"
 
+    # Pricing (USD per 1M tokens) for per-run cost accounting
+    MODEL_PRICES = {
+        "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+        "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+        "text-embedding-3-small": {"input": 0.02}
+    }
+
+    # Run Budgets: {"tokens": int, "dollars": float}; override per run with settings["budget"]
+    RUN_BUDGET = None
+    BUDGET_DOWNGRADE_AT = 0.7  # Fraction of budget after which new agents use the fallback model
+    BUDGET_FALLBACK_MODEL = "gpt-4o-mini"
+    BUDGET_SHRINK_AT = 0.85  # Fraction of budget after which retrieval context is shrunk
+    BUDGET_CONTEXT_SCALE = 0.5
+    MAX_TRACKED_RUNS = 1000  # Runs kept in the in-memory cost ledger and document side store
+
     # Agent Specifics (Temperatures)
     PLANNER_TEMP = 0.2
     RESEARCHER_TEMP = 0.0
@@ -26,10 +48,88 @@ class Config:
     EDITOR_TEMP = 0.1
     SEO_TEMP = 0.2
     
+    # Structured Output: native tool-calling against pydantic schemas instead of free-text parsing
+    STRUCTURED_OUTPUT = True
+    STRUCTURED_OUTPUT_METHOD = "function_calling"
+    
+    # Pipelined Planning: stream the brief and start retrieval for each research query as it appears
+    PIPELINED_PLANNING = True
+    SPECULATION_MAX_WORKERS = 4
+    
+    # Concurrent LLM calls within one agent (e.g. per-section editing)
+    MAX_CONCURRENCY = 8
+    # Drafts at least this long are edited section by section in parallel
+    EDITOR_CHUNK_MIN_WORDS = 1200
+    
     # RAG Settings
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
     RETRIEVAL_K = 5
+    # Collections split into per-topic sub-collections (shards) at ingestion
+    SHARDED_COLLECTIONS = ["research"]
+    SHARD_KEY = "topic"
+    SHARD_MAX_WORKERS = 8
+    
+    # Context domains retrieved alongside research in one parallel stage
+    # ("{title}" and "{keywords}" are filled from the brief)
+    CONTEXT_DOMAINS = {
+        "writing": {"collection": "writing", "query": "{title}", "k": 2},
+        "style": {"collection": "style", "query": "brand voice formatting", "k": 2},
+        "seo": {"collection": "seo", "query": "{keywords}", "k": 2}
+    }
+    
+    # Snapshot Settings
+    SNAPSHOT_KEEP = 2  # Published versions retained besides the current one
+    SNAPSHOT_GC_GRACE_SECONDS = 3600  # Readers may still hold versions this recent
+    
+    # Export Settings
+    EXPORT_DTYPE = "float16"
+    EXPORT_IVF_MIN_ROWS = 50000  # Build an IVF index for exports at least this large
+    IVF_NPROBE = 8
+    SEARCH_BLOCK_ROWS = 65536  # Rows per matrix product in brute-force search
+
+    # Draft History (content-addressed delta storage of every stage output)
+    DRAFT_HISTORY = True
+    DRAFT_HISTORY_PATH = os.getenv("DRAFT_HISTORY_PATH", str(BASE_DIR / "data" / "history"))
+    HISTORY_MAX_CHAIN = 20  # Store a full copy after this many chained deltas
+    HISTORY_CACHE_SIZE = 64  # Reconstructed versions kept in memory
+
+    # Research Memos (reuse synthesized research across similar briefs)
+    RESEARCH_MEMOS = True
+    MEMO_SET_SIMILARITY = 0.85  # Query-set centroid similarity to consider a memo
+    MEMO_QUERY_SIMILARITY = 0.9  # Per-query similarity for a query to count as covered
+    MAX_RESEARCH_MEMOS = 500
+
+    # Quality Gates (local checks that drive retry edges)
+    QUALITY_WORD_COUNT_RANGE = (0.7, 1.5)  # Allowed ratio of actual to target words
+    QUALITY_MIN_HEADING_COVERAGE = 0.8
+    QUALITY_MIN_SECTION_RATIO = 0.4  # Of the per-section word budget
+    QUALITY_MIN_KEYWORD_COVERAGE = 0.5
+    QUALITY_MAX_KEYWORD_DENSITY = 0.03
+    QUALITY_MIN_READABILITY = 30  # Flesch reading ease
+    MAX_WRITER_RETRIES = 2
+    MAX_EDITOR_RETRIES = 1
+    PARTIAL_REWRITES = True  # Retry only failing sections instead of the whole draft
+
+    # Variant Generation (A/B testing): presets used when settings["variants"] is a count
+    VARIANT_PRESETS = [
+        {"name": "balanced"},
+        {"name": "conversational", "tone": "Conversational and friendly", "temperature": 0.9},
+        {"name": "authoritative", "tone": "Authoritative and concise", "temperature": 0.4},
+        {"name": "storytelling", "tone": "Narrative, story-driven", "temperature": 1.0}
+    ]
+
+    # Output Settings
+    OUTPUT_ASYNC_WRITES = True  # Write-behind queue instead of synchronous file writes
+    OUTPUT_BATCH_SIZE = 64  # Queued writes handled per batch
+    OUTPUT_FLUSH_INTERVAL = 0.5  # Seconds the writer waits for more work before flushing
+    OUTPUT_SINK = "runs"  # Append-only JSONL dataset for batch jobs
+
+    # State Settings
+    # Compact mode keeps document content in a side store and bounds agent logs
+    COMPACT_STATE = os.getenv("COMPACT_STATE", "false").lower() == "true"
+    MAX_AGENT_LOGS = 50
+    LOG_MAX_CHARS = 200
 
     @classmethod
     def validate(cls):
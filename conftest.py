@@ -0,0 +1,44 @@
+import hashlib
+from typing import List
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from config import Config
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic offline unit-length embeddings (like OpenAI's). Texts
+    starting with "c<n>" land near cluster n's center, so retrieval results
+    are predictable.
+    """
+
+    dim = 32
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+        noise = np.random.default_rng(seed).normal(size=self.dim)
+        cluster = text.split()[0] if text else ""
+        if cluster.startswith("c") and cluster[1:].isdigit():
+            center = np.random.default_rng(int(cluster[1:])).normal(size=self.dim)
+            noise = center * 4 + noise
+        return (noise / np.linalg.norm(noise)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+@pytest.fixture
+def chroma_db(tmp_path, monkeypatch):
+    """ChromaDBManager on a temporary path with offline embeddings."""
+    from vector_stores.chroma import ChromaDBManager
+
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "sk-test")
+    db = ChromaDBManager(persistent_path=str(tmp_path / "vectordb"))
+    db.embedding_function = FakeEmbeddings()
+    return db
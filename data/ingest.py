@@ -1,5 +1,6 @@
 import sys
 import os
+import argparse
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -7,6 +8,9 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from vector_stores.chroma import ChromaDBManager
+from vector_stores.snapshots import SnapshotManager
+from vector_stores.dedupe import PARENT_KEY, parent_id
+from config import Config
 
 def create_mock_data():
     """Generates mock data for all collections"""
@@ -101,11 +105,24 @@ def create_mock_data():
         "seo": seo_data
     }
 
-def ingest_data():
-    """Ingests mock data into ChromaDB"""
+def ingest_data(use_snapshot: bool = True):
+    """
+    Ingests mock data into ChromaDB.
+    
+    With use_snapshot, data is built into a new snapshot version while readers
+    keep serving the current one, then published with an atomic pointer swap.
+    Otherwise documents are written into the live database in place.
+    """
     print("Initializing ChromaDB Manager...")
+    snapshots = SnapshotManager()
+    version = None
     try:
-        db_manager = ChromaDBManager()
+        if use_snapshot:
+            version = snapshots.create_version()
+            print(f"Building snapshot {version}...")
+            db_manager = ChromaDBManager(persistent_path=str(snapshots.version_path(version)))
+        else:
+            db_manager = ChromaDBManager()
     except Exception as e:
         print(f"Error initializing DB: {e}")
         return
@@ -113,26 +130,55 @@ def ingest_data():
     data = create_mock_data()
     
     # Text splitter for chunking
+    # start_index lets retrieval merge adjacent/overlapping chunks from the same source
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=500,
-        chunk_overlap=50
+        chunk_overlap=50,
+        add_start_index=True
     )
     
+    failed = False
     for collection_type, documents in data.items():
         print(f"Processing collection: {collection_type}...")
         
+        # Tag each document so retrieval only merges chunks of the same parent
+        for doc in documents:
+            doc.metadata[PARENT_KEY] = parent_id(doc.page_content, doc.metadata)
+        
         # Split documents
         chunked_docs = splitter.split_documents(documents)
         print(f"  - Created {len(chunked_docs)} chunks from {len(documents)} docs.")
         
         # Add to DB
         try:
-            db_manager.add_documents(collection_type, chunked_docs)
+            # Large collections are split into per-topic shards
+            shard_by = Config.SHARD_KEY if collection_type in Config.SHARDED_COLLECTIONS else None
+            db_manager.add_documents(collection_type, chunked_docs, shard_by=shard_by)
             print("  - Successfully stored in ChromaDB.")
         except Exception as e:
             print(f"  - Error adding documents: {e}")
+            failed = True
+        if version:
+            snapshots.heartbeat(version)
+            
+    if version:
+        if failed:
+            snapshots.abandon(version)
+            print(f"\nSnapshot {version} not published due to errors; readers keep the current version.")
+            return
+        manifest = snapshots.write_manifest(version, db_manager)
+        snapshots.publish(version)
+        print(f"\nPublished snapshot {version}:")
+        for name, info in manifest["collections"].items():
+            print(f"  - {name}: {info['documents']} documents")
+        removed = snapshots.garbage_collect()
+        if removed:
+            print(f"  - Removed old snapshots: {', '.join(removed)}")
             
     print("\nIngestion Complete!")
 
 if __name__ == "__main__":
-    ingest_data()
+    parser = argparse.ArgumentParser(description="Ingest mock data into the vector store")
+    parser.add_argument("--in-place", action="store_true", help="Write into the live database instead of a new snapshot")
+    args = parser.parse_args()
+    ingest_data(use_snapshot=not args.in_place)
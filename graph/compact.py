@@ -0,0 +1,71 @@
+from datetime import datetime
+from typing import Any, Dict, List
+from config import Config
+from vector_stores.doc_store import document_store
+
+
+def is_compact(state: Dict) -> bool:
+    """Whether this run stores documents by reference and keeps logs compact."""
+    settings = state.get("settings") or {}
+    return settings.get("compact_state", Config.COMPACT_STATE)
+
+
+def compact_documents(docs: List[Dict], run_id: str) -> List[Dict]:
+    """
+    Move document content into the side store, pinned to the run, and return
+    lightweight references.
+    """
+    refs = []
+    for doc in docs:
+        doc_id = document_store.put(doc, run_id)
+        metadata = doc.get("metadata", {})
+        refs.append({
+            "id": doc_id,
+            "source": doc.get("source", "unknown"),
+            "title": metadata.get("title", "")
+        })
+    return refs
+
+
+def resolve_documents(docs: List[Dict]) -> List[Dict]:
+    """Return full documents for either compact references or full documents."""
+    return document_store.resolve(docs)
+
+
+def release_documents(run_id: str) -> int:
+    """Release a finished run's documents from the side store."""
+    return document_store.release(run_id)
+
+
+def _summarize(value: Any, depth: int = 0) -> Any:
+    """Reduce a log payload to bounded scalars."""
+    if isinstance(value, str):
+        if len(value) > Config.LOG_MAX_CHARS:
+            return value[:Config.LOG_MAX_CHARS] + "..."
+        return value
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return {"count": len(value)}
+    if isinstance(value, dict):
+        if depth > 0:
+            return {"keys": len(value)}
+        return {k: _summarize(v, depth + 1) for k, v in value.items()}
+    return _summarize(str(value), depth)
+
+
+def log_entry(state: Dict, agent: str, **fields) -> Dict:
+    """
+    Build an agent log record. In compact mode, payloads are reduced to
+    bounded structured fields instead of full copies of stage outputs.
+    """
+    entry = {
+        "agent": agent,
+        "timestamp": datetime.now().isoformat()
+    }
+    if is_compact(state):
+        entry["compact"] = True  # Lets the agent_logs reducer bound the list
+        entry.update({k: _summarize(v) for k, v in fields.items()})
+    else:
+        entry.update(fields)
+    return entry
@@ -1,32 +1,40 @@
+import re
+from typing import List
+from langgraph.types import Send
+from config import Config
 from graph.state import ContentState
 
+def _attempts(state: ContentState, stage: str) -> int:
+    return (state.get("attempts") or {}).get(stage, 0)
+
 def should_retry_writing(state: ContentState) -> str:
-    """Check if draft needs rewriting"""
-    draft = state.get("draft_content", "")
-    brief = state.get("brief", {})
-    
-    # Simple check for empty draft
-    if not draft:
-        return "rewrite"
+    """Check if draft needs rewriting, based on its local quality gate"""
+    if check_errors(state) == "error":
+        return "error"
         
-    # In a real implementation, we would check word counts or other metrics
-    target_words = brief.get("word_count", 1500)
-    actual_words = len(draft.split())
-    
-    # Demo logic: 
-    # If word count is drastically off (e.g. < 10% of target), retry
-    # For now, we'll assume the mock always writes enough.
+    report = (state.get("quality_reports") or {}).get("draft")
+    if not report or report["passed"]:
+        return "proceed"
+        
+    # Bounded retries: give up and let the editor work with the best we have
+    if _attempts(state, "writer") > Config.MAX_WRITER_RETRIES:
+        return "proceed"
     
-    return "proceed"
+    return "rewrite"
 
 def should_retry_editing(state: ContentState) -> str:
-    """Check editing quality"""
-    confidence = state.get("confidence_scores", {}).get("editing", 1.0)
-    
-    if confidence < 0.7:
-        return "re_edit"
+    """Check editing quality, based on the edited content's local quality gate"""
+    if check_errors(state) == "error":
+        return "error"
+        
+    report = (state.get("quality_reports") or {}).get("edited")
+    if not report or report["passed"]:
+        return "proceed"
+        
+    if _attempts(state, "editor") > Config.MAX_EDITOR_RETRIES:
+        return "proceed"
     
-    return "proceed"
+    return "re_edit"
 
 def check_errors(state: ContentState) -> str:
     """Check for fatal errors"""
@@ -34,3 +42,51 @@ def check_errors(state: ContentState) -> str:
         return "error"
     
     return "continue"
+
+def context_domains(state: ContentState) -> List[str]:
+    """Context domains retrieved alongside research (settings["context_domains"] overrides)"""
+    domains = (state.get("settings") or {}).get("context_domains")
+    return list(Config.CONTEXT_DOMAINS) if domains is None else domains
+
+def fan_out_research(state: ContentState):
+    """Send the research agent and one retrieval branch per context domain, all in parallel"""
+    if check_errors(state) == "error":
+        return "finish"
+    return [Send("researcher", state)] + [
+        Send("context", {**state, "domain": domain}) for domain in context_domains(state)
+    ]
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", str(value).lower()).strip("-") or "variant"
+
+def variant_specs(state: ContentState) -> List[dict]:
+    """
+    Variant specs from settings: a list of specs, or a count of presets.
+    Names end up in run IDs and history/output paths, so they are slugged
+    and made unique.
+    """
+    requested = (state.get("settings") or {}).get("variants", 2)
+    if isinstance(requested, int):
+        presets = Config.VARIANT_PRESETS
+        specs = [
+            {**presets[i % len(presets)], "name": f"{presets[i % len(presets)]['name']}-{i + 1}"}
+            for i in range(requested)
+        ]
+    else:
+        specs = [{**spec, "name": spec.get("name") or f"variant-{i + 1}"} for i, spec in enumerate(requested)]
+        
+    seen = set()
+    for spec in specs:
+        name = base = _slug(spec["name"])
+        suffix = 2
+        while name in seen:
+            name, suffix = f"{base}-{suffix}", suffix + 1
+        seen.add(name)
+        spec["name"] = name
+    return specs
+
+def fan_out_variants(state: ContentState):
+    """Send one branch per variant, sharing the planned brief and research"""
+    if check_errors(state) == "error":
+        return "finish"
+    return [Send("variant", {**state, "variant": spec}) for spec in variant_specs(state)]
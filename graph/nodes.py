@@ -1,45 +1,91 @@
-from datetime import datetime
+import time
+from functools import wraps
+from typing import Callable, Dict, Optional
 from graph.state import ContentState
+from graph.compact import is_compact, compact_documents, release_documents, log_entry
+from graph.edges import should_retry_writing, should_retry_editing
+from graph.quality import evaluate_content, quality_feedback, partial_rewrite_targets
+from config import Config
 from agents.planner import PlannerAgent
-from agents.researcher import ResearchAgent
+from agents.researcher import ResearchAgent, start_speculation, take_speculation
 from agents.writer import WriterAgent
-from agents.editor import EditorAgent
+from agents.editor import EditorAgent, format_change_notes, parse_change_notes
 from agents.seo import SEOAgent
+from agents.costs import BudgetExceededError, cost_accountant
+from agents.prompts import domain_context
+from vector_stores.backend import create_vector_db
+from storage.history import get_history_store
+from storage.outputs import new_run_id
 
+def metered(stage: str) -> Callable:
+    """
+    Run a node inside a cost scope: its LLM and embedding usage is attributed
+    to the run and stage, and the run's budget (settings["budget"] or
+    Config.RUN_BUDGET) is enforced. Assigns the run ID on the first node.
+    """
+    def decorator(node: Callable) -> Callable:
+        @wraps(node)
+        def wrapper(state: ContentState) -> ContentState:
+            assigned = {} if state.get("run_id") else {"run_id": new_run_id()}
+            state = {**state, **assigned}
+            run_id = state["run_id"]
+            budget = (state.get("settings") or {}).get("budget") or Config.RUN_BUDGET
+            with cost_accountant.scope(run_id, stage, budget):
+                update = node(state)
+            return {**update, **assigned, "costs": cost_accountant.summary(run_id)}
+        return wrapper
+    return decorator
+
+@metered("planner")
 def planning_node(state: ContentState) -> ContentState:
     """Planning agent node"""
     try:
+        settings = state.get("settings") or {}
+        structured = settings.get("structured_output")
+        if structured is None:
+            structured = Config.STRUCTURED_OUTPUT
         try:
             agent = PlannerAgent()
             # Ensure we have a string for the request
             request = state.get("content_request", "")
-            brief = agent.plan(request)
+            if settings.get("pipelined_planning", Config.PIPELINED_PLANNING):
+                # Retrieval for each research query starts while the brief is still streaming
+                speculation = start_speculation(state["run_id"], settings.get("tenant"))
+                brief = agent.plan_streaming(request, speculation.submit, structured=structured)
+            else:
+                brief = agent.plan(request, structured=structured)
         except Exception as e:
+            # A brief that failed schema validation and repair, or an exhausted
+            # run budget, is a real error, not something to paper over with the mock
+            if structured or isinstance(e, BudgetExceededError):
+                raise
             print(f"WARNING: PlannerAgent failed ({str(e)}). Using mock brief for testing.")
             brief = {
                 "title": "Guide to Green Tea",
                 "target_audience": "Health enthusiasts",
                 "tone": "Informative",
-                "word_count": 500,
-                "research_queries": ["green tea health benefits", "green tea antioxidants", "caffeine in green tea"]
+                "word_count_target": 500,
+                "research_queries": ["green tea health benefits", "green tea antioxidants", "caffeine in green tea"],
+                "research_topics": ["health"]
             }
         
         return {
             "brief": brief,
             "research_queries": brief.get("research_queries", []),
-            "agent_logs": [{
-                "agent": "planner",
-                "timestamp": datetime.now().isoformat(),
-                "output": brief
-            }]
+            "agent_logs": [log_entry(state, "planner", output=brief)]
         }
     except Exception as e:
+        speculation = take_speculation(state.get("run_id"))
+        if speculation:
+            speculation.close()
         return {
             "errors": [f"Planner error: {str(e)}"]
         }
 
+@metered("research")
 def research_node(state: ContentState) -> ContentState:
     """Research agent node"""
+    speculation = take_speculation(state.get("run_id"))
     try:
         agent = ResearchAgent()
         queries = state.get("research_queries", [])
@@ -48,87 +94,320 @@ def research_node(state: ContentState) -> ContentState:
         if not queries:
             queries = [state["content_request"]]
             
-        findings, docs = agent.research(queries)
+        brief = state.get("brief") or {}
+        settings = state.get("settings") or {}
+        
+        # Reuse retrieval started speculatively while the planner was streaming
+        prefetched, speculation_stats = None, None
+        if speculation:
+            prefetched, speculation_stats = speculation.collect(queries, brief.get("research_topics"))
+            
+        findings, docs = agent.research(
+            queries,
+            topics=brief.get("research_topics"),
+            tenant=settings.get("tenant"),
+            use_memos=settings.get("research_memos"),
+            prefetched=prefetched
+        )
         
         return {
             "research_findings": findings,
-            "retrieved_documents": docs,
-            "agent_logs": [{
-                "agent": "research",
-                "timestamp": datetime.now().isoformat(),
-                "document_count": len(docs)
-            }]
+            "context_bundle": {"research": findings},
+            "retrieved_documents": compact_documents(docs, state["run_id"]) if is_compact(state) else docs,
+            "memo_sources": agent.memo_sources,
+            "agent_logs": [log_entry(
+                state, "research",
+                document_count=len(docs),
+                memo=agent.memo_status,
+                speculation=speculation_stats
+            )]
         }
     except Exception as e:
+        if speculation:
+            speculation.close()
         return {
             "errors": [f"Research error: {str(e)}"]
         }
 
+@metered("context")
+def context_node(state: Dict) -> ContentState:
+    """
+    Retrieves one context domain (writing samples, style guide or competitor
+    data) for the brief. Runs in parallel with the research agent so later
+    stages read the bundle instead of querying the vector store.
+    """
+    domain = state["domain"]
+    try:
+        text = domain_context(create_vector_db(), domain, state.get("brief") or {})
+        return {
+            "context_bundle": {domain: text},
+            "agent_logs": [log_entry(state, "context", domain=domain, chars=len(text))]
+        }
+    except Exception as e:
+        # Downstream agents retrieve the domain themselves when it is missing
+        print(f"WARNING: Context retrieval failed for {domain} ({str(e)})")
+        return {"agent_logs": [log_entry(state, "context", domain=domain, error=str(e))]}
+
+def gather_context_node(state: ContentState) -> ContentState:
+    """Join point after the parallel research stage"""
+    bundle = state.get("context_bundle") or {}
+    return {
+        "agent_logs": [log_entry(state, "gather", domains=sorted(bundle))]
+    }
+
+def finish_node(state: ContentState) -> ContentState:
+    """
+    Last step of every run, successful or not: releases the run's documents
+    from the compact-mode side store. The final state keeps their references.
+    """
+    released = release_documents(state["run_id"]) if state.get("run_id") else 0
+    return {
+        "agent_logs": [log_entry(state, "finish", released_documents=released)]
+    }
+
+def _next_attempt(state: ContentState, stage: str) -> Dict:
+    attempts = dict(state.get("attempts") or {})
+    attempts[stage] = attempts.get(stage, 0) + 1
+    return attempts
+
+def _retry_feedback(state: ContentState, report_name: str) -> Optional[str]:
+    """Feedback from the previous failed quality gate, if this is a retry"""
+    report = (state.get("quality_reports") or {}).get(report_name)
+    if report and not report["passed"]:
+        return quality_feedback(report)
+    return None
+
+def _record_version(state: ContentState, stage: str, text: str, attempts: Optional[Dict] = None) -> Dict:
+    """
+    Record a stage output in the draft history.
+    
+    Returns:
+        Updated draft_versions mapping (unchanged if history is disabled or fails).
+    """
+    versions = dict(state.get("draft_versions") or {})
+    settings = state.get("settings") or {}
+    if not state.get("run_id") or not settings.get("draft_history", Config.DRAFT_HISTORY):
+        return versions
+    try:
+        entry = get_history_store().record(
+            state["run_id"], stage, text, attempt=(attempts or {}).get(stage)
+        )
+        versions[stage] = {"version": entry["version"], "hash": entry["hash"]}
+    except Exception as e:
+        # History is an audit aid; never fail the stage over it
+        print(f"WARNING: Draft history not recorded for {stage} ({str(e)})")
+    return versions
+
+@metered("writer")
 def writing_node(state: ContentState) -> ContentState:
     """Writing agent node"""
     try:
-        agent = WriterAgent()
-        draft = agent.write(
-            brief=state.get("brief", {}),
-            research=state.get("research_findings", "")
-        )
+        settings = state.get("settings") or {}
+        agent = WriterAgent(temperature=settings.get("writer_temperature"))
+        brief = state.get("brief", {})
+        research = state.get("research_findings", "")
+        bundle = state.get("context_bundle") or {}
+        feedback = _retry_feedback(state, "draft")
+        
+        # On retry, regenerate only the failing sections when the failure is local
+        previous = (state.get("quality_reports") or {}).get("draft")
+        targets = []
+        if previous and not previous["passed"] and state.get("draft_content") \
+                and settings.get("partial_rewrites", Config.PARTIAL_REWRITES):
+            targets = partial_rewrite_targets(previous, brief)
+            
+        if targets:
+            draft = agent.rewrite_sections(
+                brief=brief,
+                research=research,
+                draft=state["draft_content"],
+                sections=targets,
+                feedback=feedback,
+                writing_samples=bundle.get("writing")
+            )
+        else:
+            draft = agent.write(
+                brief=brief,
+                research=research,
+                feedback=feedback,
+                writing_samples=bundle.get("writing")
+            )
+        report = evaluate_content(draft, brief, research)
+        attempts = _next_attempt(state, "writer")
         
         return {
             "draft_content": draft,
-            "agent_logs": [{
-                "agent": "writer",
-                "timestamp": datetime.now().isoformat(),
-                "word_count": len(draft.split())
-            }]
+            "quality_reports": {**(state.get("quality_reports") or {}), "draft": report},
+            "attempts": attempts,
+            "draft_versions": _record_version(state, "writer", draft, attempts),
+            "agent_logs": [log_entry(
+                state, "writer",
+                word_count=len(draft.split()),
+                rewritten_sections=targets or "all",
+                quality_failures=report["failures"]
+            )]
         }
     except Exception as e:
         return {
             "errors": [f"Writer error: {str(e)}"]
         }
 
+@metered("editor")
 def editing_node(state: ContentState) -> ContentState:
     """Editing agent node"""
     try:
         agent = EditorAgent()
-        edited, notes = agent.edit(
-            draft=state.get("draft_content", ""),
-            brief=state.get("brief", {})
-        )
+        brief = state.get("brief", {})
+        draft = state.get("draft_content", "")
+        feedback = _retry_feedback(state, "edited")
+        
+        # Long drafts are edited section by section in parallel
+        settings = state.get("settings") or {}
+        chunked = settings.get("chunked_editing")
+        if chunked is None:
+            chunked = len(draft.split()) >= Config.EDITOR_CHUNK_MIN_WORDS
+            
+        style_guide = (state.get("context_bundle") or {}).get("style")
+        if chunked:
+            edited, changes = agent.edit_chunked(
+                draft=draft, brief=brief, feedback=feedback,
+                structured=settings.get("structured_output"), style_guide=style_guide
+            )
+            notes = format_change_notes(changes)
+        else:
+            edited, notes = agent.edit(
+                draft=draft, brief=brief, feedback=feedback,
+                structured=settings.get("structured_output"), style_guide=style_guide
+            )
+            changes = [{"section": None, "changes": parse_change_notes(notes)}]
+        report = evaluate_content(edited, brief, state.get("research_findings", ""))
+        attempts = _next_attempt(state, "editor")
         
         return {
             "edited_content": edited,
             "edit_notes": notes,
-            "agent_logs": [{
-                "agent": "editor",
-                "timestamp": datetime.now().isoformat(),
-                "changes_made": notes
-            }]
+            "edit_changes": changes,
+            "quality_reports": {**(state.get("quality_reports") or {}), "edited": report},
+            "attempts": attempts,
+            "draft_versions": _record_version(state, "editor", edited, attempts),
+            "agent_logs": [log_entry(state, "editor", changes_made=notes, quality_failures=report["failures"])]
         }
     except Exception as e:
         return {
             "errors": [f"Editor error: {str(e)}"]
         }
 
+@metered("seo")
 def seo_node(state: ContentState) -> ContentState:
     """SEO agent node"""
     try:
         agent = SEOAgent()
+        settings = state.get("settings") or {}
         final, metadata = agent.optimize(
             content=state.get("edited_content", ""),
-            brief=state.get("brief", {})
+            brief=state.get("brief", {}),
+            structured=settings.get("structured_output"),
+            competitor_data=(state.get("context_bundle") or {}).get("seo")
         )
         
         return {
             "final_content": final,
             "seo_metadata": metadata,
             "confidence_scores": {"seo": metadata.get("confidence", 0)},
-            "agent_logs": [{
-                "agent": "seo",
-                "timestamp": datetime.now().isoformat(),
-                "metadata": metadata
-            }]
+            "draft_versions": _record_version(state, "seo", final),
+            "agent_logs": [log_entry(state, "seo", metadata=metadata)]
         }
     except Exception as e:
         return {
             "errors": [f"SEO error: {str(e)}"]
         }
+
+# Keys merged with list concatenation, mirroring the ContentState reducers
+_APPEND_KEYS = ("errors", "agent_logs", "retrieved_documents", "memo_sources")
+
+def _apply(state: Dict, update: Dict) -> None:
+    for key, value in update.items():
+        if key in _APPEND_KEYS:
+            state[key] = (state.get(key) or []) + value
+        else:
+            state[key] = value
+
+def variant_node(state: Dict) -> ContentState:
+    """
+    Runs the writer, editor and SEO stages for one content variant.
+    
+    Receives the shared state (brief and research computed once) plus a
+    "variant" spec with an optional tone and writer temperature, and reuses the
+    regular stage nodes and quality-gate edges on a private copy of the state.
+    """
+    spec = state["variant"]
+    brief = dict(state.get("brief") or {})
+    if spec.get("tone"):
+        brief["tone"] = spec["tone"]
+    settings = dict(state.get("settings") or {})
+    if spec.get("temperature") is not None:
+        settings["writer_temperature"] = spec["temperature"]
+        
+    sub = {
+        **state,
+        "brief": brief,
+        "settings": settings,
+        "errors": [],
+        "agent_logs": [],
+        "quality_reports": {},
+        "attempts": {},
+        "draft_versions": {}
+    }
+    if state.get("run_id"):
+        # Each variant keeps its own version history
+        sub["run_id"] = f"{state['run_id']}.{spec.get('name', 'variant')}"
+    timings = {}
+    started = time.perf_counter()
+    
+    stages = [
+        ("writer", writing_node, should_retry_writing, "rewrite"),
+        ("editor", editing_node, should_retry_editing, "re_edit"),
+        ("seo", seo_node, None, None)
+    ]
+    for stage, node, route, retry in stages:
+        stage_started = time.perf_counter()
+        while True:
+            _apply(sub, node(sub))
+            decision = route(sub) if route else "proceed"
+            if decision != retry:
+                break
+        timings[f"{stage}_seconds"] = round(time.perf_counter() - stage_started, 2)
+        if decision == "error" or sub["errors"]:
+            break
+            
+    report = (sub.get("quality_reports") or {}).get("edited") or (sub.get("quality_reports") or {}).get("draft") or {}
+    final = sub.get("final_content") or ""
+    result = {
+        "name": spec.get("name", "variant"),
+        "tone": brief.get("tone"),
+        "temperature": settings.get("writer_temperature", Config.WRITER_TEMP),
+        "final_content": final,
+        "seo_metadata": sub.get("seo_metadata"),
+        "edit_notes": sub.get("edit_notes"),
+        "run_id": sub.get("run_id"),
+        "errors": sub["errors"],
+        "metrics": {
+            **timings,
+            "total_seconds": round(time.perf_counter() - started, 2),
+            "attempts": sub.get("attempts"),
+            "word_count": len(final.split()),
+            "quality_passed": report.get("passed"),
+            "quality": report.get("metrics"),
+            "seo_confidence": (sub.get("seo_metadata") or {}).get("confidence"),
+            "cost": ((sub.get("costs") or {}).get("by_run") or {}).get(sub.get("run_id"))
+        }
+    }
+    
+    update = {
+        "variants": [result],
+        "agent_logs": [{**entry, "variant": result["name"]} for entry in sub["agent_logs"]]
+    }
+    if state.get("run_id"):
+        # The stage nodes charge the variant run, which rolls up into the parent
+        update["costs"] = cost_accountant.summary(state["run_id"])
+    return update
@@ -0,0 +1,167 @@
+import re
+from typing import Dict, List
+from config import Config
+from agents.sections import split_sections, match_heading, word_count
+
+SENTENCE_PATTERN = re.compile(r"[.!?]+(?:\s|$)")
+CITATION_PATTERN = re.compile(r"\[[^\]]+\]\([^)]+\)|\bsource:|\baccording to\b|\bstud(?:y|ies)\b|\bresearch(?:ers)? (?:shows?|found|suggests?)\b", re.IGNORECASE)
+RESEARCH_SOURCE_PATTERN = re.compile(r"Source:\s*\[?([^\]\n]+)\]?")
+# Failures that can be fixed by rewriting individual sections
+SECTION_FAILURES = {"heading_coverage", "section_length", "word_count"}
+
+
+def _syllables(word: str) -> int:
+    word = word.lower()
+    groups = re.findall(r"[aeiouy]+", word)
+    count = len(groups)
+    if word.endswith("e") and count > 1 and not word.endswith("le"):
+        count -= 1
+    return max(count, 1)
+
+
+def readability(text: str) -> float:
+    """Flesch reading ease of the prose (headings and markdown stripped)."""
+    prose = re.sub(r"^#.*$|[*_`>#\-\[\]()]", " ", text, flags=re.MULTILINE)
+    words = re.findall(r"[A-Za-z]+", prose)
+    if not words:
+        return 0.0
+    sentences = max(len(SENTENCE_PATTERN.findall(prose)), 1)
+    syllables = sum(_syllables(w) for w in words)
+    return 206.835 - 1.015 * (len(words) / sentences) - 84.6 * (syllables / len(words))
+
+
+def _keyword_stats(text: str, keywords: List[str], total_words: int) -> Dict:
+    lowered = text.lower()
+    counts = {kw: len(re.findall(r"\b" + re.escape(kw.lower()) + r"\b", lowered)) for kw in keywords if kw}
+    present = [kw for kw, n in counts.items() if n]
+    densities = {kw: n * len(kw.split()) / max(total_words, 1) for kw, n in counts.items()}
+    return {
+        "coverage": len(present) / len(counts) if counts else 1.0,
+        "max_density": max(densities.values(), default=0.0),
+        "missing": [kw for kw, n in counts.items() if not n]
+    }
+
+
+def evaluate_content(content: str, brief: Dict, research: str = "") -> Dict:
+    """
+    Run cheap local quality checks on a draft against its brief.
+    
+    Checks word count range, outline heading coverage (and per-section length),
+    keyword coverage and stuffing, readability, and citation presence when the
+    research cites sources. No LLM calls; runs in milliseconds.
+    
+    Returns:
+        Dict with "passed", "failures" (check names), "failing_sections"
+        (outline items that are missing or too short) and "metrics".
+    """
+    brief = brief or {}
+    failures = []
+    failing_sections = []
+    total_words = word_count(content)
+    metrics = {"word_count": total_words}
+    
+    if not content.strip():
+        return {"passed": False, "failures": ["empty"], "failing_sections": [], "metrics": metrics}
+    
+    # 1. Word count range
+    target = brief.get("word_count_target") or brief.get("word_count")
+    if target:
+        low, high = Config.QUALITY_WORD_COUNT_RANGE
+        metrics["word_count_ratio"] = round(total_words / target, 2)
+        if not low <= total_words / target <= high:
+            failures.append("word_count")
+    
+    # 2. Outline coverage and section length
+    outline = brief.get("outline") or []
+    if outline:
+        sections = split_sections(content)
+        headings = [s["heading"] for s in sections]
+        section_budget = (target or total_words) / len(outline)
+        covered = 0
+        for item in outline:
+            index = match_heading(item, headings)
+            if index is None:
+                failing_sections.append(item)
+                continue
+            covered += 1
+            if word_count(sections[index]["content"]) < section_budget * Config.QUALITY_MIN_SECTION_RATIO:
+                failing_sections.append(item)
+        metrics["heading_coverage"] = round(covered / len(outline), 2)
+        if covered / len(outline) < Config.QUALITY_MIN_HEADING_COVERAGE:
+            failures.append("heading_coverage")
+        if len(failing_sections) > len(outline) - covered:
+            failures.append("section_length")
+    
+    # 3. Keyword coverage and density
+    keywords = brief.get("seo_keywords") or []
+    if keywords:
+        stats = _keyword_stats(content, keywords, total_words)
+        metrics["keyword_coverage"] = round(stats["coverage"], 2)
+        metrics["max_keyword_density"] = round(stats["max_density"], 4)
+        if stats["coverage"] < Config.QUALITY_MIN_KEYWORD_COVERAGE:
+            failures.append("keyword_coverage")
+        if stats["max_density"] > Config.QUALITY_MAX_KEYWORD_DENSITY:
+            failures.append("keyword_stuffing")
+    
+    # 4. Readability
+    metrics["readability"] = round(readability(content), 1)
+    if metrics["readability"] < Config.QUALITY_MIN_READABILITY:
+        failures.append("readability")
+    
+    # 5. Citations, when the research provided sources
+    if research and RESEARCH_SOURCE_PATTERN.search(research):
+        titles = [t.strip().lower() for t in RESEARCH_SOURCE_PATTERN.findall(research)]
+        lowered = content.lower()
+        metrics["has_citations"] = bool(CITATION_PATTERN.search(content)) or any(t and t in lowered for t in titles)
+        if not metrics["has_citations"]:
+            failures.append("citations")
+    
+    return {
+        "passed": not failures,
+        "failures": failures,
+        "failing_sections": failing_sections,
+        "metrics": metrics
+    }
+
+
+def partial_rewrite_targets(report: Dict, brief: Dict) -> List[str]:
+    """
+    Outline sections to regenerate on retry, or an empty list when the failure
+    is article-wide (readability, keywords, citations, an article that is too
+    long) or every section failed, in which case the whole draft should be
+    rewritten.
+    """
+    sections = report.get("failing_sections") or []
+    outline = (brief or {}).get("outline") or []
+    if not sections or len(sections) >= len(outline):
+        return []
+    failures = set(report.get("failures", []))
+    if not failures <= SECTION_FAILURES:
+        return []
+    # Regenerating the short sections would only lengthen an overlong article
+    if "word_count" in failures and report.get("metrics", {}).get("word_count_ratio", 0) > 1:
+        return []
+    return sections
+
+
+FEEDBACK_MESSAGES = {
+    "empty": "The content is empty.",
+    "word_count": "Word count is outside the target range.",
+    "heading_coverage": "Not all outline sections are present as H2 headings.",
+    "section_length": "Some sections are too short for their share of the word budget.",
+    "keyword_coverage": "Too few of the target SEO keywords are used.",
+    "keyword_stuffing": "A keyword is overused; reduce repetition.",
+    "readability": "Sentences are too long or complex; simplify the prose.",
+    "citations": "Attribute facts to the research sources."
+}
+
+
+def quality_feedback(report: Dict) -> str:
+    """Render a failed quality report as instructions for the next attempt."""
+    lines = [f"- {FEEDBACK_MESSAGES.get(f, f)}" for f in report.get("failures", [])]
+    metrics = report.get("metrics", {})
+    if "word_count_ratio" in metrics:
+        lines.append(f"- Current length is {metrics['word_count_ratio']}x the target word count.")
+    if report.get("failing_sections"):
+        lines.append(f"- Sections needing work: {', '.join(report['failing_sections'])}")
+    return "\n".join(lines)
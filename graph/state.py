@@ -1,5 +1,26 @@
 from typing import TypedDict, List, Dict, Optional, Annotated
 from operator import add
+from config import Config
+
+def merge_dicts(left: Optional[Dict], right: Optional[Dict]) -> Dict:
+    """Merge reducer for dicts written by parallel branches."""
+    return {**(left or {}), **(right or {})}
+
+def latest_costs(left: Optional[Dict], right: Optional[Dict]) -> Optional[Dict]:
+    """Cost summaries are cumulative snapshots; keep the one covering more calls."""
+    if not left or not right:
+        return right or left
+    return right if right["total"]["calls"] >= left["total"]["calls"] else left
+
+def bounded_add(left: List[Dict], right: List[Dict]) -> List[Dict]:
+    """
+    Append reducer for agent logs. Runs in compact mode (whose entries are
+    marked "compact") keep only the most recent Config.MAX_AGENT_LOGS entries.
+    """
+    merged = (left or []) + (right or [])
+    if any(entry.get("compact") for entry in right or []):
+        return merged[-Config.MAX_AGENT_LOGS:]
+    return merged
 
 class ContentState(TypedDict):
     """
@@ -8,6 +29,7 @@ class ContentState(TypedDict):
     # Input
     content_request: str
     settings: Optional[Dict]
+    run_id: Optional[str]  # Assigned by the planner when not provided
     
     # Planning Stage
     brief: Optional[Dict]  # JSON output from planner
@@ -15,7 +37,11 @@ class ContentState(TypedDict):
     # Research Stage
     research_queries: Optional[List[str]]
     research_findings: Optional[str]
-    retrieved_documents: Annotated[List[Dict], add]  # Accumulate docs
+    retrieved_documents: Annotated[List[Dict], add]  # Accumulate docs (references in compact mode)
+    memo_sources: Annotated[List[Dict], add]  # References (no content) behind reused research memos
+    # Domain -> context text (research findings, writing samples, style guide,
+    # competitor data), gathered in one parallel stage for downstream agents
+    context_bundle: Annotated[Dict, merge_dicts]
     
     # Writing Stage
     draft_content: Optional[str]
@@ -23,12 +49,26 @@ class ContentState(TypedDict):
     # Editing Stage
     edited_content: Optional[str]
     edit_notes: Optional[str]
+    edit_changes: Optional[List[Dict]]  # [{"section": heading, "changes": [...]}]
     
     # SEO Stage
     final_content: Optional[str]
     seo_metadata: Optional[Dict]
     
+    # Variants (A/B testing): one result per writer/editor/SEO branch
+    variants: Annotated[List[Dict], add]
+    
     # Error tracking and metadata
     errors: Annotated[List[str], add]
-    agent_logs: Annotated[List[Dict], add]
+    agent_logs: Annotated[List[Dict], bounded_add]
     confidence_scores: Optional[Dict]
+    
+    # Quality gates
+    quality_reports: Optional[Dict]  # Stage name -> latest local quality report
+    attempts: Optional[Dict]  # Stage name -> number of runs, bounds retries
+    
+    # Cost accounting: run totals and per-stage/model breakdowns (see agents.costs)
+    costs: Annotated[Optional[Dict], latest_costs]
+    
+    # Draft history: stage name -> latest recorded version {"version", "hash"}
+    draft_versions: Optional[Dict]
@@ -3,11 +3,15 @@ from graph.state import ContentState
 from graph.nodes import (
     planning_node,
     research_node,
+    context_node,
+    gather_context_node,
     writing_node,
     editing_node,
-    seo_node
+    seo_node,
+    variant_node,
+    finish_node
 )
-from graph.edges import should_retry_writing, check_errors
+from graph.edges import check_errors, should_retry_writing, should_retry_editing, fan_out_research, fan_out_variants
 
 def create_content_workflow():
     """Creates the LangGraph workflow"""
@@ -18,33 +22,104 @@ def create_content_workflow():
     # Add nodes
     workflow.add_node("planner", planning_node)
     workflow.add_node("researcher", research_node)
+    workflow.add_node("context", context_node)
+    workflow.add_node("gather", gather_context_node)
     workflow.add_node("writer", writing_node)
     workflow.add_node("editor", editing_node)
     workflow.add_node("seo", seo_node)
+    workflow.add_node("finish", finish_node)
     
     # Set entry point
     workflow.set_entry_point("planner")
     
     # Add edges (linear flow with conditionals)
-    workflow.add_edge("planner", "researcher")
-    workflow.add_edge("researcher", "writer")
+    # Stop early if planning failed outright; otherwise research and retrieve
+    # every context domain in parallel, then join before writing
+    workflow.add_conditional_edges(
+        "planner",
+        fan_out_research,
+        ["researcher", "context", "finish"]
+    )
+    workflow.add_edge("researcher", "gather")
+    workflow.add_edge("context", "gather")
+    
+    # Stop before writing if research failed, as the variants workflow does
+    workflow.add_conditional_edges(
+        "gather",
+        check_errors,
+        {
+            "continue": "writer",
+            "error": "finish"
+        }
+    )
     
-    # Conditional edge: check if writing needs retry
+    # Conditional edge: local quality gate decides if writing needs retry
     workflow.add_conditional_edges(
         "writer",
         should_retry_writing,
         {
             "rewrite": "writer",  # Loop back
-            "proceed": "editor"
+            "proceed": "editor",
+            "error": "finish"
         }
     )
     
-    # TODO: Add error handling edges using check_errors if needed
+    # Conditional edge: local quality gate decides if editing needs retry
+    workflow.add_conditional_edges(
+        "editor",
+        should_retry_editing,
+        {
+            "re_edit": "editor",  # Loop back
+            "proceed": "seo",
+            "error": "finish"
+        }
+    )
     
-    workflow.add_edge("editor", "seo")
-    workflow.add_edge("seo", END)
+    workflow.add_edge("seo", "finish")
+    # Every path ends here so the run's side-store documents are released
+    workflow.add_edge("finish", END)
     
     # Compile the graph
     app = workflow.compile()
     
     return app
+
+
+def create_variants_workflow():
+    """
+    Creates a workflow that plans and researches once, then fans out parallel
+    writer/editor/SEO branches for multiple content variants (A/B testing).
+    
+    Variants come from settings["variants"]: either a count of
+    Config.VARIANT_PRESETS or a list of {"name", "tone", "temperature"} specs.
+    Results, with per-variant metrics, are collected in state["variants"].
+    """
+    workflow = StateGraph(ContentState)
+    
+    workflow.add_node("planner", planning_node)
+    workflow.add_node("researcher", research_node)
+    workflow.add_node("context", context_node)
+    workflow.add_node("gather", gather_context_node)
+    workflow.add_node("variant", variant_node)
+    workflow.add_node("finish", finish_node)
+    
+    workflow.set_entry_point("planner")
+    
+    workflow.add_conditional_edges(
+        "planner",
+        fan_out_research,
+        ["researcher", "context", "finish"]
+    )
+    workflow.add_edge("researcher", "gather")
+    workflow.add_edge("context", "gather")
+    
+    # One branch per variant, executed in parallel within the same step
+    workflow.add_conditional_edges(
+        "gather",
+        fan_out_variants,
+        ["variant", "finish"]
+    )
+    workflow.add_edge("variant", "finish")
+    workflow.add_edge("finish", END)
+    
+    return workflow.compile()
@@ -3,6 +3,10 @@ from pydantic import BaseModel, Field
 
 class ContentBrief(BaseModel):
     title: str = Field(description="Proposed title for the content")
+    # Research fields come early so they stream first and retrieval can start
+    # while the rest of the brief is still being generated
+    research_topics: List[str] = Field(description="Knowledge base topics to search (e.g. health, technology), used to narrow retrieval", default_factory=list)
+    research_queries: List[str] = Field(description="Search queries for the research knowledge base", default_factory=list)
     target_audience: str = Field(description="Description of the target audience")
     tone: str = Field(description="Tone and voice of the article (e.g. professional, casual)")
     word_count_target: int = Field(description="Target word count")
@@ -10,6 +14,10 @@ class ContentBrief(BaseModel):
     seo_keywords: List[str] = Field(description="Primary and secondary keywords to target", default_factory=list)
     specifications: str = Field(description="Any specific instructions or requirements", default="")
 
+class EditorResult(BaseModel):
+    content: str = Field(description="The polished content (Markdown)")
+    changes: List[str] = Field(description="Summary of each change made", default_factory=list)
+
 class ContentState(TypedDict):
     content_request: str
     content_brief: Optional[Dict]  # Serialized ContentBrief
@@ -0,0 +1,247 @@
+import difflib
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import Config
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _lines(text: str) -> List[str]:
+    return text.splitlines(keepends=True)
+
+
+def compute_delta(base: str, text: str) -> List:
+    """
+    Line-level delta turning `base` into `text`.
+
+    Ops are ["=", start, end] (copy base lines start:end) or ["+", [lines]]
+    (insert new lines); deleted base lines are simply not copied.
+    """
+    base_lines, new_lines = _lines(base), _lines(text)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i1, i2])
+        elif j2 > j1:
+            ops.append(["+", new_lines[j1:j2]])
+    return ops
+
+
+def apply_delta(base: str, ops: List) -> str:
+    base_lines = _lines(base)
+    out = []
+    for op in ops:
+        if op[0] == "=":
+            out.extend(base_lines[op[1]:op[2]])
+        else:
+            out.extend(op[1])
+    return "".join(out)
+
+
+def change_stats(base: Optional[str], text: str) -> Dict:
+    """Line and word change counts between two versions."""
+    base = base or ""
+    base_lines, new_lines = _lines(base), _lines(text)
+    matcher = difflib.SequenceMatcher(None, base_lines, new_lines, autojunk=False)
+    added = removed = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            removed += i2 - i1
+            added += j2 - j1
+    return {
+        "lines_added": added,
+        "lines_removed": removed,
+        "words_before": len(base.split()),
+        "words_after": len(text.split()),
+        "similarity": round(matcher.ratio(), 3)
+    }
+
+
+class DraftHistoryStore:
+    """
+    Version history of the drafts produced for each run.
+
+    Every stage output (writer draft, retries, edit, SEO) is recorded as a
+    version in the run's log. Version contents are content-addressed objects
+    keyed by sha256: identical revisions are stored once, and each new
+    revision is stored as a line delta against the run's previous version.
+    A full copy is kept instead when the delta would not be smaller or the
+    delta chain reaches Config.HISTORY_MAX_CHAIN, which bounds reconstruction.
+
+    Layout under `path`:
+        objects/<ab>/<hash>.json  {"type": "full", "text"} | {"type": "delta", "base", "ops", "depth"}
+        runs/<run_id>.jsonl       one entry per recorded version
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or Config.DRAFT_HISTORY_PATH)
+        self._lock = threading.Lock()  # Guards the text cache
+        self._record_lock = threading.Lock()  # Serializes version numbering
+        self._texts: "OrderedDict[str, str]" = OrderedDict()
+
+    # --- Objects ---
+
+    def _object_path(self, digest: str) -> Path:
+        return self.path / "objects" / digest[:2] / f"{digest}.json"
+
+    def _read_object(self, digest: str) -> Dict:
+        with open(self._object_path(digest), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_object(self, digest: str, obj: Dict) -> None:
+        path = self._object_path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_text(json.dumps(obj), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _cache(self, digest: str, text: str) -> str:
+        self._texts[digest] = text
+        self._texts.move_to_end(digest)
+        while len(self._texts) > Config.HISTORY_CACHE_SIZE:
+            self._texts.popitem(last=False)
+        return text
+
+    def get(self, digest: str) -> str:
+        """Reconstruct a version's text from its content hash."""
+        with self._lock:
+            if digest in self._texts:
+                self._texts.move_to_end(digest)
+                return self._texts[digest]
+        chain = []
+        current = digest
+        while True:
+            with self._lock:
+                cached = self._texts.get(current)
+            if cached is not None:
+                text = cached
+                break
+            obj = self._read_object(current)
+            if obj["type"] == "full":
+                text = obj["text"]
+                break
+            chain.append(obj["ops"])
+            current = obj["base"]
+        for ops in reversed(chain):
+            text = apply_delta(text, ops)
+        with self._lock:
+            return self._cache(digest, text)
+
+    def _store(self, text: str, base: Optional[str]) -> str:
+        digest = content_hash(text)
+        if self._object_path(digest).exists():
+            return digest
+        obj = {"type": "full", "text": text}
+        if base and base != digest:
+            depth = self._read_object(base).get("depth", 0) + 1
+            if depth <= Config.HISTORY_MAX_CHAIN:
+                ops = compute_delta(self.get(base), text)
+                if len(json.dumps(ops)) < len(text):
+                    obj = {"type": "delta", "base": base, "ops": ops, "depth": depth}
+        self._write_object(digest, obj)
+        with self._lock:
+            self._cache(digest, text)
+        return digest
+
+    # --- Runs ---
+
+    def _run_path(self, run_id: str) -> Path:
+        return self.path / "runs" / f"{run_id}.jsonl"
+
+    def history(self, run_id: str) -> List[Dict]:
+        """All recorded versions of a run, oldest first."""
+        path = self._run_path(run_id)
+        if not path.exists():
+            return []
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def record(self, run_id: str, stage: str, text: str, attempt: Optional[int] = None) -> Dict:
+        """
+        Record a stage output as the run's next version.
+
+        Returns:
+            The version entry: {"version", "stage", "attempt", "hash", "parent",
+            "created_at", "stats"}; stats compare against the previous version.
+        """
+        with self._record_lock:
+            previous = self.history(run_id)
+            parent = previous[-1]["hash"] if previous else None
+            base_text = self.get(parent) if parent else None
+            digest = self._store(text, parent)
+            entry = {
+                "version": len(previous) + 1,
+                "stage": stage,
+                "attempt": attempt,
+                "hash": digest,
+                "parent": parent,
+                "created_at": datetime.now().isoformat(),
+                "stats": change_stats(base_text, text)
+            }
+            path = self._run_path(run_id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def version(self, run_id: str, version: int) -> str:
+        """Text of a run's version (1-based; negative counts from the latest)."""
+        entries = self.history(run_id)
+        entry = entries[version - 1] if version > 0 else entries[version]
+        return self.get(entry["hash"])
+
+    def diff(self, run_id: str, from_version: Optional[int] = None, to_version: int = -1) -> str:
+        """
+        Unified diff between two versions of a run; by default the latest
+        version against its predecessor.
+        """
+        entries = self.history(run_id)
+        to_entry = entries[to_version - 1] if to_version > 0 else entries[to_version]
+        if from_version is None:
+            from_version = to_entry["version"] - 1
+        before = self.version(run_id, from_version) if from_version >= 1 else ""
+        after = self.get(to_entry["hash"])
+        from_name = f"v{from_version}" if from_version >= 1 else "empty"
+        return "".join(difflib.unified_diff(
+            _lines(before), _lines(after),
+            fromfile=from_name,
+            tofile=f"v{to_entry['version']} ({to_entry['stage']})"
+        ))
+
+    def stage_stats(self, run_id: str) -> Dict[str, Dict]:
+        """Change statistics aggregated per stage across a run's versions."""
+        stats: Dict[str, Dict] = {}
+        for entry in self.history(run_id):
+            stage = stats.setdefault(entry["stage"], {
+                "versions": 0, "lines_added": 0, "lines_removed": 0, "words_after": 0, "min_similarity": 1.0
+            })
+            stage["versions"] += 1
+            stage["lines_added"] += entry["stats"]["lines_added"]
+            stage["lines_removed"] += entry["stats"]["lines_removed"]
+            stage["words_after"] = entry["stats"]["words_after"]
+            stage["min_similarity"] = min(stage["min_similarity"], entry["stats"]["similarity"])
+        return stats
+
+
+_shared_store: Optional[DraftHistoryStore] = None
+_shared_lock = threading.Lock()
+
+
+def get_history_store() -> DraftHistoryStore:
+    """Process-wide draft history store."""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = DraftHistoryStore()
+        return _shared_store
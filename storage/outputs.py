@@ -0,0 +1,311 @@
+import atexit
+import html
+import json
+import os
+import queue
+import re
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from config import Config
+
+
+def new_run_id() -> str:
+    """Sortable, collision-free run ID (timestamp plus random suffix)."""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+# Link targets allowed in rendered HTML: http(s) and relative URLs only
+SAFE_URL_SCHEMES = ("http", "https")
+
+
+def _link(match: "re.Match") -> str:
+    label, url = match.group(1), html.unescape(match.group(2))
+    scheme = re.match(r"^\s*([a-zA-Z][a-zA-Z0-9+.-]*):", url)
+    if scheme and scheme.group(1).lower() not in SAFE_URL_SCHEMES:
+        return label
+    return f'<a href="{html.escape(url, quote=True)}">{label}</a>'
+
+
+def _inline(text: str) -> str:
+    text = html.escape(text, quote=False)
+    text = re.sub(r"`([^`]+)`", r"<code>\1</code>", text)
+    text = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", text)
+    text = re.sub(r"(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)", r"<em>\1</em>", text)
+    text = re.sub(r"\[([^\]]+)\]\(([^)\s]+)\)", _link, text)
+    return text
+
+
+def markdown_to_html(markdown: str) -> str:
+    """
+    Render the Markdown subset the agents produce (headings, paragraphs,
+    lists, emphasis, links, code) to HTML.
+    """
+    out, paragraph, code = [], [], None
+    list_tag = None
+
+    def close_paragraph():
+        if paragraph:
+            out.append(f"<p>{_inline(' '.join(paragraph))}</p>")
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            out.append(f"</{list_tag}>")
+            list_tag = None
+
+    for line in markdown.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            if code is None:
+                close_paragraph()
+                close_list()
+                code = []
+            else:
+                out.append(f"<pre><code>{html.escape(chr(10).join(code))}</code></pre>")
+                code = None
+            continue
+        if code is not None:
+            code.append(line)
+            continue
+
+        heading = re.match(r"^(#{1,6})\s+(.*?)\s*#*$", stripped)
+        item = re.match(r"^([-*+]|\d+[.)])\s+(.*)$", stripped)
+        if not stripped:
+            close_paragraph()
+            close_list()
+        elif heading:
+            close_paragraph()
+            close_list()
+            level = len(heading.group(1))
+            out.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+        elif item:
+            close_paragraph()
+            tag = "ol" if item.group(1)[0].isdigit() else "ul"
+            if list_tag != tag:
+                close_list()
+                out.append(f"<{tag}>")
+                list_tag = tag
+            out.append(f"<li>{_inline(item.group(2))}</li>")
+        elif stripped.startswith(">"):
+            close_paragraph()
+            close_list()
+            out.append(f"<blockquote>{_inline(stripped.lstrip('> '))}</blockquote>")
+        else:
+            close_list()
+            paragraph.append(stripped)
+
+    if code is not None:
+        out.append(f"<pre><code>{html.escape(chr(10).join(code))}</code></pre>")
+    close_paragraph()
+    close_list()
+    return "\n".join(out)
+
+
+class OutputManager:
+    """
+    Writes workflow results under Config.OUTPUT_DIR.
+
+    Each run gets its own directory named by a unique run ID, so concurrent
+    runs never collide. With async writes enabled, files are handed to a
+    write-behind queue drained by one background thread in batches; call
+    flush() before reading them back. Batch jobs can also append one record
+    per run to an append-only JSONL sink partitioned by date
+    (`sinks/<name>/date=YYYY-MM-DD/part-<pid>.jsonl`), which loads directly
+    as a dataset into pandas, DuckDB or Spark.
+    """
+
+    def __init__(self, base_dir: Optional[str] = None, async_writes: Optional[bool] = None):
+        self.base_dir = Path(base_dir or Config.OUTPUT_DIR)
+        self.async_writes = Config.OUTPUT_ASYNC_WRITES if async_writes is None else async_writes
+        self.failures: List[str] = []
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    # --- Writing ---
+
+    def _submit(self, path: Path, data: str, append: bool = False) -> None:
+        job = {"path": path, "data": data, "append": append}
+        if not self.async_writes:
+            self._write_batch([job])
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._drain, name="output-writer", daemon=True)
+                self._worker.start()
+        self._queue.put(job)
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                job = self._queue.get(timeout=Config.OUTPUT_FLUSH_INTERVAL)
+            except queue.Empty:
+                continue
+            batch = [job]
+            while len(batch) < Config.OUTPUT_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            jobs = [j for j in batch if j is not None]
+            try:
+                self._write_batch(jobs)
+            except Exception as e:
+                # Keep the writer alive so later jobs are not stranded in the queue
+                for job in jobs:
+                    self._record_failure(job["path"], e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(jobs) < len(batch):
+                return
+
+    def _write_batch(self, jobs: List[Dict]) -> None:
+        # Appends to the same file are coalesced into a single write
+        appends: Dict[Path, List[str]] = {}
+        for job in jobs:
+            if job["append"]:
+                appends.setdefault(job["path"], []).append(job["data"])
+                continue
+            try:
+                job["path"].parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = job["path"].with_name(f"{job['path'].name}.{uuid.uuid4().hex}.tmp")
+                tmp_path.write_text(job["data"], encoding="utf-8")
+                os.replace(tmp_path, job["path"])
+            except OSError as e:
+                self._record_failure(job["path"], e)
+        for path, chunks in appends.items():
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("".join(chunks))
+            except OSError as e:
+                self._record_failure(path, e)
+
+    def _record_failure(self, path: Path, error: Exception) -> None:
+        print(f"WARNING: Output write failed for {path} ({error})")
+        with self._lock:
+            self.failures.append(f"{path}: {error}")
+
+    def flush(self) -> None:
+        """Block until every queued write has reached disk."""
+        if self.async_writes:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Flush and stop the background writer."""
+        with self._lock:
+            worker = self._worker
+            self._worker = None
+        if worker and worker.is_alive():
+            self._queue.put(None)
+            worker.join()
+
+    # --- Runs ---
+
+    def run_dir(self, run_id: str) -> Path:
+        return self.base_dir / "runs" / run_id
+
+    def save_run(self, result: Dict, request: Optional[str] = None, run_id: Optional[str] = None) -> str:
+        """
+        Write a workflow result to its own run directory.
+
+        Files: brief.json, research.md, content.md, metadata.json (when
+        present) plus manifest.json listing them.
+
+        Returns:
+            The run ID.
+        """
+        run_id = run_id or new_run_id()
+        run_dir = self.run_dir(run_id)
+        files = {}
+        if result.get("brief"):
+            files["brief.json"] = json.dumps(result["brief"], indent=2)
+        if result.get("research_findings"):
+            files["research.md"] = result["research_findings"]
+        if result.get("final_content"):
+            files["content.md"] = result["final_content"]
+        if result.get("seo_metadata"):
+            files["metadata.json"] = json.dumps(result["seo_metadata"], indent=2)
+
+        for name, data in files.items():
+            self._submit(run_dir / name, data)
+        manifest = {
+            "run_id": run_id,
+            "created_at": datetime.now().isoformat(),
+            "request": request if request is not None else result.get("content_request"),
+            "files": sorted(files),
+            "errors": result.get("errors", [])
+        }
+        # Written last so a manifest implies the run's other files were queued first
+        self._submit(run_dir / "manifest.json", json.dumps(manifest, indent=2))
+        return run_id
+
+    def render_html(self, run_id: str) -> Path:
+        """Render a saved run's content and metadata to content.html on demand."""
+        self.flush()
+        run_dir = self.run_dir(run_id)
+        content = (run_dir / "content.md").read_text(encoding="utf-8")
+        metadata_path = run_dir / "metadata.json"
+        metadata = json.loads(metadata_path.read_text(encoding="utf-8")) if metadata_path.exists() else {}
+
+        title = html.escape(metadata.get("title") or run_id)
+        head = [f"<title>{title}</title>", '<meta charset="utf-8">']
+        if metadata.get("meta_description"):
+            head.append(f'<meta name="description" content="{html.escape(metadata["meta_description"])}">')
+        if metadata.get("keywords_used"):
+            head.append(f'<meta name="keywords" content="{html.escape(", ".join(metadata["keywords_used"]))}">')
+        document = (
+            "<!DOCTYPE html>\n<html>\n<head>\n" + "\n".join(head) + "\n</head>\n"
+            f"<body>\n<article>\n{markdown_to_html(content)}\n</article>\n</body>\n</html>\n"
+        )
+        html_path = run_dir / "content.html"
+        self._write_batch([{"path": html_path, "data": document, "append": False}])
+        return html_path
+
+    # --- Bulk sink ---
+
+    def sink_path(self, sink: Optional[str] = None) -> Path:
+        # One part file per process keeps concurrent batch workers from interleaving lines
+        date = datetime.now().strftime("%Y-%m-%d")
+        return self.base_dir / "sinks" / (sink or Config.OUTPUT_SINK) / f"date={date}" / f"part-{os.getpid()}.jsonl"
+
+    def append_records(self, records: Iterable[Dict], sink: Optional[str] = None) -> None:
+        """Append records to the bulk JSONL sink."""
+        data = "".join(json.dumps(record, default=str) + "\n" for record in records)
+        if data:
+            self._submit(self.sink_path(sink), data, append=True)
+
+    def append_run(self, result: Dict, run_id: str, request: Optional[str] = None, sink: Optional[str] = None) -> None:
+        """Append one flat record for a finished run to the bulk sink."""
+        brief = result.get("brief") or {}
+        content = result.get("final_content") or ""
+        self.append_records([{
+            "run_id": run_id,
+            "created_at": datetime.now().isoformat(),
+            "request": request if request is not None else result.get("content_request"),
+            "title": brief.get("title"),
+            "word_count": len(content.split()),
+            "final_content": content,
+            "seo_metadata": result.get("seo_metadata"),
+            "errors": result.get("errors", [])
+        }], sink=sink)
+
+
+_shared_manager: Optional[OutputManager] = None
+_shared_lock = threading.Lock()
+
+
+def get_output_manager() -> OutputManager:
+    """Process-wide output manager; its queue is flushed at interpreter exit."""
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is None:
+            _shared_manager = OutputManager()
+            atexit.register(_shared_manager.close)
+        return _shared_manager
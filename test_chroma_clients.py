@@ -0,0 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from vector_stores.chroma import get_client
+
+
+def test_parallel_client_requests_share_one_client(tmp_path):
+    path = str(tmp_path / "vectordb")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(executor.map(lambda _: get_client(path), range(8)))
+
+    assert len({id(client) for client in clients}) == 1
+    assert clients[0].list_collections() == []
@@ -0,0 +1,33 @@
+import pytest
+from agents.costs import BudgetExceededError, CostAccountant, price
+from config import Config
+
+
+def test_usage_is_attributed_to_run_and_stage():
+    accountant = CostAccountant()
+    with accountant.scope("run", "writer"):
+        accountant.record(accountant.current(), "gpt-4o", input_tokens=1000, output_tokens=500, cached_tokens=400)
+    with accountant.scope("run.casual", "editor"):
+        accountant.record(accountant.current(), "text-embedding-3-small", input_tokens=200, embedding=True)
+
+    summary = accountant.summary("run")
+    assert summary["by_stage"]["writer"]["output_tokens"] == 500
+    assert summary["by_run"]["run.casual"]["embedding_tokens"] == 200
+    assert summary["total"]["cost"] == round(price("gpt-4o", 1000, 500, 400) + price("text-embedding-3-small", 200), 6)
+
+
+def test_budget_downgrades_shrinks_then_aborts():
+    accountant = CostAccountant()
+    with accountant.scope("run", "writer", budget={"tokens": 1000}):
+        assert accountant.model_name() == Config.MODEL_NAME
+        accountant.record(accountant.current(), "gpt-4o", input_tokens=750)
+        assert accountant.model_name() == Config.BUDGET_FALLBACK_MODEL
+        assert accountant.scaled_k(4) == 4
+        accountant.record(accountant.current(), "gpt-4o", input_tokens=150)
+        assert accountant.scaled_k(4) == 2
+        accountant.check()
+        accountant.record(accountant.current(), "gpt-4o", input_tokens=100)
+        with pytest.raises(BudgetExceededError):
+            accountant.check()
+
+    assert [a["action"] for a in accountant.summary("run")["actions"]][-1] == "aborted"
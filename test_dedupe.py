@@ -0,0 +1,59 @@
+import random
+
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from vector_stores.dedupe import PARENT_KEY, dedupe_documents, merge_chunks
+
+SOURCE = " ".join(f"{word}{i}" for i, word in enumerate(["green", "tea", "contains", "catechins", "that", "support", "health"] * 40))
+
+
+def _chunks(with_offsets: bool):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=60, add_start_index=with_offsets)
+    chunks = splitter.split_documents([Document(page_content=SOURCE, metadata={"source": "tea", PARENT_KEY: "tea-1"})])
+    return [
+        {"id": f"chunk-{i}", "content": chunk.page_content, "source": "tea", "metadata": chunk.metadata, "query": f"q{i % 3}"}
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+@pytest.mark.parametrize("with_offsets", [True, False])
+def test_splitter_chunks_merge_back_to_source(with_offsets):
+    chunks = _chunks(with_offsets)
+    retrieved = chunks + chunks[:4]  # Several queries matched the same chunks
+    random.Random(0).shuffle(retrieved)
+
+    merged = merge_chunks(dedupe_documents(retrieved))
+
+    assert len(chunks) > 5
+    assert len(merged) == 1
+    assert merged[0]["content"] == SOURCE
+    assert sorted(merged[0]["chunk_ids"]) == sorted(c["id"] for c in chunks)
+    assert sorted(merged[0]["queries"]) == ["q0", "q1", "q2"]
+
+
+@pytest.mark.parametrize("with_offsets", [True, False])
+def test_non_adjacent_chunks_stay_separate(with_offsets):
+    chunks = _chunks(with_offsets)
+
+    merged = merge_chunks(dedupe_documents([chunks[4], chunks[0], chunks[1]]))
+
+    second = chunks[1]["content"]
+    first_two = SOURCE[:SOURCE.index(second) + len(second)]
+    assert len(merged) == 2
+    assert {doc["content"] for doc in merged} == {first_two, chunks[4]["content"]}
+
+
+def test_documents_sharing_a_source_are_not_spliced_together():
+    first = {"id": "a", "content": "Green tea is brewed from young leaves.", "source": "notes.txt",
+             "metadata": {PARENT_KEY: "doc-a", "start_index": 0}}
+    second = {"id": "b", "content": "Coffee is brewed from roasted beans.", "source": "notes.txt",
+              "metadata": {PARENT_KEY: "doc-b", "start_index": 10}}
+    style = [{"id": f"s{i}", "content": text, "metadata": {"start_index": 0}}
+             for i, text in enumerate(["Use short paragraphs.", "Use short headings."])]
+
+    merged = merge_chunks(dedupe_documents([first, second] + style))
+
+    assert sorted(doc["id"] for doc in merged) == ["a", "b", "s0", "s1"]
+    assert {doc["content"] for doc in merged} == {first["content"], second["content"], *(d["content"] for d in style)}
@@ -0,0 +1,49 @@
+from graph.compact import compact_documents, log_entry, release_documents, resolve_documents
+from graph.state import bounded_add
+from config import Config
+from vector_stores.doc_store import DocumentStore
+
+
+def test_documents_stay_pinned_until_every_run_releases_them():
+    store = DocumentStore()
+    shared = {"id": "shared", "content": "Green tea contains catechins."}
+    for run in range(300):
+        for i in range(25):
+            store.put({"id": f"run-{run}-doc-{i}", "content": f"chunk {i}"}, f"run-{run}")
+        store.put(shared, f"run-{run}")
+
+    # Hundreds of in-flight runs keep every document they reference
+    assert len(store) == 300 * 25 + 1
+    assert len(store.resolve([{"id": "run-0-doc-0"}, {"id": "shared"}])) == 2
+
+    assert store.release("run-0") == 25
+    assert store.get("run-0-doc-0") is None and store.get("shared") is not None
+    for run in range(1, 300):
+        store.release(f"run-{run}")
+    assert len(store) == 0
+
+
+def test_abandoned_runs_are_released_oldest_first():
+    store = DocumentStore(max_runs=3)
+    for run in range(5):
+        store.put({"id": f"doc-{run}", "content": "x"}, f"run-{run}")
+
+    assert [store.get(f"doc-{run}") is not None for run in range(5)] == [False, False, True, True, True]
+
+
+def test_compact_references_resolve_until_the_run_is_released():
+    docs = [{"content": "Green tea contains catechins.", "source": "s", "metadata": {"title": "Tea"}}]
+    refs = compact_documents(docs, "compact-run")
+
+    assert "content" not in refs[0] and refs[0]["title"] == "Tea"
+    assert resolve_documents(refs) == docs
+    release_documents("compact-run")
+    assert resolve_documents(refs) == []
+
+
+def test_agent_logs_are_bounded_only_in_compact_mode():
+    full = [log_entry({}, "writer", draft="x") for _ in range(Config.MAX_AGENT_LOGS + 5)]
+    compact = [log_entry({"settings": {"compact_state": True}}, "writer", draft="x") for _ in range(Config.MAX_AGENT_LOGS + 5)]
+
+    assert len(bounded_add([], full)) == Config.MAX_AGENT_LOGS + 5
+    assert len(bounded_add([], compact)) == Config.MAX_AGENT_LOGS
@@ -0,0 +1,26 @@
+from storage.history import DraftHistoryStore
+
+DRAFT = "# Green Tea\n\n" + "".join(f"Paragraph {i} about green tea and its benefits.\n\n" for i in range(40))
+
+
+def test_versions_round_trip_as_deltas(tmp_path):
+    store = DraftHistoryStore(str(tmp_path))
+    edited = DRAFT.replace("Paragraph 3 ", "Edited paragraph 3 ")
+    first = store.record("run", "writer", DRAFT, attempt=1)
+    second = store.record("run", "editor", edited, attempt=1)
+
+    assert second["parent"] == first["hash"]
+    assert store._read_object(second["hash"])["type"] == "delta"
+    assert DraftHistoryStore(str(tmp_path)).version("run", 2) == edited
+    assert second["stats"]["lines_added"] == 1 and second["stats"]["lines_removed"] == 1
+
+
+def test_diff_and_stage_stats(tmp_path):
+    store = DraftHistoryStore(str(tmp_path))
+    store.record("run", "writer", DRAFT, attempt=1)
+    store.record("run", "writer", DRAFT + "A new closing line.\n", attempt=2)
+
+    assert "+A new closing line." in store.diff("run")
+    stats = store.stage_stats("run")["writer"]
+    assert stats["versions"] == 2
+    assert stats["lines_added"] == DRAFT.count("\n") + 1
@@ -0,0 +1,59 @@
+import pytest
+
+import agents.editor as editor
+from agents.sections import split_sections, strip_heading
+from config import Config
+
+DRAFT = """# Guide to Green Tea
+
+Green tea is rich in antioxidants.
+
+## Health Benefits
+It may support heart health.
+
+## Caffeine Content
+A cup has about 30 mg of caffeine.
+
+## Brewing Tips
+### Water temperature
+Use water just below boiling.
+"""
+
+# Model outputs per section, in draft order: unchanged preamble, a reworded
+# H2, a bold restatement without "##", and a body opening with a subheading
+EDITS = [
+    "# Guide to Green Tea\n\nGreen tea is rich in antioxidants.",
+    "## Health Perks\nIt may support heart health and focus.",
+    "**Caffeine Content:**\nA cup has roughly 30 mg of caffeine.",
+    "### Water temperature\nUse water just below boiling, around 80C.",
+]
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(editor, "create_vector_db", lambda: None)
+    agent = editor.EditorAgent()
+    agent.invoke_batch = lambda inputs, chain=None: [
+        f"{edit}\n{editor.DIVIDER}\n- Tightened wording" for edit in EDITS[:len(inputs)]
+    ]
+    return agent
+
+
+def test_edit_chunked_keeps_each_original_heading_once(agent):
+    content, changes = agent.edit_chunked(DRAFT, {"outline": []}, structured=False, style_guide="")
+    sections = split_sections(content)
+
+    assert [s["heading"] for s in sections] == [None, "Health Benefits", "Caffeine Content", "Brewing Tips"]
+    assert "Health Perks" not in content and content.count("Caffeine Content") == 1
+    assert sections[2]["content"] == "## Caffeine Content\nA cup has roughly 30 mg of caffeine."
+    assert sections[3]["content"].startswith("## Brewing Tips\n### Water temperature\n")
+    assert [c["section"] for c in changes] == ["Introduction", "Health Benefits", "Caffeine Content", "Brewing Tips"]
+    assert all(c["changes"] == ["Tightened wording"] for c in changes)
+
+
+def test_strip_heading_keeps_body_sentences_that_mention_the_heading():
+    body = "Caffeine content varies with brewing time and leaf grade in most teas.\nMore."
+    assert strip_heading(body, "Caffeine Content") == body
+    assert strip_heading("Caffeine content\nMore.", "Caffeine Content") == "More."
+    assert strip_heading("## Something Else\nMore.", "Caffeine Content") == "More."
@@ -0,0 +1,66 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from conftest import FakeEmbeddings
+from vector_stores.export import ExportedVectorStore, MmapVectorIndex, export_collection
+
+TOPICS = ["health", "history", "recipes"]
+
+
+def _docs(count=240):
+    return [
+        Document(page_content=f"c{i % 6} item {i}", metadata={"source": f"s{i}", "topic": TOPICS[(i // 6) % 3]})
+        for i in range(count)
+    ]
+
+
+def test_export_round_trip_matches_chroma(chroma_db, tmp_path):
+    chroma_db.add_documents("research", _docs())
+    export_collection(chroma_db, "research", str(tmp_path / "exports"), dtype="float32")
+    store = ExportedVectorStore(str(tmp_path / "exports"), embedding_function=FakeEmbeddings())
+
+    exported = store.query_multireturn("research", "c2 item", k=5)
+    live = chroma_db.query_multireturn("research", "c2 item", k=5)
+
+    assert [d["id"] for d in exported] == [d["id"] for d in live]
+    assert [d["content"] for d in exported] == [d["content"] for d in live]
+    assert np.allclose([d["score"] for d in exported], [d["score"] for d in live], atol=1e-4)
+    assert store.collection_fingerprint("research") == store.collection_fingerprint("research")
+
+
+def test_ivf_recall_against_brute_force(chroma_db, tmp_path):
+    chroma_db.add_documents("research", _docs(600))
+    export_collection(chroma_db, "research", str(tmp_path / "flat"), dtype="float32", nlist=0)
+    export_collection(chroma_db, "research", str(tmp_path / "ivf"), dtype="float32", nlist=12)
+    flat = MmapVectorIndex(str(tmp_path / "flat" / "research_docs"))
+    ivf = MmapVectorIndex(str(tmp_path / "ivf" / "research_docs"))
+    queries = np.asarray(FakeEmbeddings().embed_documents([f"c{i % 6} query {i}" for i in range(24)]))
+
+    def ids(index, hits):
+        return [{index.record(position)["id"] for position, _ in row} for row in hits]
+
+    exact = ids(flat, flat.search(queries, 10))
+    assert ids(ivf, ivf.search(queries, 10, nprobe=12)) == exact
+    approximate = ids(ivf, ivf.search(queries, 10, nprobe=3))
+    recall = np.mean([len(a & e) / len(e) for a, e in zip(approximate, exact)])
+    assert recall >= 0.9
+
+
+def test_shard_masking_mirrors_chroma(chroma_db, tmp_path):
+    chroma_db.add_documents("research", _docs(), shard_by="topic")
+    chroma_db.add_documents("style", _docs())
+    for name in ("research", "style"):
+        export_collection(chroma_db, name, str(tmp_path / "exports"), dtype="float32")
+    store = ExportedVectorStore(str(tmp_path / "exports"), embedding_function=FakeEmbeddings())
+
+    # Sharded export: only the requested shard, or every shard for unknown ones
+    health = store.query_multireturn("research", "c1 item", k=6, shards=["health"])
+    assert {d["metadata"]["topic"] for d in health} == {"health"}
+    assert len({d["metadata"]["topic"] for d in store.query_multireturn("research", "c1 item", k=30, shards=["nope"])}) == 3
+
+    # Unsharded export: shards become a topic filter, falling back to everything
+    history = store.query_multireturn("style", "c1 item", k=6, shards=["history"])
+    assert {d["metadata"]["topic"] for d in history} == {"history"}
+    assert [d["id"] for d in history] == [d["id"] for d in chroma_db.query_multireturn("style", "c1 item", k=6, shards=["history"])]
+    assert len(store.query_multireturn("style", "c1 item", k=6, shards=["nope"])) == 6
+    assert store.query_multireturn("style", "c1 item", tenant="acme") == []
@@ -0,0 +1,79 @@
+import os
+
+from vector_stores.memos import ResearchMemoStore
+
+SCOPE = {"topics": ["health"], "tenant": None}
+
+
+def test_memos_persist_per_file_and_reload(tmp_path):
+    store = ResearchMemoStore(str(tmp_path))
+    first = store.save(["q1", "q2"], [[1.0, 0.0, 0.0], [0.9, 0.1, 0.0]], "summary", [], "v1", SCOPE)
+    first_mtime = os.path.getmtime(tmp_path / f"{first['id']}.npy")
+    store.save(["q3"], [[0.0, 1.0, 0.0]], "other", [], "v1", SCOPE)
+
+    assert os.path.getmtime(tmp_path / f"{first['id']}.npy") == first_mtime
+    memo, uncovered = ResearchMemoStore(str(tmp_path)).lookup(["q1", "q4"], [[1.0, 0.0, 0.0], [0.95, 0.05, 0.0]], "v1", SCOPE)
+    assert memo["id"] == first["id"] and uncovered == []
+
+
+def test_invalidate_removes_stale_memo_files(tmp_path):
+    store = ResearchMemoStore(str(tmp_path))
+    store.save(["q1"], [[1.0, 0.0]], "summary", [], "v1", SCOPE)
+
+    assert store.invalidate("v2") == 1
+    assert not os.listdir(tmp_path)
+    assert store.lookup(["q1"], [[1.0, 0.0]], "v1", SCOPE) is None
+    assert ResearchMemoStore(str(tmp_path)).memos == []
+
+
+def test_invalidate_keeps_memos_from_newer_snapshots(tmp_path):
+    store = ResearchMemoStore(str(tmp_path))
+    for fingerprint in ("live:a", "20260101-x:a", "20260201-y:a", "20260301-z:a"):
+        store.save([fingerprint], [[1.0, 0.0]], "summary", [], fingerprint, SCOPE)
+
+    # A process still pinned to the February snapshot only drops older memos
+    assert store.invalidate("20260201-y:a") == 2
+    assert sorted(m["fingerprint"] for m in store.memos) == ["20260201-y:a", "20260301-z:a"]
+
+    # Different contents under the same snapshot (or live database) are stale
+    assert store.invalidate("20260201-y:b") == 1
+    assert [m["fingerprint"] for m in store.memos] == ["20260301-z:a"]
+
+
+def test_live_fingerprint_changes_with_contents(chroma_db, tmp_path):
+    from langchain_core.documents import Document
+
+    from vector_stores.chroma import ChromaDBManager
+
+    other = ChromaDBManager(persistent_path=str(tmp_path / "other"))
+    other.embedding_function = chroma_db.embedding_function
+    chroma_db.add_documents("research", [Document(page_content="c0 green tea")])
+    other.add_documents("research", [Document(page_content="c1 black tea")])
+
+    # Same collection sizes, different contents
+    first = chroma_db.collection_fingerprint("research")
+    assert first.startswith("live:")
+    assert first != other.collection_fingerprint("research")
+    assert first == chroma_db.collection_fingerprint("research")
+
+    chroma_db.add_documents("research", [Document(page_content="c2 oolong")])
+    assert chroma_db.collection_fingerprint("research") != first
+
+
+def test_reused_memo_returns_source_refs_separately(chroma_db, tmp_path, monkeypatch):
+    import agents.researcher as researcher
+
+    store = ResearchMemoStore(str(tmp_path / "memos"))
+    monkeypatch.setattr(researcher, "create_vector_db", lambda: chroma_db)
+    monkeypatch.setattr(researcher, "get_memo_store", lambda: store)
+    queries = ["c0 green tea benefits"]
+    refs = [{"id": "doc-1", "source": "tea.md", "title": "Tea"}]
+    store.save(queries, chroma_db.embedding_function.embed_documents(queries), "findings", refs,
+               chroma_db.collection_fingerprint("research"), {"topics": [], "tenant": None})
+
+    agent = researcher.ResearchAgent()
+    summary, docs = agent.research(queries, use_memos=True)
+
+    assert agent.memo_status == "reused"
+    assert summary == "findings" and docs == []
+    assert agent.memo_sources == refs
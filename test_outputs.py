@@ -0,0 +1,77 @@
+import json
+
+from storage.outputs import OutputManager, markdown_to_html
+
+RESULT = {
+    "content_request": "green tea",
+    "brief": {"title": "Green Tea"},
+    "final_content": "# Green Tea\n\nBrewed **daily**.",
+    "seo_metadata": {"title": "Green Tea", "meta_description": "All about tea"}
+}
+
+
+def test_run_directory_layout_and_atomic_writes(tmp_path):
+    manager = OutputManager(str(tmp_path), async_writes=False)
+    run_id = manager.save_run(RESULT)
+    manager.save_run({**RESULT, "final_content": "Rewritten"}, run_id=run_id)
+
+    run_dir = tmp_path / "runs" / run_id
+    assert sorted(p.name for p in run_dir.iterdir()) == ["brief.json", "content.md", "manifest.json", "metadata.json"]
+    assert (run_dir / "content.md").read_text() == "Rewritten"
+    manifest = json.loads((run_dir / "manifest.json").read_text())
+    assert manifest["request"] == "green tea" and manifest["files"] == ["brief.json", "content.md", "metadata.json"]
+    page = manager.render_html(run_id).read_text()
+    assert "<title>Green Tea</title>" in page and "<p>Rewritten</p>" in page
+
+
+def test_appends_are_batched_and_flushed(tmp_path, monkeypatch):
+    manager = OutputManager(str(tmp_path), async_writes=True)
+    batches = []
+    write_batch = manager._write_batch
+    monkeypatch.setattr(manager, "_write_batch", lambda jobs: (batches.append(len(jobs)), write_batch(jobs)))
+
+    for i in range(50):
+        manager.append_records([{"i": i}])
+    manager.flush()
+
+    lines = manager.sink_path().read_text().splitlines()
+    assert [json.loads(line)["i"] for line in lines] == list(range(50))
+    assert sum(batches) == 50
+    manager.close()
+
+
+def test_writer_survives_unexpected_errors(tmp_path, monkeypatch):
+    manager = OutputManager(str(tmp_path), async_writes=True)
+    write_batch = manager._write_batch
+    calls = []
+
+    def flaky(jobs):
+        calls.append(jobs)
+        if len(calls) == 1:
+            raise ValueError("boom")
+        write_batch(jobs)
+
+    monkeypatch.setattr(manager, "_write_batch", flaky)
+    manager.append_records([{"i": 0}])
+    manager.flush()
+    manager.append_records([{"i": 1}])
+    manager.flush()
+
+    assert manager.failures and "boom" in manager.failures[0]
+    assert manager.sink_path().read_text().strip() == json.dumps({"i": 1})
+    manager.close()
+
+
+def test_markdown_to_html_escapes_text_and_links():
+    rendered = markdown_to_html(
+        "## Tips <script>\n\n"
+        "- [docs](https://example.com/?q=\"x\"onmouseover=alert(1)) and [home](/about)\n"
+        "- [bad](javascript:alert) [worse](data:text/html,hi)\n\n"
+        "```\n<b>code</b>\n```"
+    )
+
+    assert "<h2>Tips &lt;script&gt;</h2>" in rendered
+    assert '<a href="https://example.com/?q=&quot;x&quot;onmouseover=alert(1">docs</a>' in rendered
+    assert '<a href="/about">home</a>' in rendered
+    assert "javascript:" not in rendered and "data:" not in rendered
+    assert "<pre><code>&lt;b&gt;code&lt;/b&gt;</code></pre>" in rendered
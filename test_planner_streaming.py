@@ -0,0 +1,55 @@
+from agents.planner import PlannerAgent
+from config import Config
+
+TOPICS = ["health", "nutrition"]
+
+
+class StubChain:
+    """Yields partial brief dicts the way a streaming JSON parser does."""
+
+    def __init__(self, partials):
+        self.partials = partials
+
+    def stream(self, input_data, config=None):
+        yield from self.partials
+
+
+def _stream(monkeypatch, partials):
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "sk-test")
+    agent = PlannerAgent()
+    agent.chain = StubChain(partials)
+    emitted = []
+    brief = agent.plan_streaming("green tea", lambda query, topics: emitted.append((query, topics)), structured=False)
+    return brief, emitted
+
+
+def test_queries_are_emitted_once_complete(monkeypatch):
+    base = {"title": "Green Tea Guide"}
+    partials = [
+        {"title": "Green"},
+        base,
+        {**base, "research_topics": ["hea"]},
+        {**base, "research_topics": TOPICS},
+        {**base, "research_topics": TOPICS, "research_queries": ["green tea"]},
+        {**base, "research_topics": TOPICS, "research_queries": ["green tea benefits"]},
+        {**base, "research_topics": TOPICS, "research_queries": ["green tea benefits", "caff"]},
+        {**base, "research_topics": TOPICS, "research_queries": ["green tea benefits", "caffeine in tea"]},
+        {**base, "research_topics": TOPICS, "research_queries": ["green tea benefits", "caffeine in tea"], "tone": "Warm"}
+    ]
+
+    brief, emitted = _stream(monkeypatch, partials)
+
+    assert emitted == [("green tea benefits", TOPICS), ("caffeine in tea", TOPICS)]
+    assert brief == partials[-1]
+
+
+def test_topics_are_none_until_complete(monkeypatch):
+    partials = [
+        {"research_queries": ["green tea benefits", "caff"]},
+        {"research_queries": ["green tea benefits", "caffeine in tea"], "research_topics": ["health"]},
+        {"research_queries": ["green tea benefits", "caffeine in tea"], "research_topics": TOPICS, "tone": "Warm"}
+    ]
+
+    _, emitted = _stream(monkeypatch, partials)
+
+    assert emitted == [("green tea benefits", None), ("caffeine in tea", None)]
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+
+import pytest
+from langchain_core.documents import Document
+
+import agents.editor as editor
+import agents.prompts as prompts
+from agents.prompts import domain_context, prefix_hash, shared_block
+from config import Config
+
+
+class FakeDB:
+    """Just enough of a vector store for shared_block: counts retrievals."""
+
+    persist_path = "/tmp/fake-db"
+
+    def __init__(self, snapshot_version=None):
+        self.snapshot_version = snapshot_version
+        self.queries = 0
+
+    def query(self, collection_name, query_text, k=4):
+        self.queries += 1
+        return [Document(page_content=f"Rule {i}: write in plain, active sentences.") for i in range(k)]
+
+
+@pytest.fixture(autouse=True)
+def empty_block_cache(monkeypatch):
+    monkeypatch.setattr(prompts, "_shared_blocks", OrderedDict())
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "sk-test")
+
+
+def test_prefix_hash_is_stable_across_briefs_for_the_same_shared_block(monkeypatch):
+    monkeypatch.setattr(editor, "create_vector_db", lambda: None)
+    agent = editor.EditorAgent()
+    db = FakeDB()
+
+    def prefix(brief, draft, style_guide=None):
+        style_guide = style_guide or domain_context(db, "style", brief)
+        return prefix_hash(agent.prompt.format_messages(style_guide=style_guide, brief=str(brief), feedback="None", draft=draft))
+
+    green = prefix({"title": "Green Tea", "seo_keywords": ["green tea"]}, "# Green Tea\n\nDraft one.")
+    black = prefix({"title": "Black Tea", "seo_keywords": ["black tea"]}, "# Black Tea\n\nDraft two.")
+
+    assert green == black
+    assert db.queries == 1
+    assert prefix({"title": "Green Tea"}, "Draft one.", style_guide="A different guide.") != green
+
+
+def test_shared_block_cache_key_includes_snapshot_version():
+    old, new = FakeDB("20260101-a"), FakeDB("20260201-b")
+
+    shared_block(old, "style", "brand voice", 2)
+    shared_block(old, "style", "brand voice", 2)
+    assert old.queries == 1
+
+    # A newly published snapshot is retrieved again rather than served stale
+    shared_block(new, "style", "brand voice", 2)
+    assert new.queries == 1
@@ -0,0 +1,98 @@
+from agents.sections import split_sections, splice_sections
+from graph.quality import evaluate_content, quality_feedback, partial_rewrite_targets
+from graph.edges import should_retry_writing, should_retry_editing
+from config import Config
+
+BRIEF = {
+    "title": "Guide to Green Tea",
+    "word_count_target": 120,
+    "outline": ["Health Benefits", "Caffeine Content"],
+    "seo_keywords": ["green tea", "antioxidants"]
+}
+
+SECTION = "This popular drink has a long history. " + (
+    "It is brewed from young leaves and served hot or cold. People enjoy it every day. " * 3
+)
+
+GOOD_DRAFT = f"""# Guide to Green Tea
+
+Green tea is rich in antioxidants.
+
+## Health Benefits
+{SECTION}According to research, it helps the body.
+
+## Caffeine Content
+{SECTION}
+"""
+
+
+def test_good_draft_passes():
+    report = evaluate_content(GOOD_DRAFT, BRIEF, "Source: Green Tea Benefits")
+    assert report["passed"], report
+    assert report["metrics"]["heading_coverage"] == 1.0
+
+
+def test_missing_section_is_reported():
+    draft = GOOD_DRAFT.split("## Caffeine Content")[0]
+    report = evaluate_content(draft, BRIEF)
+    assert "heading_coverage" in report["failures"]
+    assert report["failing_sections"] == ["Caffeine Content"]
+    assert "Caffeine Content" in quality_feedback(report)
+
+
+def test_short_draft_and_missing_citations():
+    report = evaluate_content("## Health Benefits\nGreen tea is good.", BRIEF, "Source: Green Tea Benefits")
+    assert "word_count" in report["failures"]
+    assert "citations" in report["failures"]
+
+
+def test_empty_draft_fails():
+    assert evaluate_content("", BRIEF)["failures"] == ["empty"]
+
+
+def test_retry_edges_are_bounded():
+    failed = {"passed": False, "failures": ["word_count"], "failing_sections": [], "metrics": {}}
+    state = {"quality_reports": {"draft": failed, "edited": failed}, "attempts": {"writer": 1, "editor": 1}}
+    assert should_retry_writing(state) == "rewrite"
+    assert should_retry_editing(state) == "re_edit"
+
+    state["attempts"] = {"writer": Config.MAX_WRITER_RETRIES + 1, "editor": Config.MAX_EDITOR_RETRIES + 1}
+    assert should_retry_writing(state) == "proceed"
+    assert should_retry_editing(state) == "proceed"
+
+    state["errors"] = ["Writer error: boom"]
+    assert should_retry_writing(state) == "error"
+
+
+def test_partial_rewrite_targets_only_for_local_failures():
+    brief = {**BRIEF, "seo_keywords": []}
+    report = evaluate_content(GOOD_DRAFT.split("## Caffeine Content")[0], brief)
+    assert partial_rewrite_targets(report, brief) == ["Caffeine Content"]
+
+    report["failures"].append("readability")
+    assert partial_rewrite_targets(report, brief) == []
+
+
+def test_splice_sections_keeps_outline_order():
+    brief = {"outline": ["Intro", "Health Benefits", "Caffeine Content"]}
+    draft = "# Title\n\n## Intro\nHello.\n\n## Caffeine Content\nOld caffeine text."
+    rewritten = "## Health Benefits\nNew benefits.\n\n## Caffeine Content\nNew caffeine text."
+    result = splice_sections(draft, rewritten, brief["outline"])
+    assert [s["heading"] for s in split_sections(result)] == [None, "Intro", "Health Benefits", "Caffeine Content"]
+    assert "Old caffeine" not in result and "Hello." in result
+
+
+def test_overlong_draft_with_a_short_section_is_fully_rewritten():
+    brief = {**BRIEF, "seo_keywords": []}
+    padding = SECTION * 6
+    draft = f"# Guide\n\n## Health Benefits\n{padding}\n\n## Caffeine Content\nShort."
+    report = evaluate_content(draft, brief)
+    assert {"word_count", "section_length"} <= set(report["failures"])
+    assert report["failing_sections"] == ["Caffeine Content"]
+    assert partial_rewrite_targets(report, brief) == []
+
+    # Too short overall: regenerating the short section is the right fix
+    short = f"# Guide\n\n## Health Benefits\n{SECTION}\n\n## Caffeine Content\nShort."
+    report = evaluate_content(short, brief)
+    assert "word_count" in report["failures"]
+    assert partial_rewrite_targets(report, brief) == ["Caffeine Content"]
@@ -0,0 +1,56 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from conftest import FakeEmbeddings
+
+TOPICS = ["health", "brewing"]
+
+
+def _add(db, tenant=None, count=24):
+    docs = [
+        Document(page_content=f"c{i % 4} note {i}", metadata={"source": f"s{i}", "topic": TOPICS[i % 2]})
+        for i in range(count)
+    ]
+    db.add_documents("research", docs, shard_by="topic", tenant=tenant)
+    return docs
+
+
+def test_queries_route_to_the_requested_shards(chroma_db):
+    _add(chroma_db)
+    assert chroma_db.list_shards("research") == ["brewing", "health"]
+
+    results = chroma_db.query_with_scores("research", "c1 note", k=6, shards=["Health"])
+    assert len(results) == 6
+    assert {doc.metadata["topic"] for doc, _ in results} == {"health"}
+
+
+def test_unknown_shards_fall_back_to_all_shards(chroma_db):
+    _add(chroma_db)
+    results = chroma_db.query_with_scores("research", "c1 note", k=12, shards=["gardening"])
+    assert {doc.metadata["topic"] for doc, _ in results} == set(TOPICS)
+
+
+def test_shard_results_merge_into_a_global_top_k(chroma_db):
+    docs = _add(chroma_db)
+    k = 7
+    results = chroma_db.query_with_scores("research", "c3 note", k=k)
+
+    # Brute-force squared L2 over every document, as Chroma scores it
+    embeddings = FakeEmbeddings()
+    query = np.array(embeddings.embed_query("c3 note"))
+    vectors = np.array(embeddings.embed_documents([d.page_content for d in docs]))
+    expected = [docs[i].page_content for i in np.argsort(((vectors - query) ** 2).sum(axis=1))[:k]]
+
+    distances = [distance for _, distance in results]
+    assert distances == sorted(distances)
+    assert [doc.page_content for doc, _ in results] == expected
+
+
+def test_tenant_without_collections_returns_nothing(chroma_db):
+    _add(chroma_db, tenant="acme")
+    before = chroma_db.list_collections()
+
+    assert chroma_db.query_with_scores("research", "c1 note", tenant="globex") == []
+    assert chroma_db.query_multireturn("research", "c1 note", tenant="globex") == []
+    assert chroma_db.list_collections() == before
+    assert chroma_db.query_with_scores("research", "c1 note", k=2, tenant="acme")
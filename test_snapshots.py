@@ -0,0 +1,104 @@
+import json
+import os
+import time
+
+import pytest
+
+from config import Config
+from vector_stores.chroma import ChromaDBManager
+from vector_stores.snapshots import SnapshotManager
+
+
+def build(snapshots, db_manager=None):
+    """Create and fully build a version, without publishing it."""
+    version = snapshots.create_version()
+    db = db_manager or ChromaDBManager(persistent_path=str(snapshots.version_path(version)))
+    snapshots.write_manifest(version, db)
+    return version
+
+
+def age(snapshots, version, seconds):
+    """Pretend a version was published or last touched `seconds` ago."""
+    path = snapshots.version_path(version)
+    past = time.time() - seconds
+    for entry in [path, *path.iterdir()]:
+        os.utime(entry, (past, past))
+    manifest = snapshots.load_manifest(version)
+    if manifest and "published_at" in manifest:
+        manifest["published_at"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(past))
+        with open(path / SnapshotManager.MANIFEST_FILE, "w") as f:
+            json.dump(manifest, f)
+
+
+@pytest.fixture
+def snapshots(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(Config, "VECTOR_DB_SNAPSHOT_PATH", str(tmp_path / "snapshots"))
+    return SnapshotManager()
+
+
+def test_publish_requires_a_manifest_and_swaps_the_pointer(snapshots):
+    assert snapshots.current_version() is None
+
+    unbuilt = snapshots.create_version()
+    with pytest.raises(ValueError):
+        snapshots.publish(unbuilt)
+    assert snapshots.current_version() is None
+
+    version = build(snapshots)
+    snapshots.publish(version)
+    assert snapshots.current_version() == version
+    assert snapshots.load_manifest()["published_at"]
+    assert not (snapshots.version_path(version) / SnapshotManager.BUILD_MARKER).exists()
+
+
+def test_managers_stay_pinned_to_the_version_current_when_opened(snapshots):
+    first = build(snapshots)
+    snapshots.publish(first)
+    reader = ChromaDBManager()
+
+    second = build(snapshots)
+    snapshots.publish(second)
+
+    assert reader.snapshot_version == first
+    assert reader.persist_path == str(snapshots.version_path(first))
+    assert ChromaDBManager().snapshot_version == second
+
+
+def test_gc_keeps_recent_versions_and_removes_retired_ones(snapshots):
+    versions = []
+    for _ in range(4):
+        versions.append(build(snapshots))
+        snapshots.publish(versions[-1])
+    for version in versions:
+        age(snapshots, version, 7200)
+
+    removed = snapshots.garbage_collect(keep=1, grace_seconds=3600)
+
+    # Current plus one more are kept; the rest were superseded long ago
+    assert removed == versions[:2]
+    assert snapshots.list_versions() == versions[2:]
+    assert snapshots.current_version() == versions[-1]
+
+
+def test_gc_skips_versions_still_being_built(snapshots):
+    old = build(snapshots)
+    snapshots.publish(old)
+    building = snapshots.create_version()
+    age(snapshots, old, 7200)
+    age(snapshots, building, 7200)
+
+    # A long ingest keeps its version alive with heartbeats, however old the directory
+    snapshots.heartbeat(building)
+    assert snapshots.garbage_collect(keep=0, grace_seconds=3600) == []
+    assert building in snapshots.list_versions()
+
+    # A stale heartbeat means the build crashed; so does an abandoned build
+    age(snapshots, building, 7200)
+    assert snapshots.garbage_collect(keep=0, grace_seconds=3600) == [building]
+
+    failed = snapshots.create_version()
+    snapshots.abandon(failed)
+    age(snapshots, failed, 7200)
+    assert snapshots.garbage_collect(keep=0, grace_seconds=3600) == [failed]
+    assert snapshots.list_versions() == [old]
@@ -0,0 +1,41 @@
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from agents.base import BaseAgent
+from agents.metrics import structured_output_metrics
+from agents.prompts import REPAIR_PROMPT
+from config import Config
+from models import EditorResult
+
+
+def _structured_agent(monkeypatch, results):
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "sk-test")
+    agent = BaseAgent("StructuredTest")
+    prompts_seen = []
+
+    def structured_chain(schema, prompt=None):
+        prompts_seen.append(prompt)
+        return RunnableLambda(lambda _: results.pop(0))
+
+    monkeypatch.setattr(agent, "structured_chain", structured_chain)
+    return agent, prompts_seen
+
+
+def test_malformed_structured_output_is_repaired_once(monkeypatch):
+    structured_output_metrics.reset()
+    invalid = {"parsed": None, "parsing_error": "changes: field required",
+               "raw": AIMessage(content="", tool_calls=[{"name": "EditorResult", "args": {"content": "x"}, "id": "1"}])}
+    agent, prompts_seen = _structured_agent(monkeypatch, [dict(invalid), {"parsed": EditorResult(content="x", changes=[]), "raw": None}])
+
+    assert agent.invoke_structured({"draft": "x"}, EditorResult).content == "x"
+    assert prompts_seen[-1] is REPAIR_PROMPT
+
+    # A repair that is still invalid fails rather than retrying again
+    agent, prompts_seen = _structured_agent(monkeypatch, [dict(invalid), dict(invalid), {"parsed": EditorResult(content="late", changes=[])}])
+    with pytest.raises(ValueError):
+        agent.invoke_structured({"draft": "x"}, EditorResult)
+    assert prompts_seen.count(REPAIR_PROMPT) == 1
+    assert structured_output_metrics.snapshot()["StructuredTest"] == {
+        "calls": 2, "parse_failures": 2, "repaired": 1, "failed": 1
+    }
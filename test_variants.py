@@ -0,0 +1,134 @@
+import pytest
+
+import graph.nodes as nodes
+from agents.costs import cost_accountant
+from graph.edges import fan_out_variants, variant_specs
+from graph.workflow import create_variants_workflow
+from storage.history import DraftHistoryStore
+
+SECTION = "This popular drink has a long history. " + (
+    "It is brewed from young leaves and served hot or cold. People enjoy it every day. " * 3
+)
+
+BRIEF = {
+    "title": "Guide to Green Tea",
+    "tone": "Informative",
+    "word_count_target": 120,
+    "outline": ["Health Benefits", "Caffeine Content"],
+    "seo_keywords": [],
+    "research_queries": ["green tea benefits"],
+    "research_topics": ["health"]
+}
+
+
+class FakePlanner:
+    def plan(self, request, **kwargs):
+        return dict(BRIEF)
+
+
+class FakeResearch:
+    memo_status = "disabled"
+    memo_sources = []
+
+    def research(self, queries, **kwargs):
+        return "Source: Green Tea Benefits", [{"id": "doc-1", "content": "Green tea facts.", "source": "tea.md", "metadata": {}}]
+
+
+class FakeWriter:
+    def __init__(self, temperature=None):
+        self.temperature = temperature
+
+    def write(self, brief, research, **kwargs):
+        # Charged to whatever run and stage the node is scoped to
+        cost_accountant.record(cost_accountant.current(), "gpt-4o", input_tokens=1000, output_tokens=200)
+        return (
+            f"# {brief['title']}\n\nIn a {brief['tone'].lower()} voice, according to research.\n\n"
+            f"## Health Benefits\n{SECTION}\n\n## Caffeine Content\n{SECTION}"
+        )
+
+
+class FakeEditor:
+    def edit(self, draft, brief, **kwargs):
+        return draft, "- Tightened wording"
+
+
+class FakeSEO:
+    def optimize(self, content, brief, **kwargs):
+        return content, {"title": brief["title"], "confidence": 0.8}
+
+
+@pytest.fixture
+def fake_agents(tmp_path, monkeypatch):
+    monkeypatch.setattr(nodes, "PlannerAgent", FakePlanner)
+    monkeypatch.setattr(nodes, "ResearchAgent", FakeResearch)
+    monkeypatch.setattr(nodes, "WriterAgent", FakeWriter)
+    monkeypatch.setattr(nodes, "EditorAgent", FakeEditor)
+    monkeypatch.setattr(nodes, "SEOAgent", FakeSEO)
+    monkeypatch.setattr(nodes, "create_vector_db", lambda: None)
+    monkeypatch.setattr(nodes, "domain_context", lambda db, domain, brief: "")
+    history = DraftHistoryStore(str(tmp_path / "history"))
+    monkeypatch.setattr(nodes, "get_history_store", lambda: history)
+    return history
+
+
+def test_variant_names_are_slugged_and_unique():
+    specs = variant_specs({"settings": {"variants": [
+        {"name": "Friendly / Casual", "tone": "Friendly"},
+        {"name": "friendly-casual"},
+        {"name": "../../etc"},
+        {"tone": "Plain"},
+        {"name": ""}
+    ]}})
+    assert [s["name"] for s in specs] == ["friendly-casual", "friendly-casual-2", "etc", "variant-4", "variant-5"]
+    assert specs[0]["tone"] == "Friendly"
+
+    presets = variant_specs({"settings": {"variants": 5}})
+    assert len({s["name"] for s in presets}) == 5
+
+
+def test_fan_out_sends_one_branch_per_variant():
+    state = {"settings": {"variants": [{"name": "A"}, {"name": "a"}]}, "errors": []}
+    sends = fan_out_variants(state)
+    assert [s.node for s in sends] == ["variant", "variant"]
+    assert [s.arg["variant"]["name"] for s in sends] == ["a", "a-2"]
+
+    assert fan_out_variants({**state, "errors": ["Planner error: boom"]}) == "finish"
+
+
+def test_variants_report_metrics_and_roll_costs_up_to_the_root_run(fake_agents):
+    app = create_variants_workflow()
+    result = app.invoke({
+        "content_request": "Write about green tea",
+        "run_id": "run-variants",
+        "settings": {"pipelined_planning": False, "variants": [
+            {"name": "Casual Tone", "tone": "Casual", "temperature": 0.9},
+            {"name": "casual tone", "tone": "Formal"}
+        ]},
+        "retrieved_documents": [],
+        "errors": [],
+        "agent_logs": []
+    })
+
+    assert result["errors"] == []
+    variants = {v["name"]: v for v in result["variants"]}
+    assert set(variants) == {"casual-tone", "casual-tone-2"}
+    for name, variant in variants.items():
+        assert variant["run_id"] == f"run-variants.{name}"
+        assert variant["final_content"].startswith("# Guide to Green Tea")
+        metrics = variant["metrics"]
+        assert metrics["quality_passed"] is True
+        assert metrics["attempts"] == {"writer": 1, "editor": 1}
+        assert metrics["seo_confidence"] == 0.8
+        assert metrics["cost"]["output_tokens"] == 200
+        # Each variant keeps its own draft history
+        assert [v["stage"] for v in fake_agents.history(variant["run_id"])] == ["writer", "editor", "seo"]
+    assert variants["casual-tone"]["temperature"] == 0.9
+    assert "casual voice" in variants["casual-tone"]["final_content"]
+    assert "formal voice" in variants["casual-tone-2"]["final_content"]
+
+    # Variant runs are charged under the root run's ledger
+    costs = result["costs"]
+    assert costs == cost_accountant.summary("run-variants")
+    assert set(costs["by_run"]) >= {"run-variants.casual-tone", "run-variants.casual-tone-2"}
+    assert costs["total"]["output_tokens"] == 400
+    assert costs["by_stage"]["writer"]["output_tokens"] == 400
@@ -0,0 +1,30 @@
+import threading
+from typing import Optional
+
+from config import Config
+
+_exported_store = None
+_exported_lock = threading.Lock()
+
+
+def create_vector_db(backend: Optional[str] = None):
+    """
+    Retrieval backend for the agents, selected by Config.VECTOR_BACKEND.
+
+    "chroma" returns a ChromaDBManager on the current snapshot. "export" returns
+    the process-wide ExportedVectorStore, which serves the same query interface
+    from memory-mapped exports (see vector_stores/export.py) without opening
+    the Chroma store.
+    """
+    global _exported_store
+    backend = backend or Config.VECTOR_BACKEND
+    if backend == "export":
+        from vector_stores.export import ExportedVectorStore
+        with _exported_lock:
+            if _exported_store is None:
+                _exported_store = ExportedVectorStore()
+            return _exported_store
+    if backend == "chroma":
+        from vector_stores.chroma import ChromaDBManager
+        return ChromaDBManager()
+    raise ValueError(f"Unknown vector backend: {backend}. Valid backends: ['chroma', 'export']")
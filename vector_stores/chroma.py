@@ -1,18 +1,50 @@
 import os
-from typing import List, Dict, Any, Optional
+import re
+import hashlib
+import heapq
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 import chromadb
 from chromadb.config import Settings
 from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
 from config import Config
+from agents.costs import MeteredEmbeddings
+from vector_stores.snapshots import SnapshotManager
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+def get_client(path: str):
+    """
+    Process-wide Chroma client for a database path. Constructing
+    PersistentClients for the same path from several threads at once is not
+    thread-safe, so managers created in parallel branches share one client.
+    """
+    key = os.path.abspath(path)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = chromadb.PersistentClient(path=key)
+        return _clients[key]
 
 class ChromaDBManager:
     """
     Manages interactions with ChromaDB for the content generation pipeline.
     Handles multiple collections for research, writing samples, style guides, and SEO.
+    
+    Collections can be split into per-topic and/or per-tenant sub-collections
+    ("shards", named `<collection>[.<tenant>]__<shard>`). Queries fan out across
+    the relevant shards in parallel and merge the top-k results.
     """
     
+    TENANT_SEPARATOR = "."
+    SHARD_SEPARATOR = "__"
+    # Per-collection write markers under the database path, read by collection_fingerprint
+    MARKER_DIR = ".modified"
+    
     COLLECTIONS = {
         "research": "research_docs",
         "writing": "writing_samples",
@@ -25,76 +57,237 @@ class ChromaDBManager:
         Initialize the ChromaDB manager.
         
         Args:
-            persistent_path: Path to store the vector database. Defaults to config value.
+            persistent_path: Path to store the vector database. Defaults to the
+                current published snapshot, or Config.VECTOR_DB_PATH if none exists.
         """
-        self.persist_path = persistent_path or Config.VECTOR_DB_PATH
+        self.snapshots = SnapshotManager()
+        # Pinned for the manager's lifetime; managers are created per agent, so
+        # each pipeline stage opens whatever snapshot is current at that point
+        self.snapshot_version = self.snapshots.current_version() if persistent_path is None else None
+        if persistent_path:
+            self.persist_path = persistent_path
+        elif self.snapshot_version:
+            self.persist_path = str(self.snapshots.version_path(self.snapshot_version))
+        else:
+            self.persist_path = Config.VECTOR_DB_PATH
         
         # Ensure directory exists
         os.makedirs(self.persist_path, exist_ok=True)
         
         # Initialize embedding function
         # Using OpenAI embeddings as specified in spec
-        self.embedding_function = OpenAIEmbeddings(
-            model=Config.EMBEDDING_MODEL,
-            api_key=Config.OPENAI_API_KEY
+        self.embedding_function = MeteredEmbeddings(
+            OpenAIEmbeddings(model=Config.EMBEDDING_MODEL, api_key=Config.OPENAI_API_KEY),
+            Config.EMBEDDING_MODEL
         )
         
-        # Initialize client
-        self.client = chromadb.PersistentClient(path=str(self.persist_path))
+        # Initialize client (shared by every manager on this path)
+        self.client = get_client(str(self.persist_path))
         
         # Initialize stores lazy-loaded or upfront
         self.vector_stores = {}
+        self._shards: Dict[Tuple[str, Optional[str]], List[str]] = {}
         
-    def get_vector_store(self, collection_name: str) -> Chroma:
+    @staticmethod
+    def _slug(value: str) -> str:
+        return re.sub(r"[^a-z0-9]+", "-", str(value).lower()).strip("-") or "default"
+
+    def shard_collection_name(self, collection_name: str, shard: Optional[str] = None, tenant: Optional[str] = None) -> str:
         """
-        Get or create a LangChain Chroma vector store wrapper for a specific collection.
+        Physical Chroma collection name for a collection type, tenant and shard.
         """
         if collection_name not in self.COLLECTIONS:
             raise ValueError(f"Unknown collection type: {collection_name}. Valid types: {list(self.COLLECTIONS.keys())}")
             
-        real_collection_name = self.COLLECTIONS[collection_name]
+        name = self.COLLECTIONS[collection_name]
+        if tenant:
+            name += self.TENANT_SEPARATOR + self._slug(tenant)
+        if shard:
+            name += self.SHARD_SEPARATOR + self._slug(shard)
+        return name
+
+    def get_vector_store(self, collection_name: str, shard: Optional[str] = None, tenant: Optional[str] = None) -> Chroma:
+        """
+        Get or create a LangChain Chroma vector store wrapper for a specific collection
+        (optionally a tenant and/or shard sub-collection).
+        """
+        real_collection_name = self.shard_collection_name(collection_name, shard, tenant)
         
-        if collection_name not in self.vector_stores:
-            self.vector_stores[collection_name] = Chroma(
+        if real_collection_name not in self.vector_stores:
+            self.vector_stores[real_collection_name] = Chroma(
                 client=self.client,
                 collection_name=real_collection_name,
                 embedding_function=self.embedding_function,
             )
             
-        return self.vector_stores[collection_name]
+        return self.vector_stores[real_collection_name]
+
+    def list_shards(self, collection_name: str, tenant: Optional[str] = None) -> List[str]:
+        """
+        List shard names that exist for a collection (and tenant).
+        """
+        key = (collection_name, tenant)
+        if key not in self._shards:
+            prefix = self.shard_collection_name(collection_name, tenant=tenant) + self.SHARD_SEPARATOR
+            self._shards[key] = sorted(
+                name[len(prefix):] for name in self.list_collections()
+                if name.startswith(prefix)
+            )
+        return self._shards[key]
 
-    def add_documents(self, collection_name: str, documents: List[Document]) -> List[str]:
+    def add_documents(self, collection_name: str, documents: List[Document], shard_by: Optional[str] = None, tenant: Optional[str] = None) -> List[str]:
         """
         Add documents to a specific collection.
+        
+        Args:
+            shard_by: Metadata key used to route documents into per-value shards
+                (e.g. "topic"). Documents without the key go to the "default" shard.
+            tenant: Optional tenant whose sub-collections receive the documents.
         """
-        store = self.get_vector_store(collection_name)
-        return store.add_documents(documents)
+        if not shard_by:
+            store = self.get_vector_store(collection_name, tenant=tenant)
+            ids = store.add_documents(documents)
+            self._mark_modified(collection_name, tenant)
+            return ids
+            
+        groups: Dict[str, List[Document]] = {}
+        for doc in documents:
+            groups.setdefault(self._slug(doc.metadata.get(shard_by, "default")), []).append(doc)
+            
+        ids = []
+        for shard, shard_docs in groups.items():
+            ids.extend(self.get_vector_store(collection_name, shard, tenant).add_documents(shard_docs))
+        self._shards.pop((collection_name, tenant), None)
+        self._mark_modified(collection_name, tenant)
+        return ids
+
+    def _marker_path(self, collection_name: str, tenant: Optional[str] = None) -> str:
+        return os.path.join(self.persist_path, self.MARKER_DIR, self.shard_collection_name(collection_name, tenant=tenant))
+
+    def _mark_modified(self, collection_name: str, tenant: Optional[str] = None) -> None:
+        """Record a write to a collection; a fresh token per write, so same-size rewrites are seen too."""
+        path = self._marker_path(collection_name, tenant)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            f.write(uuid.uuid4().hex)
+        os.replace(tmp, path)
 
-    def query(self, collection_name: str, query_text: str, k: int = 4, filter: Optional[Dict] = None) -> List[Document]:
+    def query_with_scores(
+        self,
+        collection_name: str,
+        query_text: str,
+        k: int = 4,
+        filter: Optional[Dict] = None,
+        shards: Optional[List[str]] = None,
+        tenant: Optional[str] = None,
+        embedding: Optional[List[float]] = None
+    ) -> List[Tuple[Document, float]]:
         """
-        Query a specific collection for relevant documents.
+        Query a collection and return (document, distance) pairs, lowest distance first.
+        Pass a precomputed `embedding` for query_text to skip embedding it again.
+        
+        If the collection is sharded, the query is embedded once and fanned out in
+        parallel across the requested shards (all shards if none of the requested
+        ones exist), and the per-shard results are merged into a global top-k.
+        Otherwise the base collection is queried, using `shards` as a metadata
+        filter on Config.SHARD_KEY. A collection (or tenant) with no data returns
+        no results; querying never creates it.
         """
-        store = self.get_vector_store(collection_name)
+        available = self.list_shards(collection_name, tenant)
+        if not available and self.shard_collection_name(collection_name, tenant=tenant) not in self.list_collections():
+            return []
+        if embedding is None:
+            embedding = self.embedding_function.embed_query(query_text)
+        
+        if not available:
+            store = self.get_vector_store(collection_name, tenant=tenant)
+            if shards:
+                topic_filter = {Config.SHARD_KEY: {"$in": list(shards)}}
+                scoped = {"$and": [filter, topic_filter]} if filter else topic_filter
+                results = store.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=scoped)
+                if results:
+                    return results
+            return store.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+            
+        targets = [s for s in (self._slug(s) for s in shards or []) if s in available] or available
         
+        def search(shard: str) -> List[Tuple[Document, float]]:
+            store = self.get_vector_store(collection_name, shard, tenant)
+            return store.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+            
+        if len(targets) == 1:
+            shard_results = [search(targets[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(Config.SHARD_MAX_WORKERS, len(targets))) as executor:
+                shard_results = list(executor.map(search, targets))
+                
+        return heapq.nsmallest(k, (r for results in shard_results for r in results), key=lambda r: r[1])
+
+    def query(
+        self,
+        collection_name: str,
+        query_text: str,
+        k: int = 4,
+        filter: Optional[Dict] = None,
+        shards: Optional[List[str]] = None,
+        tenant: Optional[str] = None
+    ) -> List[Document]:
+        """
+        Query a specific collection for relevant documents.
+        """
         # simple similarity search
         # We can enhance this with MMR (Maximum Marginal Relevance) if needed
-        docs = store.similarity_search(query_text, k=k, filter=filter)
-        return docs
+        results = self.query_with_scores(collection_name, query_text, k, filter, shards, tenant)
+        return [doc for doc, _ in results]
         
-    def query_multireturn(self, collection_name: str, query_text: str, k: int = 4) -> List[Dict]:
+    def query_multireturn(
+        self,
+        collection_name: str,
+        query_text: str,
+        k: int = 4,
+        filter: Optional[Dict] = None,
+        shards: Optional[List[str]] = None,
+        tenant: Optional[str] = None,
+        embedding: Optional[List[float]] = None
+    ) -> List[Dict]:
         """
         Query and return a list of dictionaries with content and metadata.
         Useful for passing raw data to agents.
         """
-        docs = self.query(collection_name, query_text, k)
-        results = []
-        for doc in docs:
-            results.append({
+        results = self.query_with_scores(collection_name, query_text, k, filter, shards, tenant, embedding)
+        return [
+            {
+                "id": doc.id,
                 "content": doc.page_content,
                 "metadata": doc.metadata,
-                "source": doc.metadata.get("source", "unknown")
-            })
-        return results
+                "source": doc.metadata.get("source", "unknown"),
+                "score": score
+            }
+            for doc, score in results
+        ]
+
+    def collection_fingerprint(self, collection_name: str, tenant: Optional[str] = None) -> str:
+        """
+        Identifier that changes whenever a collection's contents change: the
+        snapshot version plus per-shard document counts and the collection's
+        last write marker. Used to invalidate caches derived from the collection.
+        """
+        names = [self.shard_collection_name(collection_name, s, tenant) for s in self.list_shards(collection_name, tenant)]
+        names = names or [self.shard_collection_name(collection_name, tenant=tenant)]
+        counts = []
+        for name in names:
+            try:
+                counts.append(f"{name}={self.client.get_collection(name).count()}")
+            except Exception:
+                counts.append(f"{name}=0")
+        try:
+            with open(self._marker_path(collection_name, tenant)) as f:
+                counts.append(f.read())
+        except FileNotFoundError:
+            pass
+        digest = hashlib.sha1(",".join(counts).encode("utf-8")).hexdigest()[:16]
+        return f"{self.snapshot_version or 'live'}:{digest}"
 
     def list_collections(self) -> List[str]:
         """List all available collections in the DB."""
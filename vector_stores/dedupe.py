@@ -0,0 +1,158 @@
+import hashlib
+from typing import Dict, List, Optional, Tuple
+from config import Config
+from vector_stores.doc_store import document_id
+
+# Shortest shared run of text treated as a real chunk overlap
+MIN_OVERLAP_CHARS = 20
+
+# Chunk metadata identifying the document a chunk was split from (see data/ingest.py)
+PARENT_KEY = "doc_id"
+
+
+def parent_id(content: str, metadata: Dict) -> str:
+    """Identity of a source document, recorded on each of its chunks at ingest."""
+    key = f"{metadata.get('source', '')}|{metadata.get('title', '')}|{content}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def dedupe_documents(docs: List[Dict]) -> List[Dict]:
+    """
+    Remove duplicate retrieval results in a single pass, keyed on chunk ID
+    (or content hash). The queries that matched each chunk are collected
+    under "queries" so context can still be attributed.
+    """
+    unique: Dict[str, Dict] = {}
+    for doc in docs:
+        key = document_id(doc)
+        query = doc.get("query")
+        if key not in unique:
+            unique[key] = {**doc, "id": key, "queries": [query] if query else []}
+        elif query and query not in unique[key]["queries"]:
+            unique[key]["queries"].append(query)
+    return list(unique.values())
+
+
+def _combine(group: List[Dict], content: str) -> Dict:
+    """Build the merged document for a run of chunks from one source."""
+    if len(group) == 1:
+        return group[0]
+    chunk_ids = [chunk_id for doc in group for chunk_id in doc.get("chunk_ids", [doc["id"]])]
+    queries: List[str] = []
+    for doc in group:
+        queries.extend(q for q in doc.get("queries", []) if q not in queries)
+    return {
+        **group[0],
+        "id": hashlib.sha1("|".join(chunk_ids).encode("utf-8")).hexdigest(),
+        "content": content,
+        "chunk_ids": chunk_ids,
+        "queries": queries
+    }
+
+
+def _merge_by_offset(source_docs: List[Dict]) -> List[Dict]:
+    """
+    Single sweep over chunks sorted by start_index: a chunk starting at or
+    before the end of the current run extends it with whatever text lies past
+    that end (nothing, if it is fully contained).
+    """
+    source_docs = sorted(source_docs, key=lambda d: d["metadata"]["start_index"])
+    merged_docs = []
+    group, pieces, end = [], [], 0
+    for doc in source_docs:
+        start, content = doc["metadata"]["start_index"], doc["content"]
+        if group and start <= end:
+            group.append(doc)
+            if start + len(content) > end:
+                pieces.append(content[end - start:])
+                end = start + len(content)
+            continue
+        if group:
+            merged_docs.append(_combine(group, "".join(pieces)))
+        group, pieces, end = [doc], [content], start + len(content)
+    if group:
+        merged_docs.append(_combine(group, "".join(pieces)))
+    return merged_docs
+
+
+def _merge_by_overlap(source_docs: List[Dict], max_overlap: int) -> List[Dict]:
+    """
+    Without offsets, link each chunk to the chunk whose opening text continues
+    its ending, then join the chains. Chunk openings are indexed by their first
+    MIN_OVERLAP_CHARS characters, so each chunk only probes the last
+    `max_overlap` positions of its own text and the pass stays linear in the
+    number of chunks.
+    """
+    heads: Dict[str, List[int]] = {}
+    for i, doc in enumerate(source_docs):
+        if len(doc["content"]) >= MIN_OVERLAP_CHARS:
+            heads.setdefault(doc["content"][:MIN_OVERLAP_CHARS], []).append(i)
+
+    successor: Dict[int, Tuple[int, int]] = {}
+    linked = set()
+    for i, doc in enumerate(source_docs):
+        text = doc["content"]
+        # Earliest position first: the longest overlap wins
+        for pos in range(max(0, len(text) - max_overlap), len(text) - MIN_OVERLAP_CHARS + 1):
+            candidates = heads.get(text[pos:pos + MIN_OVERLAP_CHARS])
+            if not candidates:
+                continue
+            tail = text[pos:]
+            match = next((
+                j for j in candidates
+                if j != i and j not in linked and source_docs[j]["content"].startswith(tail)
+            ), None)
+            if match is not None:
+                successor[i] = (match, len(tail))
+                linked.add(match)
+                break
+
+    merged_docs = []
+    visited = set()
+    # Chain heads first; anything left over belongs to a cycle and starts anywhere
+    for start in [i for i in range(len(source_docs)) if i not in linked] + list(range(len(source_docs))):
+        if start in visited:
+            continue
+        group, pieces = [], []
+        current, overlap = start, 0
+        while current is not None and current not in visited:
+            visited.add(current)
+            group.append(source_docs[current])
+            pieces.append(source_docs[current]["content"][overlap:])
+            current, overlap = successor.get(current, (None, 0))
+        merged_docs.append(_combine(group, "".join(pieces)))
+    return merged_docs
+
+
+def merge_chunks(docs: List[Dict], max_overlap: Optional[int] = None) -> List[Dict]:
+    """
+    Merge adjacent and overlapping chunks from the same source so the same
+    passage is not repeated in the research context.
+
+    Chunks are grouped by source and parent document (PARENT_KEY, falling
+    back to the title). Offsets are only comparable within one document, so
+    chunks are merged by `start_index` only when their parent is known;
+    otherwise overlaps are detected from shared text at chunk boundaries.
+    Chunks with neither a source nor a parent are never merged. Both paths
+    are linear in the number of chunks per group (plus a sort).
+    """
+    max_overlap = max_overlap or Config.CHUNK_OVERLAP
+
+    merged_docs = []
+    groups: Dict[Tuple[str, str], List[Dict]] = {}
+    for doc in docs:
+        metadata = doc.get("metadata") or {}
+        source = doc.get("source") or metadata.get("source") or "unknown"
+        parent = metadata.get(PARENT_KEY) or metadata.get("title") or ""
+        if source == "unknown" and not parent:
+            merged_docs.append(doc)
+            continue
+        groups.setdefault((source, parent), []).append(doc)
+
+    for (source, parent), group in groups.items():
+        has_offsets = all("start_index" in d.get("metadata", {}) for d in group)
+        if has_offsets and (group[0].get("metadata") or {}).get(PARENT_KEY):
+            merged_docs.extend(_merge_by_offset(group))
+        else:
+            merged_docs.extend(_merge_by_overlap(group, max_overlap))
+    return merged_docs
@@ -0,0 +1,102 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+from config import Config
+
+
+def document_id(doc: Dict) -> str:
+    """
+    Stable identifier for a retrieved document.
+    Uses the vector store chunk ID when available, otherwise a content hash.
+    """
+    if doc.get("id"):
+        return doc["id"]
+    content = doc.get("content", "")
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class DocumentStore:
+    """
+    Process-wide side store for retrieved document content.
+    In compact state mode, ContentState only carries document references and the
+    full chunk text lives here, shared across all in-flight articles.
+    
+    Documents are pinned by the runs that stored them and dropped once every
+    such run has been released (see graph.nodes.finish_node), so the store only
+    holds content that in-flight runs can still reference. Runs that never
+    finish are released oldest first past Config.MAX_TRACKED_RUNS.
+    """
+
+    def __init__(self, max_runs: Optional[int] = None):
+        self.max_runs = max_runs or Config.MAX_TRACKED_RUNS
+        self._docs: Dict[str, Dict] = {}
+        self._pins: Dict[str, int] = {}
+        self._runs: "OrderedDict[str, Set[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, doc: Dict, run_id: str) -> str:
+        """Store a document for a run and return its ID. Identical chunks are stored once."""
+        doc_id = document_id(doc)
+        with self._lock:
+            self._docs.setdefault(doc_id, doc)
+            pinned = self._runs.setdefault(run_id, set())
+            self._runs.move_to_end(run_id)
+            if doc_id not in pinned:
+                pinned.add(doc_id)
+                self._pins[doc_id] = self._pins.get(doc_id, 0) + 1
+            while len(self._runs) > self.max_runs:
+                self._release(next(iter(self._runs)))
+        return doc_id
+
+    def get(self, doc_id: str) -> Optional[Dict]:
+        return self._docs.get(doc_id)
+
+    def _release(self, run_id: str) -> int:
+        # Caller holds the lock
+        dropped = 0
+        for doc_id in self._runs.pop(run_id, ()):
+            self._pins[doc_id] -= 1
+            if not self._pins[doc_id]:
+                del self._pins[doc_id]
+                self._docs.pop(doc_id, None)
+                dropped += 1
+        return dropped
+
+    def release(self, run_id: str) -> int:
+        """
+        Unpin a finished run's documents.
+
+        Returns:
+            Number of documents dropped (no longer referenced by any run).
+        """
+        with self._lock:
+            return self._release(run_id)
+
+    def resolve(self, refs: List[Dict]) -> List[Dict]:
+        """
+        Expand document references back into full documents.
+        Full documents (non-compact mode) are passed through unchanged.
+        """
+        resolved = []
+        for ref in refs:
+            if "content" in ref:
+                resolved.append(ref)
+                continue
+            doc = self.get(ref.get("id", ""))
+            if doc is not None:
+                resolved.append(doc)
+        return resolved
+
+    def clear(self) -> None:
+        with self._lock:
+            self._docs.clear()
+            self._pins.clear()
+            self._runs.clear()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+
+# Shared instance used by the graph nodes
+document_store = DocumentStore()
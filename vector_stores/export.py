@@ -0,0 +1,418 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Add project root to path when run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.documents import Document
+from config import Config
+
+INDEX_FILE = "index.json"
+PAGE_SIZE = 1000
+KMEANS_SAMPLE = 100_000
+KMEANS_ITERATIONS = 10
+FILTER_OVERSAMPLE = 4  # Extra candidates fetched when a metadata filter is applied
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _kmeans(vectors: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means over a sample of rows, used to build IVF lists."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), size=min(len(vectors), KMEANS_SAMPLE), replace=False)
+    sample = np.asarray(vectors[np.sort(rows)], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = sample[assignment == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids = _normalize(centroids)
+    return centroids
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignment = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), Config.SEARCH_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + Config.SEARCH_BLOCK_ROWS], dtype=np.float32)
+        assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignment
+
+
+def export_collection(
+    db_manager,
+    collection_name: str,
+    out_dir: Optional[str] = None,
+    tenant: Optional[str] = None,
+    dtype: Optional[str] = None,
+    nlist: Optional[int] = None
+) -> Dict:
+    """
+    Export a collection (all of its shards) to a compact read-only format.
+
+    Layout of `<out_dir>/<collection>[.<tenant>]/`:
+        vectors.npy   normalized float16/float32 matrix, memory-mappable
+        texts.bin     concatenated UTF-8 JSON records (id, content, metadata)
+        offsets.npy   int64 byte offsets into texts.bin (count + 1 entries)
+        shards.npy    per-row shard code (names in index.json)
+        centroids.npy, list_offsets.npy, row_ids.npy   IVF lists (optional)
+        index.json    counts, dimensions, dtype, embedding model, snapshot version,
+                      source fingerprint
+
+    Args:
+        db_manager: ChromaDBManager to export from.
+        nlist: Number of IVF lists. Defaults to sqrt(count) for exports of at
+            least Config.EXPORT_IVF_MIN_ROWS rows, otherwise brute force (0).
+    """
+    dtype = np.dtype(dtype or Config.EXPORT_DTYPE)
+    base_name = db_manager.shard_collection_name(collection_name, tenant=tenant)
+    shards = db_manager.list_shards(collection_name, tenant)
+    sources = [(s, db_manager.shard_collection_name(collection_name, s, tenant)) for s in shards] or [("", base_name)]
+    collections = [(s, db_manager.client.get_collection(name)) for s, name in sources]
+    total = sum(c.count() for _, c in collections)
+
+    target = Path(out_dir or Config.VECTOR_EXPORT_PATH) / base_name
+    target.mkdir(parents=True, exist_ok=True)
+
+    vectors = None
+    offsets = np.zeros(total + 1, dtype=np.int64)
+    shard_codes = np.zeros(total, dtype=np.int16)
+    row = 0
+    with open(target / "texts.bin", "wb") as blob:
+        for code, (_, collection) in enumerate(collections):
+            for page in range(0, collection.count(), PAGE_SIZE):
+                batch = collection.get(include=["embeddings", "documents", "metadatas"], limit=PAGE_SIZE, offset=page)
+                embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+                if vectors is None:
+                    raw_path = target / "vectors.raw.npy"
+                    vectors = np.lib.format.open_memmap(raw_path, mode="w+", dtype=dtype, shape=(total, embeddings.shape[1]))
+                vectors[row:row + len(embeddings)] = _normalize(embeddings).astype(dtype)
+                for doc_id, content, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                    record = json.dumps({"id": doc_id, "content": content, "metadata": metadata or {}}).encode("utf-8")
+                    blob.write(record)
+                    offsets[row + 1] = offsets[row] + len(record)
+                    shard_codes[row] = code
+                    row += 1
+
+    if vectors is None:
+        raise ValueError(f"Collection {base_name} is empty; nothing to export")
+    vectors.flush()
+
+    if nlist is None:
+        nlist = int(np.sqrt(total)) if total >= Config.EXPORT_IVF_MIN_ROWS else 0
+
+    if nlist:
+        # Reorder rows so each IVF list is a contiguous slice of the matrix
+        centroids = _kmeans(vectors, nlist)
+        assignment = _assign(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        ordered = np.lib.format.open_memmap(target / "vectors.npy", mode="w+", dtype=dtype, shape=vectors.shape)
+        for start in range(0, total, Config.SEARCH_BLOCK_ROWS):
+            ordered[start:start + Config.SEARCH_BLOCK_ROWS] = vectors[order[start:start + Config.SEARCH_BLOCK_ROWS]]
+        ordered.flush()
+        del ordered, vectors
+        os.remove(target / "vectors.raw.npy")
+        np.save(target / "centroids.npy", centroids.astype(np.float32))
+        np.save(target / "list_offsets.npy", np.searchsorted(assignment[order], np.arange(nlist + 1)).astype(np.int64))
+        np.save(target / "row_ids.npy", order.astype(np.int64))
+        np.save(target / "shards.npy", shard_codes[order])
+    else:
+        del vectors
+        os.replace(target / "vectors.raw.npy", target / "vectors.npy")
+        np.save(target / "shards.npy", shard_codes)
+    np.save(target / "offsets.npy", offsets)
+
+    info = {
+        "collection": collection_name,
+        "tenant": tenant,
+        "count": total,
+        "dim": int(np.load(target / "vectors.npy", mmap_mode="r").shape[1]),
+        "dtype": dtype.name,
+        "nlist": nlist,
+        "shards": [s for s, _ in sources],
+        "embedding_model": Config.EMBEDDING_MODEL,
+        "snapshot_version": getattr(db_manager, "snapshot_version", None),
+        "source_fingerprint": db_manager.collection_fingerprint(collection_name, tenant)
+    }
+    with open(target / INDEX_FILE, "w") as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+class MmapVectorIndex:
+    """
+    Read-only, memory-mapped index over one exported collection.
+    All files are opened with mmap, so worker processes share one page-cached copy.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path / INDEX_FILE) as f:
+            self.info = json.load(f)
+        self.vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+        self.offsets = np.load(self.path / "offsets.npy", mmap_mode="r")
+        self.shard_codes = np.load(self.path / "shards.npy", mmap_mode="r")
+        self.blob = np.memmap(self.path / "texts.bin", dtype=np.uint8, mode="r")
+        self.shard_names = self.info["shards"]
+        if self.info["nlist"]:
+            self.centroids = np.load(self.path / "centroids.npy", mmap_mode="r")
+            self.list_offsets = np.load(self.path / "list_offsets.npy", mmap_mode="r")
+            self.row_ids = np.load(self.path / "row_ids.npy", mmap_mode="r")
+        else:
+            self.centroids = None
+
+    def __len__(self) -> int:
+        return self.info["count"]
+
+    def record(self, position: int) -> Dict:
+        """Load the record for a matrix row."""
+        row = int(self.row_ids[position]) if self.centroids is not None else position
+        return json.loads(bytes(self.blob[self.offsets[row]:self.offsets[row + 1]]))
+
+    def _shard_mask(self, codes: np.ndarray, shards: Optional[List[str]]) -> Optional[np.ndarray]:
+        if not shards:
+            return None
+        wanted = [i for i, name in enumerate(self.shard_names) if name in shards]
+        if not wanted:
+            return None  # Mirror ChromaDBManager: unknown shards search everything
+        return np.isin(codes, wanted)
+
+    @staticmethod
+    def _merge_topk(best: Tuple[np.ndarray, np.ndarray], scores: np.ndarray, positions: np.ndarray, k: int):
+        all_scores = np.concatenate([best[0], scores], axis=1)
+        all_positions = np.concatenate([best[1], np.broadcast_to(positions, scores.shape)], axis=1)
+        if all_scores.shape[1] > k:
+            keep = np.argpartition(-all_scores, k - 1, axis=1)[:, :k]
+            all_scores = np.take_along_axis(all_scores, keep, axis=1)
+            all_positions = np.take_along_axis(all_positions, keep, axis=1)
+        return all_scores, all_positions
+
+    def search(self, queries: np.ndarray, k: int, shards: Optional[List[str]] = None, nprobe: Optional[int] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Batched cosine search.
+
+        Args:
+            queries: (q, dim) query embeddings.
+
+        Returns:
+            Per query, a list of (matrix row, similarity) pairs, best first.
+        """
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        empty = (np.empty((len(queries), 0), dtype=np.float32), np.empty((len(queries), 0), dtype=np.int64))
+
+        if self.centroids is None:
+            best = empty
+            for start in range(0, len(self.vectors), Config.SEARCH_BLOCK_ROWS):
+                block = np.asarray(self.vectors[start:start + Config.SEARCH_BLOCK_ROWS], dtype=np.float32)
+                scores = queries @ block.T
+                mask = self._shard_mask(self.shard_codes[start:start + len(block)], shards)
+                if mask is not None:
+                    scores[:, ~mask] = -np.inf
+                best = self._merge_topk(best, scores, np.arange(start, start + len(block)), k)
+            results = [best]
+        else:
+            # IVF: probe the closest lists for each query
+            nprobe = min(nprobe or Config.IVF_NPROBE, len(self.centroids))
+            probes = np.argpartition(-(queries @ np.asarray(self.centroids).T), nprobe - 1, axis=1)[:, :nprobe]
+            results = []
+            for i, lists in enumerate(probes):
+                positions = np.concatenate([
+                    np.arange(self.list_offsets[c], self.list_offsets[c + 1]) for c in lists
+                ])
+                block = np.asarray(self.vectors[positions], dtype=np.float32)
+                scores = queries[i:i + 1] @ block.T
+                mask = self._shard_mask(self.shard_codes[positions], shards)
+                if mask is not None:
+                    scores[:, ~mask] = -np.inf
+                results.append(self._merge_topk((empty[0][i:i + 1], empty[1][i:i + 1]), scores, positions, k))
+
+        hits = []
+        for scores, positions in results:
+            for row_scores, row_positions in zip(scores, positions):
+                order = np.argsort(-row_scores)
+                hits.append([
+                    (int(row_positions[j]), float(row_scores[j]))
+                    for j in order if np.isfinite(row_scores[j])
+                ])
+        return hits
+
+
+class ExportedVectorStore:
+    """
+    Read-only retrieval backend over exported collections.
+    Exposes the same query interface as ChromaDBManager without opening the
+    Chroma SQLite store. Distances are squared L2 over normalized vectors,
+    matching Chroma's default space (lower is more similar).
+    """
+
+    def __init__(self, export_path: Optional[str] = None, embedding_function=None):
+        self.export_path = Path(export_path or Config.VECTOR_EXPORT_PATH)
+        self.persist_path = str(self.export_path)
+        self._embedding_function = embedding_function
+        self.indexes: Dict[Tuple[str, Optional[str]], MmapVectorIndex] = {}
+        for index_file in self.export_path.glob(f"*/{INDEX_FILE}"):
+            index = MmapVectorIndex(str(index_file.parent))
+            self.indexes[(index.info["collection"], index.info["tenant"])] = index
+
+    @property
+    def embedding_function(self):
+        if self._embedding_function is None:
+            from langchain_openai import OpenAIEmbeddings
+            from agents.costs import MeteredEmbeddings
+            self._embedding_function = MeteredEmbeddings(
+                OpenAIEmbeddings(model=Config.EMBEDDING_MODEL, api_key=Config.OPENAI_API_KEY),
+                Config.EMBEDDING_MODEL
+            )
+        return self._embedding_function
+
+    def get_index(self, collection_name: str, tenant: Optional[str] = None) -> MmapVectorIndex:
+        if (collection_name, tenant) not in self.indexes:
+            raise ValueError(f"No export for collection {collection_name} (tenant: {tenant}) in {self.export_path}")
+        return self.indexes[(collection_name, tenant)]
+
+    @staticmethod
+    def _matches(metadata: Dict, filter: Optional[Dict]) -> bool:
+        """Equality and $in filters on metadata (the subset used by this pipeline)."""
+        if not filter:
+            return True
+        if "$and" in filter:
+            return all(ExportedVectorStore._matches(metadata, f) for f in filter["$and"])
+        for key, condition in filter.items():
+            value = metadata.get(key)
+            if isinstance(condition, dict):
+                if "$in" in condition and value not in condition["$in"]:
+                    return False
+                if "$eq" in condition and value != condition["$eq"]:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def query_batch_with_scores(
+        self,
+        collection_name: str,
+        query_texts: List[str],
+        k: int = 4,
+        filter: Optional[Dict] = None,
+        shards: Optional[List[str]] = None,
+        tenant: Optional[str] = None,
+        embeddings: Optional[List[List[float]]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Embed and search several queries with one batched matrix product.
+        Pass precomputed `embeddings` for query_texts to skip embedding them again.
+        """
+        if tenant and (collection_name, tenant) not in self.indexes:
+            # A tenant without an export has no documents, as with ChromaDBManager
+            return [[] for _ in query_texts]
+        index = self.get_index(collection_name, tenant)
+        if embeddings is None:
+            embeddings = self.embedding_function.embed_documents(query_texts)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        if not shards or any(index.shard_names):
+            return self._search(index, embeddings, k, filter, shards)
+
+        # Unsharded export: like ChromaDBManager, treat shards as a metadata filter
+        # on Config.SHARD_KEY and fall back to the whole collection if nothing matches
+        topic_filter = {Config.SHARD_KEY: {"$in": list(shards)}}
+        scoped = {"$and": [filter, topic_filter]} if filter else topic_filter
+        results = self._search(index, embeddings, k, scoped, None)
+        missing = [i for i, docs in enumerate(results) if not docs]
+        if missing:
+            for i, docs in zip(missing, self._search(index, embeddings[missing], k, filter, None)):
+                results[i] = docs
+        return results
+
+    def _search(
+        self,
+        index: MmapVectorIndex,
+        embeddings: np.ndarray,
+        k: int,
+        filter: Optional[Dict],
+        shards: Optional[List[str]]
+    ) -> List[List[Tuple[Document, float]]]:
+        fetch_k = k * FILTER_OVERSAMPLE if filter else k
+        results = []
+        for hits in index.search(embeddings, fetch_k, shards=shards):
+            docs = []
+            for position, similarity in hits:
+                record = index.record(position)
+                if not self._matches(record["metadata"], filter):
+                    continue
+                docs.append((
+                    Document(id=record["id"], page_content=record["content"], metadata=record["metadata"]),
+                    2.0 - 2.0 * similarity
+                ))
+                if len(docs) == k:
+                    break
+            results.append(docs)
+        return results
+
+    def query_with_scores(self, collection_name: str, query_text: str, k: int = 4, filter: Optional[Dict] = None,
+                          shards: Optional[List[str]] = None, tenant: Optional[str] = None,
+                          embedding: Optional[List[float]] = None) -> List[Tuple[Document, float]]:
+        embeddings = [embedding] if embedding is not None else None
+        return self.query_batch_with_scores(collection_name, [query_text], k, filter, shards, tenant, embeddings)[0]
+
+    def query(self, collection_name: str, query_text: str, k: int = 4, filter: Optional[Dict] = None,
+              shards: Optional[List[str]] = None, tenant: Optional[str] = None) -> List[Document]:
+        return [doc for doc, _ in self.query_with_scores(collection_name, query_text, k, filter, shards, tenant)]
+
+    def query_multireturn(self, collection_name: str, query_text: str, k: int = 4, filter: Optional[Dict] = None,
+                          shards: Optional[List[str]] = None, tenant: Optional[str] = None,
+                          embedding: Optional[List[float]] = None) -> List[Dict]:
+        return [
+            {
+                "id": doc.id,
+                "content": doc.page_content,
+                "metadata": doc.metadata,
+                "source": doc.metadata.get("source", "unknown"),
+                "score": score
+            }
+            for doc, score in self.query_with_scores(collection_name, query_text, k, filter, shards, tenant, embedding)
+        ]
+
+    def collection_fingerprint(self, collection_name: str, tenant: Optional[str] = None) -> str:
+        """
+        Identifier that changes whenever the exported collection changes: the
+        source snapshot version plus the export's row count, layout and the
+        source collection's fingerprint at export time. Used,
+        as with ChromaDBManager, to invalidate caches derived from the collection.
+        """
+        info = self.get_index(collection_name, tenant).info
+        key = f"{info['count']}|{','.join(info['shards'])}|{info['dtype']}|{info['nlist']}|{info.get('source_fingerprint', '')}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        return f"{info.get('snapshot_version') or 'export'}:{digest}"
+
+
+if __name__ == "__main__":
+    from vector_stores.chroma import ChromaDBManager
+
+    parser = argparse.ArgumentParser(description="Export vector store collections for read-only retrieval workers")
+    parser.add_argument("--collections", nargs="+", default=list(ChromaDBManager.COLLECTIONS.keys()))
+    parser.add_argument("--out", default=None, help=f"Output directory (default: {Config.VECTOR_EXPORT_PATH})")
+    parser.add_argument("--tenant", default=None)
+    parser.add_argument("--dtype", default=Config.EXPORT_DTYPE, choices=["float16", "float32"])
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (0 for brute force)")
+    args = parser.parse_args()
+
+    db_manager = ChromaDBManager()
+    for name in args.collections:
+        try:
+            info = export_collection(db_manager, name, args.out, args.tenant, args.dtype, args.nlist)
+            print(f"Exported {name}: {info['count']} vectors ({info['dtype']}, dim {info['dim']}, nlist {info['nlist']})")
+        except Exception as e:
+            print(f"Error exporting {name}: {e}")
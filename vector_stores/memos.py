@@ -0,0 +1,212 @@
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+
+
+def _unit(vectors) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class ResearchMemoStore:
+    """
+    Stores synthesized research findings under the embeddings of the query set
+    that produced them, so later briefs in the same topic cluster can reuse or
+    extend them instead of re-running synthesis.
+
+    Memos record the fingerprint of the source collection they were built from;
+    they are only matched against that fingerprint and pruned once superseded.
+
+    Layout under `path`, one pair of files per memo so saving or dropping a
+    memo never rewrites the others:
+        <id>.json  queries, summary, sources, fingerprint, scope, timestamps
+        <id>.npy   unit-normalized float32 query embeddings
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or Config.RESEARCH_MEMO_PATH
+        self._lock = threading.Lock()
+        self.memos: List[Dict] = []
+        if os.path.isdir(self.path):
+            for name in sorted(os.listdir(self.path)):
+                if name.endswith(".json"):
+                    memo = self._load(name[:-len(".json")])
+                    if memo is not None:
+                        self.memos.append(memo)
+
+    def _file(self, memo_id: str, ext: str) -> str:
+        return os.path.join(self.path, f"{memo_id}{ext}")
+
+    def _load(self, memo_id: str) -> Optional[Dict]:
+        try:
+            with open(self._file(memo_id, ".json")) as f:
+                memo = json.load(f)
+            embeddings = np.load(self._file(memo_id, ".npy"))
+        except (OSError, ValueError):
+            return None
+        if len(embeddings) != len(memo["queries"]):
+            return None  # Interrupted while being extended
+        memo["query_embeddings"] = embeddings
+        memo["centroid"] = _unit(embeddings.mean(axis=0))[0]
+        return memo
+
+    def _write(self, memo: Dict) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        suffix = uuid.uuid4().hex
+        npy_tmp = self._file(memo["id"], f".{suffix}.tmp.npy")
+        np.save(npy_tmp, memo["query_embeddings"])
+        os.replace(npy_tmp, self._file(memo["id"], ".npy"))
+        # The JSON file is written last, so its presence implies a complete memo
+        json_tmp = self._file(memo["id"], f".{suffix}.tmp")
+        with open(json_tmp, "w") as f:
+            json.dump({k: v for k, v in memo.items() if k not in ("query_embeddings", "centroid")}, f)
+        os.replace(json_tmp, self._file(memo["id"], ".json"))
+
+    def _delete(self, memo_id: str) -> None:
+        for ext in (".json", ".npy"):
+            try:
+                os.remove(self._file(memo_id, ext))
+            except FileNotFoundError:
+                pass
+
+    def lookup(
+        self,
+        queries: List[str],
+        embeddings: List[List[float]],
+        fingerprint: str,
+        scope: Dict
+    ) -> Optional[Tuple[Dict, List[str]]]:
+        """
+        Find the best memo for a query set.
+
+        Args:
+            embeddings: One embedding per query.
+            fingerprint: Current fingerprint of the source collection.
+            scope: Retrieval scope (topics, tenant) the memo must have been built with.
+
+        Returns:
+            (memo, uncovered queries) for the most similar valid memo, or None.
+            An empty uncovered list means the memo answers every query.
+        """
+        query_vectors = _unit(embeddings)
+        centroid = _unit(query_vectors.mean(axis=0))[0]
+
+        best, best_key = None, None
+        for memo in self.memos:
+            if memo["fingerprint"] != fingerprint or memo["scope"] != scope:
+                continue
+            if float(centroid @ memo["centroid"]) < Config.MEMO_SET_SIMILARITY:
+                continue
+            similarities = query_vectors @ memo["query_embeddings"].T
+            covered = similarities.max(axis=1) >= Config.MEMO_QUERY_SIMILARITY
+            key = (int(covered.sum()), float(similarities.max(axis=1).mean()))
+            if covered.any() and (best_key is None or key > best_key):
+                best, best_key = (memo, [q for q, c in zip(queries, covered) if not c]), key
+
+        if best:
+            with self._lock:
+                best[0]["last_used"] = datetime.now().isoformat()
+        return best
+
+    def save(
+        self,
+        queries: List[str],
+        embeddings: List[List[float]],
+        summary: str,
+        sources: List[Dict],
+        fingerprint: str,
+        scope: Dict,
+        memo_id: Optional[str] = None
+    ) -> Dict:
+        """
+        Save a memo, or replace the memo with `memo_id` after extending it.
+
+        Args:
+            sources: Lightweight source references ({"id", "source", "title"}).
+        """
+        query_embeddings = _unit(embeddings)
+        memo = {
+            "id": memo_id or uuid.uuid4().hex,
+            "queries": queries,
+            "query_embeddings": query_embeddings,
+            "centroid": _unit(query_embeddings.mean(axis=0))[0],
+            "summary": summary,
+            "sources": sources,
+            "fingerprint": fingerprint,
+            "scope": scope,
+            "created_at": datetime.now().isoformat(),
+            "last_used": datetime.now().isoformat()
+        }
+        with self._lock:
+            self.memos = [m for m in self.memos if m["id"] != memo["id"]]
+            self.memos.append(memo)
+            self._write(memo)
+            if len(self.memos) > Config.MAX_RESEARCH_MEMOS:
+                self.memos.sort(key=lambda m: m["last_used"])
+                for evicted in self.memos[:-Config.MAX_RESEARCH_MEMOS]:
+                    self._delete(evicted["id"])
+                self.memos = self.memos[-Config.MAX_RESEARCH_MEMOS:]
+        return memo
+
+    def invalidate(self, fingerprint: str, tenant: Optional[str] = None) -> int:
+        """
+        Drop a tenant's memos that were built from an older version of the collection.
+
+        Fingerprints are "<snapshot version>:<digest>". Memos from an older
+        snapshot (or the live database, once snapshots exist), or from the same
+        one with different contents, are stale; memos from newer snapshots are
+        kept, since other processes may be pinned to them.
+
+        Returns:
+            Number of memos removed.
+        """
+        with self._lock:
+            stale = [
+                m for m in self.memos
+                if m["scope"].get("tenant") == tenant and _superseded(m["fingerprint"], fingerprint)
+            ]
+            for memo in stale:
+                self._delete(memo["id"])
+            stale_ids = {m["id"] for m in stale}
+            self.memos = [m for m in self.memos if m["id"] not in stale_ids]
+        return len(stale)
+
+
+# Fingerprint prefixes of unversioned databases (see collection_fingerprint)
+UNVERSIONED = ("live", "export")
+
+
+def _superseded(memo_fingerprint: str, fingerprint: str) -> bool:
+    """Whether a memo fingerprint is from an older version than `fingerprint`."""
+    memo_version, _, memo_digest = memo_fingerprint.partition(":")
+    version, _, digest = fingerprint.partition(":")
+    if memo_version == version:
+        return memo_digest != digest
+    if memo_version == "live" and version not in UNVERSIONED:
+        return True  # Readers move to snapshots once one is published
+    if memo_version in UNVERSIONED or version in UNVERSIONED:
+        return False  # Different databases; neither supersedes the other
+    # Snapshot versions are timestamped, so they sort in publish order
+    return memo_version < version
+
+
+_shared_store: Optional[ResearchMemoStore] = None
+_shared_lock = threading.Lock()
+
+
+def get_memo_store() -> ResearchMemoStore:
+    """Process-wide memo store, loaded from disk once."""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = ResearchMemoStore()
+        return _shared_store
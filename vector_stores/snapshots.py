@@ -0,0 +1,168 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from config import Config
+
+
+class SnapshotManager:
+    """
+    Manages versioned knowledge base snapshots.
+    
+    Each version is a complete ChromaDB directory under `<root>/versions/<version>`
+    with a manifest.json. Ingestion builds a new version while readers keep using
+    the current one; publishing atomically swaps the CURRENT pointer file, and old
+    versions are garbage collected after a grace period.
+    
+    A version being built holds a BUILDING marker whose mtime is its heartbeat;
+    garbage collection leaves it alone until the heartbeat goes stale.
+    """
+    
+    POINTER_FILE = "CURRENT"
+    MANIFEST_FILE = "manifest.json"
+    BUILD_MARKER = "BUILDING"
+    
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or Config.VECTOR_DB_SNAPSHOT_PATH)
+        self.versions_dir = self.root / "versions"
+        
+    def version_path(self, version: str) -> Path:
+        return self.versions_dir / version
+        
+    def current_version(self) -> Optional[str]:
+        """Version currently served to readers, or None if nothing is published."""
+        try:
+            version = (self.root / self.POINTER_FILE).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return version if version and self.version_path(version).is_dir() else None
+        
+    def current_path(self) -> Optional[str]:
+        version = self.current_version()
+        return str(self.version_path(version)) if version else None
+        
+    def list_versions(self) -> List[str]:
+        """All built versions, oldest first."""
+        if not self.versions_dir.is_dir():
+            return []
+        return sorted(p.name for p in self.versions_dir.iterdir() if p.is_dir())
+        
+    def create_version(self, copy_from_current: bool = False) -> str:
+        """
+        Create a new, unpublished version directory for ingestion.
+        
+        Args:
+            copy_from_current: Start from a copy of the current version for
+                incremental updates instead of an empty database.
+        """
+        version = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        path = self.version_path(version)
+        current = self.current_path()
+        if copy_from_current and current:
+            shutil.copytree(current, path)
+        else:
+            path.mkdir(parents=True)
+        self.heartbeat(version)
+        return version
+        
+    def heartbeat(self, version: str) -> None:
+        """Mark a version as still being built; call periodically during long ingests."""
+        (self.version_path(version) / self.BUILD_MARKER).touch()
+        
+    def abandon(self, version: str) -> None:
+        """Give up on building a version, leaving it to garbage collection."""
+        try:
+            (self.version_path(version) / self.BUILD_MARKER).unlink()
+        except FileNotFoundError:
+            pass
+        
+    def write_manifest(self, version: str, db_manager) -> Dict:
+        """
+        Record per-collection document counts and the embedding model for a version.
+        
+        Args:
+            db_manager: ChromaDBManager opened on the version's directory.
+        """
+        collections = {}
+        for collection in db_manager.client.list_collections():
+            collections[collection.name] = {
+                "documents": collection.count(),
+                "embedding_model": Config.EMBEDDING_MODEL
+            }
+        manifest = {
+            "version": version,
+            "created_at": datetime.now().isoformat(),
+            "embedding_model": Config.EMBEDDING_MODEL,
+            "collections": collections
+        }
+        with open(self.version_path(version) / self.MANIFEST_FILE, "w") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+        
+    def load_manifest(self, version: Optional[str] = None) -> Optional[Dict]:
+        version = version or self.current_version()
+        if not version:
+            return None
+        try:
+            with open(self.version_path(version) / self.MANIFEST_FILE) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        
+    def publish(self, version: str) -> None:
+        """Atomically point readers at a fully built version."""
+        manifest = self.load_manifest(version)
+        if manifest is None:
+            raise ValueError(f"Snapshot {version} has no manifest; write_manifest before publishing")
+            
+        manifest["published_at"] = datetime.now().isoformat()
+        with open(self.version_path(version) / self.MANIFEST_FILE, "w") as f:
+            json.dump(manifest, f, indent=2)
+            
+        tmp_pointer = self.root / f"{self.POINTER_FILE}.{uuid.uuid4().hex}.tmp"
+        tmp_pointer.write_text(version)
+        os.replace(tmp_pointer, self.root / self.POINTER_FILE)
+        self.abandon(version)  # Built; the marker is no longer needed
+        
+    def garbage_collect(self, keep: Optional[int] = None, grace_seconds: Optional[int] = None) -> List[str]:
+        """
+        Remove old versions, never touching the current one, the `keep` most
+        recent others, or anything superseded within the grace period, since
+        running pipelines may still have it open. Versions still being built
+        are skipped until their heartbeat is older than the grace period;
+        abandoned unpublished versions age from their last modification.
+        
+        Returns:
+            List of removed versions.
+        """
+        keep = Config.SNAPSHOT_KEEP if keep is None else keep
+        grace_seconds = Config.SNAPSHOT_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        current = self.current_version()
+        
+        versions = self.list_versions()
+        published = {v: (self.load_manifest(v) or {}).get("published_at") for v in versions}
+        candidates = [v for v in versions if v != current]
+        candidates = candidates[:len(candidates) - keep] if keep else candidates
+        
+        removed = []
+        now = time.time()
+        for version in candidates:
+            path = self.version_path(version)
+            # A version is retired once any newer version has been published
+            later = [published[v] for v in versions if v > version and published[v]]
+            marker = path / self.BUILD_MARKER
+            if later:
+                retired_at = datetime.fromisoformat(min(later)).timestamp()
+            elif marker.exists():
+                retired_at = marker.stat().st_mtime
+            else:
+                retired_at = path.stat().st_mtime
+            if now - retired_at < grace_seconds:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(version)
+        return removed
@@ -1,7 +1,10 @@
 import json
 import os
-from datetime import datetime
 from graph.workflow import create_content_workflow
+from agents.costs import cost_accountant
+from agents.metrics import prompt_cache_metrics, structured_output_metrics
+from storage.history import get_history_store
+from storage.outputs import get_output_manager
 
 def main():
     print("--- Content Generation Pipeline Verification ---")
@@ -32,41 +35,52 @@ def main():
         
         print("\n--- Workflow Completed Successfully ---")
         
-        # Save Outputs
-        output_dir = "outputs"
-        os.makedirs(output_dir, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # 1. Save outputs to a per-run directory (written behind a queue)
+        outputs = get_output_manager()
+        run_id = outputs.save_run(result, request=request, run_id=result.get("run_id"))
+        outputs.append_run(result, run_id, request=request)
+        outputs.flush()
+        run_dir = outputs.run_dir(run_id)
+        
+        saved = json.loads((run_dir / "manifest.json").read_text())["files"]
+        for name in saved:
+            print(f"✅ {name} saved to {run_dir / name}")
+        print(f"✅ Run record appended to {outputs.sink_path()}")
         
-        # 1. Save Brief
-        if result.get("brief"):
-            with open(f"{output_dir}/brief_{timestamp}.json", "w") as f:
-                json.dump(result["brief"], f, indent=2)
-            print(f"✅ Brief saved to outputs/brief_{timestamp}.json")
-            
-        # 2. Save Research
-        if result.get("research_findings"):
-            with open(f"{output_dir}/research_{timestamp}.md", "w") as f:
-                f.write(result["research_findings"])
-            print(f"✅ Research saved to outputs/research_{timestamp}.md")
-
-        # 3. Save Final Content
         final_content = result.get("final_content")
         if final_content:
-            filename = f"{output_dir}/final_content_{timestamp}.md"
-            with open(filename, "w") as f:
-                f.write(final_content)
-            print(f"✅ Final Content saved to {filename}")
+            print(f"✅ HTML rendered to {outputs.render_html(run_id)}")
             
             # Print preview
             print("\n--- Content Preview ---")
             print(final_content[:500] + "...\n")
-            
-        # 4. Save Metadata
-        seo_meta = result.get("seo_metadata")
-        if seo_meta:
-            with open(f"{output_dir}/metadata_{timestamp}.json", "w") as f:
-                json.dump(seo_meta, f, indent=2)
-            print(f"✅ SEO Metadata saved to outputs/metadata_{timestamp}.json")
+
+        # 2. Draft history: per-stage changes recorded for this run
+        print("\n--- Draft History ---")
+        for stage, stats in get_history_store().stage_stats(run_id).items():
+            print(f"{stage}: {stats['versions']} versions, +{stats['lines_added']}/-{stats['lines_removed']} lines, "
+                  f"{stats['words_after']} words, min similarity {stats['min_similarity']:.0%}")
+
+        # 3. Token usage and cost for this run
+        print("\n--- Run Costs ---")
+        costs = cost_accountant.summary(run_id)
+        for stage, totals in costs["by_stage"].items():
+            print(f"{stage}: {totals['input_tokens']} in / {totals['output_tokens']} out / "
+                  f"{totals['embedding_tokens']} embedding tokens, ${totals['cost']:.4f}")
+        print(f"Total: ${costs['total']['cost']:.4f}")
+        for action in costs["actions"]:
+            print(f"Budget: {action['action']} ({action['stage']})")
+
+        # 4. Prompt prefix cache metrics per agent
+        print("\n--- Prompt Cache Metrics ---")
+        for agent, stats in prompt_cache_metrics.snapshot().items():
+            print(f"{agent}: prefix hit rate {stats['prefix_hit_rate']:.0%}, cached input tokens {stats['cached_token_rate']:.0%}")
+
+        # 5. Structured output validation outcomes per agent
+        print("\n--- Structured Output Metrics ---")
+        for agent, stats in structured_output_metrics.snapshot().items():
+            print(f"{agent}: {stats.get('calls', 0)} calls, {stats.get('parse_failures', 0)} parse failures, "
+                  f"{stats.get('repaired', 0)} repaired, {stats.get('failed', 0)} failed")
 
         if result.get('errors'):
             print("\n❌ Errors encountered:")